@@ -0,0 +1,235 @@
+# Results of ConstraintSystem.is_solvable by canonical key of the system.
+# Invariant synthesis builds systems with the same constraints (up to
+# order and duplicates) for the same action many times.
+_solvable_cache = {}
+MAX_CACHE_SIZE = 100000
+
+
+def _get_equality_key(v1, v2):
+    if v1 <= v2:
+        return (v1, v2)
+    return (v2, v1)
+
+
+class NegativeClause:
+    # disjunction of inequalities
+    def __init__(self, parts):
+        self.parts = parts
+        assert len(parts)
+        self.key = None
+
+    def __str__(self):
+        disj = " or ".join(["(%s != %s)" % (v1, v2)
+                            for (v1, v2) in self.parts])
+        return "(%s)" % disj
+
+    def is_satisfiable(self):
+        for part in self.parts:
+            if part[0] != part[1]:
+                return True
+        return False
+
+    def apply_mapping(self, m):
+        new_parts = [(m.get(v1, v1), m.get(v2, v2)) for (v1, v2) in self.parts]
+        return NegativeClause(new_parts)
+
+    def get_key(self):
+        if self.key is None:
+            self.key = frozenset(_get_equality_key(v1, v2)
+                                 for (v1, v2) in self.parts)
+        return self.key
+
+
+class Assignment:
+    def __init__(self, equalities):
+        self.equalities = tuple(equalities)
+        # represents a conjunction of expressions ?x = ?y or ?x = d
+        # with ?x, ?y being variables and d being a domain value
+
+        self.consistent = None
+        self.mapping = None
+        self.eq_classes = None
+        self.key = None
+
+    def __str__(self):
+        conj = " and ".join(["(%s = %s)" % (v1, v2)
+                            for (v1, v2) in self.equalities])
+        return "(%s)" % conj
+
+    def _compute_equivalence_classes(self):
+        eq_classes = {}
+        for (v1, v2) in self.equalities:
+            c1 = eq_classes.setdefault(v1, {v1})
+            c2 = eq_classes.setdefault(v2, {v2})
+            if c1 is not c2:
+                if len(c2) > len(c1):
+                    v1, c1, v2, c2 = v2, c2, v1, c1
+                c1.update(c2)
+                for elem in c2:
+                    eq_classes[elem] = c1
+        self.eq_classes = eq_classes
+
+    def _compute_mapping(self):
+        if not self.eq_classes:
+            self._compute_equivalence_classes()
+
+        # create mapping: each key is mapped to the smallest
+        # element in its equivalence class (with objects being
+        # smaller than variables)
+        mapping = {}
+        for eq_class in self.eq_classes.values():
+            variables = [item for item in eq_class if item.startswith("?")]
+            constants = [item for item in eq_class if not item.startswith("?")]
+            if len(constants) >= 2:
+                self.consistent = False
+                self.mapping = None
+                return
+            if constants:
+                set_val = constants[0]
+            else:
+                set_val = min(variables)
+            for entry in eq_class:
+                mapping[entry] = set_val
+        self.consistent = True
+        self.mapping = mapping
+
+    def is_consistent(self):
+        if self.consistent is None:
+            self._compute_mapping()
+        return self.consistent
+
+    def get_mapping(self):
+        if self.consistent is None:
+            self._compute_mapping()
+        return self.mapping
+
+    def get_key(self):
+        if self.key is None:
+            self.key = frozenset(_get_equality_key(v1, v2)
+                                 for (v1, v2) in self.equalities)
+        return self.key
+
+
+class ConstraintSystem:
+    def __init__(self):
+        self.combinatorial_assignments = []
+        self.neg_clauses = []
+
+    def __str__(self):
+        combinatorial_assignments = []
+        for comb_assignment in self.combinatorial_assignments:
+            disj = " or ".join([str(assig) for assig in comb_assignment])
+            disj = "(%s)" % disj
+            combinatorial_assignments.append(disj)
+        assigs = " and\n".join(combinatorial_assignments)
+
+        neg_clauses = [str(clause) for clause in self.neg_clauses]
+        neg_clauses = " and ".join(neg_clauses)
+        return assigs + "(" + neg_clauses + ")"
+
+    def add_assignment(self, assignment):
+        self.add_assignment_disjunction([assignment])
+
+    def add_assignment_disjunction(self, assignments):
+        self.combinatorial_assignments.append(assignments)
+
+    def add_negative_clause(self, negative_clause):
+        self.neg_clauses.append(negative_clause)
+
+    def combine(self, other):
+        """Combines two constraint systems to a new system"""
+        combined = ConstraintSystem()
+        combined.combinatorial_assignments = (self.combinatorial_assignments +
+                                              other.combinatorial_assignments)
+        combined.neg_clauses = self.neg_clauses + other.neg_clauses
+        return combined
+
+    def copy(self):
+        other = ConstraintSystem()
+        other.combinatorial_assignments = list(self.combinatorial_assignments)
+        other.neg_clauses = list(self.neg_clauses)
+        return other
+
+    def dump(self):
+        print("AssignmentSystem:")
+        for comb_assignment in self.combinatorial_assignments:
+            disj = " or ".join([str(assig) for assig in comb_assignment])
+            print("  ASS: ", disj)
+        for neg_clause in self.neg_clauses:
+            print("  NEG: ", str(neg_clause))
+
+    def get_key(self):
+        """Return a key that is equal for systems with the same constraints,
+        regardless of their order and of duplicates."""
+        return (frozenset(frozenset(assignment.get_key()
+                                    for assignment in assignments)
+                          for assignments in self.combinatorial_assignments),
+                frozenset(clause.get_key() for clause in self.neg_clauses))
+
+    def is_solvable(self):
+        """Check whether the combinatorial assignments include at least
+           one consistent assignment under which the negative clauses
+           are satisfiable"""
+        key = self.get_key()
+        result = _solvable_cache.get(key)
+        if result is None:
+            result = self._solve()
+            if len(_solvable_cache) >= MAX_CACHE_SIZE:
+                _solvable_cache.clear()
+            _solvable_cache[key] = result
+        return result
+
+    def _solve(self):
+        """Choose one assignment of each disjunction by depth-first search,
+        maintaining the equivalence classes of the chosen equalities in a
+        union-find structure. The root of a class is a constant if the
+        class contains one. A partial choice is pruned as soon as it
+        equates two constants or falsifies a negative clause, since
+        further equalities cannot undo this."""
+        disjunctions = sorted(self.combinatorial_assignments, key=len)
+        neg_clauses = [clause.parts for clause in self.neg_clauses]
+        parent = {}
+        trail = []
+
+        def find(item):
+            while item in parent:
+                item = parent[item]
+            return item
+
+        def add_equalities(equalities):
+            for v1, v2 in equalities:
+                root1 = find(v1)
+                root2 = find(v2)
+                if root1 == root2:
+                    continue
+                if not root2.startswith("?"):
+                    if not root1.startswith("?"):
+                        return False
+                    root1, root2 = root2, root1
+                parent[root2] = root1
+                trail.append(root2)
+            return True
+
+        def clauses_satisfiable():
+            for parts in neg_clauses:
+                for v1, v2 in parts:
+                    if find(v1) != find(v2):
+                        break
+                else:
+                    return False
+            return True
+
+        def search(index):
+            if index == len(disjunctions):
+                return True
+            for assignment in disjunctions[index]:
+                trail_length = len(trail)
+                if (add_equalities(assignment.equalities) and
+                        clauses_satisfiable() and search(index + 1)):
+                    return True
+                for item in trail[trail_length:]:
+                    del parent[item]
+                del trail[trail_length:]
+            return False
+
+        return clauses_satisfiable() and search(0)
@@ -0,0 +1,85 @@
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+
+import options
+
+# The cache (see option --domain-cache) stores intermediate results of the
+# translator that only depend on the domain file, so that they can be reused
+# when translating other tasks of the same domain. Each entry is identified
+# by the kind of result and a key derived from the contents of the domain
+# file and from the translator itself, so that changes to either invalidate
+# the entry. A missing or unreadable entry is never an error: the result
+# is simply recomputed.
+#
+# Entries are also kept in memory (in pickled form, so that every load
+# returns fresh objects that the caller may modify) for translating
+# several tasks within the same process.
+
+TRANSLATOR_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_translator_version = None
+_entries_in_memory = {}
+
+
+def get_translator_version():
+    """Return a fingerprint of the translator source code."""
+    global _translator_version
+    if _translator_version is None:
+        hasher = hashlib.sha1()
+        hasher.update(("%d.%d" % sys.version_info[:2]).encode("ascii"))
+        for dirpath, dirnames, filenames in os.walk(TRANSLATOR_DIR):
+            dirnames[:] = sorted(d for d in dirnames if d != "tests")
+            for filename in sorted(filenames):
+                if filename.endswith(".py"):
+                    with open(os.path.join(dirpath, filename), "rb") as source:
+                        hasher.update(filename.encode("utf-8"))
+                        hasher.update(source.read())
+        _translator_version = hasher.hexdigest()
+    return _translator_version
+
+
+def get_key(domain_filename):
+    hasher = hashlib.sha1(get_translator_version().encode("ascii"))
+    with open(domain_filename, "rb") as domain_file:
+        hasher.update(domain_file.read())
+    return hasher.hexdigest()
+
+
+def _get_path(domain_filename, kind):
+    return os.path.join(options.domain_cache, "%s-%s.pickle" % (
+        get_key(domain_filename), kind))
+
+
+def load(domain_filename, kind):
+    """Return the cached result of the given kind for domain_filename or
+    None if the cache is disabled or has no such entry."""
+    if not options.domain_cache:
+        return None
+    try:
+        path = _get_path(domain_filename, kind)
+        data = _entries_in_memory.get(path)
+        if data is None:
+            with open(path, "rb") as cache_file:
+                data = cache_file.read()
+            _entries_in_memory[path] = data
+        return pickle.loads(data)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def store(domain_filename, kind, result):
+    if not options.domain_cache:
+        return
+    path = _get_path(domain_filename, kind)
+    data = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+    _entries_in_memory[path] = data
+    os.makedirs(options.domain_cache, exist_ok=True)
+    # Write to a temporary file first and then rename it, so that
+    # concurrent translator runs never see incomplete entries.
+    with tempfile.NamedTemporaryFile(
+            dir=options.domain_cache, delete=False) as cache_file:
+        cache_file.write(data)
+    os.replace(cache_file.name, path)
@@ -0,0 +1,177 @@
+import pddl
+import pddl_to_prolog
+
+class OccurrencesTracker:
+    """Keeps track of the number of times each variable appears
+    in a list of symbolic atoms."""
+    def __init__(self, rule):
+        self.occurrences = {}
+        self.update(rule.effect, +1)
+        for cond in rule.conditions:
+            self.update(cond, +1)
+    def update(self, symatom, delta):
+        for var in symatom.args:
+            if var[0] == "?":
+                if var not in self.occurrences:
+                    self.occurrences[var] = 0
+                self.occurrences[var] += delta
+                assert self.occurrences[var] >= 0
+                if not self.occurrences[var]:
+                    del self.occurrences[var]
+    def variables(self):
+        return set(self.occurrences)
+
+class JoinSizeEstimator:
+    """Estimates the number of atoms of the relations in a rule, based on
+    the number of facts per predicate and on the sizes of the types of the
+    variables, assuming that the arguments of a relation are independent."""
+    def __init__(self, facts, derived_predicates, objects):
+        self.facts_by_predicate = {}
+        for fact in facts:
+            self.facts_by_predicate.setdefault(
+                fact.atom.predicate, []).append(fact.atom.args)
+        self.derived_predicates = derived_predicates
+        self.num_objects = max(len(objects), 1)
+        self.sizes = {}
+        # Estimated sizes of the auxiliary predicates introduced by
+        # greedy_join, for comparing them with the actual sizes.
+        self.estimates = {}
+    def start_rule(self, rule):
+        # Type predicates are unary static predicates "type@<type>".
+        self.domain_sizes = {}
+        for cond in rule.conditions:
+            if (len(cond.args) == 1 and cond.args[0][0] == "?" and
+                    isinstance(cond.predicate, str) and
+                    cond.predicate.startswith("type@")):
+                var = cond.args[0]
+                size = len(self.facts_by_predicate.get(cond.predicate, ()))
+                self.domain_sizes[var] = min(
+                    self.domain_sizes.get(var, self.num_objects), size)
+    def get_domain_size(self, var):
+        return max(self.domain_sizes.get(var, self.num_objects), 1)
+    def get_max_size(self, variables):
+        result = 1.0
+        for var in variables:
+            result *= self.get_domain_size(var)
+        return result
+    def get_size(self, atom):
+        size = self.sizes.get(atom.predicate)
+        if size is not None:
+            return size
+        if atom.predicate in self.derived_predicates:
+            return self.get_max_size(pddl_to_prolog.get_variables([atom]))
+        return sum(
+            1 for args in self.facts_by_predicate.get(atom.predicate, ())
+            if all(arg == obj or arg[0] == "?"
+                   for arg, obj in zip(atom.args, args)))
+    def get_join_size(self, left, right):
+        left_vars = pddl_to_prolog.get_variables([left])
+        right_vars = pddl_to_prolog.get_variables([right])
+        return (self.get_size(left) * self.get_size(right) /
+                self.get_max_size(left_vars & right_vars))
+    def add_relation(self, atom, size):
+        size = min(size, self.get_max_size(pddl_to_prolog.get_variables([atom])))
+        self.sizes[atom.predicate] = size
+        self.estimates[atom.predicate] = size
+
+class CostMatrix:
+    def __init__(self, joinees, size_estimator=None):
+        self.joinees = []
+        self.cost_matrix = []
+        self.size_estimator = size_estimator
+        for joinee in joinees:
+            self.add_entry(joinee)
+    def add_entry(self, joinee):
+        new_row = [self.compute_join_cost(joinee, other) for other in self.joinees]
+        self.cost_matrix.append(new_row)
+        self.joinees.append(joinee)
+    def delete_entry(self, index):
+        for row in self.cost_matrix[index + 1:]:
+            del row[index]
+        del self.cost_matrix[index]
+        del self.joinees[index]
+    def find_min_pair(self):
+        assert len(self.joinees) >= 2
+        min_cost = (float("inf"),)
+        for i, row in enumerate(self.cost_matrix):
+            for j, entry in enumerate(row):
+                if entry < min_cost:
+                    min_cost = entry
+                    left_index, right_index = i, j
+        return left_index, right_index
+    def remove_min_pair(self):
+        left_index, right_index = self.find_min_pair()
+        left, right = self.joinees[left_index], self.joinees[right_index]
+        assert left_index > right_index
+        self.delete_entry(left_index)
+        self.delete_entry(right_index)
+        return (left, right)
+    def compute_join_cost(self, left_joinee, right_joinee):
+        left_vars = pddl_to_prolog.get_variables([left_joinee])
+        right_vars = pddl_to_prolog.get_variables([right_joinee])
+        if len(left_vars) > len(right_vars):
+            left_vars, right_vars = right_vars, left_vars
+        common_vars = left_vars & right_vars
+        cost = (len(left_vars) - len(common_vars),
+                len(right_vars) - len(common_vars),
+                -len(common_vars))
+        if self.size_estimator:
+            # Prefer the join with the smallest result among those with
+            # common variables. The variable counts break ties.
+            return (not common_vars, self.size_estimator.get_join_size(
+                left_joinee, right_joinee)) + cost
+        return cost
+    def can_join(self):
+        return len(self.joinees) >= 2
+
+class ResultList:
+    def __init__(self, rule, name_generator, size_estimator=None):
+        self.final_effect = rule.effect
+        self.result = []
+        self.name_generator = name_generator
+        self.size_estimator = size_estimator
+    def get_result(self):
+        self.result[-1].effect = self.final_effect
+        return self.result
+    def add_rule(self, type, conditions, effect_vars):
+        effect = pddl.Atom(next(self.name_generator), effect_vars)
+        rule = pddl_to_prolog.Rule(conditions, effect)
+        rule.type = type
+        self.result.append(rule)
+        if self.size_estimator:
+            if type == "join":
+                size = self.size_estimator.get_join_size(*conditions)
+            else:
+                size = self.size_estimator.get_size(conditions[0])
+            self.size_estimator.add_relation(effect, size)
+        return rule.effect
+
+def greedy_join(rule, name_generator, size_estimator=None):
+    assert len(rule.conditions) >= 2
+    if size_estimator:
+        size_estimator.start_rule(rule)
+    cost_matrix = CostMatrix(rule.conditions, size_estimator)
+    occurrences = OccurrencesTracker(rule)
+    result = ResultList(rule, name_generator, size_estimator)
+
+    while cost_matrix.can_join():
+        joinees = list(cost_matrix.remove_min_pair())
+        for joinee in joinees:
+            occurrences.update(joinee, -1)
+
+        common_vars = set(joinees[0].args) & set(joinees[1].args)
+        condition_vars = set(joinees[0].args) | set(joinees[1].args)
+        effect_vars = occurrences.variables() & condition_vars
+        for i, joinee in enumerate(joinees):
+            joinee_vars = set(joinee.args)
+            retained_vars = joinee_vars & (effect_vars | common_vars)
+            if retained_vars != joinee_vars:
+                joinees[i] = result.add_rule("project", [joinee], sorted(retained_vars))
+        joint_condition = result.add_rule("join", joinees, sorted(effect_vars))
+        cost_matrix.add_entry(joint_condition)
+        occurrences.update(joint_condition, +1)
+
+    # assert occurrences.variables() == set(rule.effect.args)
+    # for var in set(rule.effect.args):
+    #     assert occurrences.occurrences[var] == 2 * rule.effect.args.count(var)
+    return result.get_result()
@@ -0,0 +1,170 @@
+#! /usr/bin/env python3
+
+
+from collections import defaultdict
+
+import build_model
+import options
+import pddl_to_prolog
+import pddl
+import timers
+
+def get_fluent_facts(task, model):
+    fluent_predicates = set()
+    for action in task.actions:
+        for effect in action.effects:
+            fluent_predicates.add(effect.literal.predicate)
+    for axiom in task.axioms:
+        fluent_predicates.add(axiom.name)
+    return {fact for fact in model
+            if fact.predicate in fluent_predicates}
+
+def get_objects_by_type(typed_objects, types):
+    result = defaultdict(list)
+    supertypes = {}
+    for type in types:
+        supertypes[type.name] = type.supertype_names
+    for obj in typed_objects:
+        result[obj.type_name].append(obj.name)
+        for type in supertypes[obj.type_name]:
+            result[type].append(obj.name)
+    return result
+
+def instantiate(task, model, stream_actions=False):
+    """Instantiate the actions and axioms of the task that are reachable in
+    the given model. If stream_actions is true, the instantiated actions are
+    returned as an iterator that instantiates them on demand."""
+    relaxed_reachable = False
+    fluent_facts = get_fluent_facts(task, model)
+    init_facts = set()
+    init_assignments = {}
+    for element in task.init:
+        if isinstance(element, pddl.Assign):
+            init_assignments[element.fluent] = element.expression
+        else:
+            init_facts.add(element)
+
+    type_to_objects = get_objects_by_type(task.objects, task.types)
+    init_index = pddl.FactIndex(init_facts)
+    fluent_index = pddl.FactIndex(fluent_facts)
+
+    instantiated_axioms = []
+    axiom_instantiators = {}
+    reachable_action_parameters = defaultdict(list)
+    # The actions of the action atoms in the model, in model order.
+    action_order = []
+    for atom in model:
+        if isinstance(atom.predicate, pddl.Action):
+            action = atom.predicate
+            inst_parameters = atom.args[:len(action.parameters)]
+            # Note: It's important that we use the action object
+            # itself as the key in reachable_action_parameters (rather
+            # than action.name) since we can have multiple different
+            # actions with the same name after normalization, and we
+            # want to distinguish their instantiations.
+            reachable_action_parameters[action].append(inst_parameters)
+            action_order.append(action)
+        elif isinstance(atom.predicate, pddl.Axiom):
+            axiom = atom.predicate
+            instantiator = axiom_instantiators.get(axiom)
+            if instantiator is None:
+                instantiator = axiom_instantiators[axiom] = (
+                    axiom.get_instantiator(init_index, fluent_index))
+            inst_axiom = instantiator.instantiate(atom.args)
+            if inst_axiom:
+                instantiated_axioms.append(inst_axiom)
+        elif atom.predicate == "@goal-reachable":
+            relaxed_reachable = True
+
+    instantiated_actions = instantiate_actions(
+        action_order, reachable_action_parameters, init_index,
+        init_assignments, fluent_index, type_to_objects,
+        task.use_min_cost_metric)
+    if not stream_actions:
+        instantiated_actions = list(instantiated_actions)
+
+    return (relaxed_reachable, fluent_facts, instantiated_actions,
+            sorted(instantiated_axioms), reachable_action_parameters)
+
+def instantiate_actions(action_order, reachable_action_parameters, init_facts,
+                        init_assignments, fluent_facts, objects_by_type,
+                        metric):
+    """Generate the instantiated actions in the given order, where each
+    action is instantiated with its next tuple of reachable parameters.
+    Each action is compiled once (see pddl.ActionInstantiator).
+    init_facts and fluent_facts are pddl.FactIndex objects."""
+    instantiators = {}
+    for action in action_order:
+        entry = instantiators.get(action)
+        if entry is None:
+            instantiator = action.get_instantiator(
+                init_facts, init_assignments, fluent_facts, objects_by_type,
+                metric)
+            entry = instantiators[action] = (
+                instantiator.instantiate,
+                iter(reachable_action_parameters[action]))
+        instantiate_action, parameters = entry
+        inst_action = instantiate_action(next(parameters))
+        if inst_action:
+            yield inst_action
+
+def explore(task):
+    prog = pddl_to_prolog.translate(task, options.join_order)
+    model = build_model.compute_model(prog)
+    with timers.timing("Completing instantiation"):
+        # Dumping the task needs the list of actions.
+        return instantiate(
+            task, model,
+            stream_actions=options.stream_actions and not options.dump_task)
+
+class Explorer:
+    """Explore several tasks that only differ in their initial states.
+
+    The relaxed reachability model of the first task is updated for each
+    further task instead of being computed from scratch. All tasks must be
+    normalized and have the same domain, objects and goal."""
+    def __init__(self, task):
+        prog = pddl_to_prolog.translate(task, options.join_order)
+        with timers.timing("Computing model"):
+            self.model = build_model.IncrementalModel(prog)
+        self.task = task
+        self.init_facts = get_init_facts(task)
+
+    def explore(self, task):
+        init_facts = get_init_facts(task)
+        with timers.timing("Updating model", block=True):
+            num_recomputed = self.model.update(
+                init_facts - self.init_facts, self.init_facts - init_facts)
+            print("%d predicates recomputed" % num_recomputed)
+        self.init_facts = init_facts
+        # The model refers to the actions and axioms of the first task, but
+        # the instantiated task must use those of the given task.
+        predicate_map = dict(zip(self.task.actions + self.task.axioms,
+                                 task.actions + task.axioms))
+        model = [pddl.Atom(predicate_map.get(atom.predicate, atom.predicate),
+                           atom.args)
+                 for atom in self.model.get_atoms()]
+        with timers.timing("Completing instantiation"):
+            return instantiate(task, model)
+
+def get_init_facts(task):
+    return {fact for fact in task.init if isinstance(fact, pddl.Atom)}
+
+if __name__ == "__main__":
+    import pddl_parser
+    task = pddl_parser.open()
+    relaxed_reachable, atoms, actions, axioms, _ = explore(task)
+    print("goal relaxed reachable: %s" % relaxed_reachable)
+    print("%d atoms:" % len(atoms))
+    for atom in atoms:
+        print(" ", atom)
+    print()
+    print("%d actions:" % len(actions))
+    for action in actions:
+        action.dump()
+        print()
+    print()
+    print("%d axioms:" % len(axioms))
+    for axiom in axioms:
+        axiom.dump()
+        print()
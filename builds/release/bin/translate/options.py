@@ -0,0 +1,128 @@
+import argparse
+import sys
+
+
+def parse_args():
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument(
+        "domain", help="path to domain pddl file")
+    argparser.add_argument(
+        "task", help="path to task pddl file")
+    argparser.add_argument(
+        "--relaxed", dest="generate_relaxed_task", action="store_true",
+        help="output relaxed task (no delete effects)")
+    argparser.add_argument(
+        "--full-encoding",
+        dest="use_partial_encoding", action="store_false",
+        help="By default we represent facts that occur in multiple "
+        "mutex groups only in one variable. Using this parameter adds "
+        "these facts to multiple variables. This can make the meaning "
+        "of the variables clearer, but increases the number of facts.")
+    argparser.add_argument(
+        "--invariant-generation-max-candidates", default=100000, type=int,
+        help="max number of candidates for invariant generation "
+        "(default: %(default)d). Set to 0 to disable invariant "
+        "generation and obtain only binary variables. The limit is "
+        "needed for grounded input files that would otherwise produce "
+        "too many candidates.")
+    argparser.add_argument(
+        "--sas-file", default="output.sas",
+        help="path to the SAS output file (default: %(default)s)")
+    argparser.add_argument(
+        "--invariant-generation-max-time", default=300, type=int,
+        help="max time for invariant generation (default: %(default)ds)")
+    argparser.add_argument(
+        "--invariant-generation-jobs", default=1, type=int, metavar="N",
+        help="number of processes for checking invariant candidates "
+        "(default: %(default)d). The candidates are checked in rounds, "
+        "and the same invariants are found as with a single process. With "
+        "more than one process, the time limit for invariant generation "
+        "refers to wall-clock time. This is only supported on platforms "
+        "where processes can be forked.")
+    argparser.add_argument(
+        "--add-implied-preconditions", action="store_true",
+        help="infer additional preconditions. This setting can cause a "
+        "severe performance penalty due to weaker relevance analysis "
+        "(see issue7).")
+    argparser.add_argument(
+        "--keep-unreachable-facts",
+        dest="filter_unreachable_facts", action="store_false",
+        help="keep facts that can't be reached from the initial state")
+    argparser.add_argument(
+        "--skip-variable-reordering",
+        dest="reorder_variables", action="store_false",
+        help="do not reorder variables based on the causal graph. Do not use "
+        "this option with the causal graph heuristic!")
+    argparser.add_argument(
+        "--keep-unimportant-variables",
+        dest="filter_unimportant_vars", action="store_false",
+        help="keep variables that do not influence the goal in the causal graph")
+    argparser.add_argument(
+        "--dump-task", action="store_true",
+        help="dump human-readable SAS+ representation of the task")
+    argparser.add_argument(
+        "--layer-strategy", default="min", choices=["min", "max"],
+        help="How to assign layers to derived variables. 'min' attempts to put as "
+        "many variables into the same layer as possible, while 'max' puts each variable "
+        "into its own layer unless it is part of a cycle.")
+    argparser.add_argument(
+        "--pddl-parser", default="lines", choices=["lines", "stream"],
+        help="How to read the PDDL input files. 'lines' tokenizes the input "
+        "line by line, while 'stream' tokenizes it in large chunks and "
+        "builds the nested lists without recursion, which is faster and "
+        "uses less memory on large files. Both produce the same result.")
+    argparser.add_argument(
+        "--domain-cache", metavar="DIR",
+        help="cache the parsed domain in DIR and reuse it when translating "
+        "further tasks of the same domain file. Cache entries are keyed by "
+        "the contents of the domain file and the translator version. The "
+        "invariants found for the domain are cached as well and not "
+        "checked again in further tasks where they are known to hold.")
+    argparser.add_argument(
+        "--datalog-engine", default="queue", choices=["queue", "semi-naive"],
+        help="How to compute the relaxed reachability model. 'queue' "
+        "processes one atom at a time, while 'semi-naive' applies each "
+        "rule to all atoms derived in the previous round at once, which "
+        "is faster on large tasks. Both compute the same model.")
+    argparser.add_argument(
+        "--join-order", default="variables", choices=["variables", "cardinality"],
+        help="How to split rules of the Datalog program into binary joins. "
+        "'variables' greedily joins the conditions that introduce the "
+        "fewest new variables, while 'cardinality' joins the conditions "
+        "with the smallest estimated result, based on the number of facts "
+        "per predicate and the number of objects per type. The estimated "
+        "and actual sizes of the intermediate relations are reported.")
+    argparser.add_argument(
+        "--model-jobs", default=1, type=int, metavar="N",
+        help="number of processes for computing the relaxed reachability "
+        "model (default: %(default)d). Parts of the Datalog program that "
+        "only share static predicates are evaluated in parallel. This is "
+        "only supported on platforms where processes can be forked.")
+    argparser.add_argument(
+        "--rule-statistics", action="store_true",
+        help="report the Datalog rules and the actions and axioms that took "
+        "the most time when computing the relaxed reachability model")
+    argparser.add_argument(
+        "--rule-statistics-file", metavar="FILE",
+        help="write the statistics of all Datalog rules as JSON to FILE")
+    argparser.add_argument(
+        "--stream-actions", action="store_true",
+        help="instantiate the actions on demand while translating them to "
+        "SAS operators instead of keeping all instantiated actions in "
+        "memory. This reduces peak memory on tasks with many actions and "
+        "produces the same output. It is ignored with --dump-task.")
+    return argparser.parse_args()
+
+
+def copy_args_to_module(args):
+    module_dict = sys.modules[__name__].__dict__
+    for key, value in vars(args).items():
+        module_dict[key] = value
+
+
+def setup():
+    args = parse_args()
+    copy_args_to_module(args)
+
+
+setup()
@@ -0,0 +1,41 @@
+from .pddl_types import Type
+from .pddl_types import TypedObject
+
+from .tasks import Task
+from .tasks import Requirements
+
+from .predicates import Predicate
+
+from .functions import Function
+
+from .actions import Action
+from .actions import ActionInstantiator
+from .actions import PropositionalAction
+
+from .axioms import Axiom
+from .axioms import AxiomInstantiator
+from .axioms import PropositionalAxiom
+
+from .conditions import ConditionInstantiator
+from .conditions import FactIndex
+from .conditions import Literal
+from .conditions import Atom
+from .conditions import NegatedAtom
+from .conditions import Falsity
+from .conditions import Truth
+from .conditions import Conjunction
+from .conditions import Disjunction
+from .conditions import UniversalCondition
+from .conditions import ExistentialCondition
+
+from .effects import ConditionalEffect
+from .effects import ConjunctiveEffect
+from .effects import CostEffect
+from .effects import Effect
+from .effects import SimpleEffect
+from .effects import UniversalEffect
+
+from .f_expression import Assign
+from .f_expression import Increase
+from .f_expression import NumericConstant
+from .f_expression import PrimitiveNumericExpression
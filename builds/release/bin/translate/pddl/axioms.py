@@ -0,0 +1,114 @@
+from . import conditions
+
+
+class Axiom:
+    def __init__(self, name, parameters, num_external_parameters, condition):
+        # For an explanation of num_external_parameters, see the
+        # related Action class. Note that num_external_parameters
+        # always equals the arity of the derived predicate.
+        assert 0 <= num_external_parameters <= len(parameters)
+        self.name = name
+        self.parameters = parameters
+        self.num_external_parameters = num_external_parameters
+        self.condition = condition
+        self.uniquify_variables()
+
+    def dump(self):
+        args = map(str, self.parameters[:self.num_external_parameters])
+        print("Axiom %s(%s)" % (self.name, ", ".join(args)))
+        self.condition.dump()
+
+    def uniquify_variables(self):
+        self.type_map = {par.name: par.type_name for par in self.parameters}
+        self.condition = self.condition.uniquify_variables(self.type_map)
+
+    def instantiate(self, var_mapping, init_facts, fluent_facts):
+        # The comments for Action.instantiate apply accordingly.
+        arg_list = [self.name] + [
+            var_mapping[par.name]
+            for par in self.parameters[:self.num_external_parameters]]
+        name = "(%s)" % " ".join(arg_list)
+
+        condition = []
+        try:
+            self.condition.instantiate(var_mapping, init_facts, fluent_facts, condition)
+        except conditions.Impossible:
+            return None
+
+        effect_args = [var_mapping.get(arg.name, arg.name)
+                       for arg in self.parameters[:self.num_external_parameters]]
+        effect = conditions.Atom(self.name, effect_args)
+        return PropositionalAxiom(name, condition, effect)
+
+    def get_instantiator(self, init_facts, fluent_facts):
+        """Return an AxiomInstantiator for instantiating this axiom with
+        many argument tuples. init_facts and fluent_facts are
+        conditions.FactIndex objects of the facts passed to instantiate."""
+        return AxiomInstantiator(self, init_facts, fluent_facts)
+
+
+class AxiomInstantiator(conditions.ConditionInstantiator):
+    """Instantiate an axiom for many argument tuples with the same result
+    as Axiom.instantiate (see ConditionInstantiator)."""
+    def __init__(self, axiom, init_facts, fluent_facts):
+        super().__init__(init_facts, fluent_facts)
+        self.name = axiom.name
+        self.num_parameters = len(axiom.parameters)
+        self.num_external_parameters = axiom.num_external_parameters
+        positions = {par.name: index
+                     for index, par in enumerate(axiom.parameters)}
+        constants = []
+        self.condition = self._compile_condition(
+            axiom.condition, positions, constants)
+        self.constants = tuple(constants)
+
+    def instantiate(self, args):
+        """Return the PropositionalAxiom for the given arguments (the
+        arguments of an atom of the axiom predicate in the model) or None,
+        see Axiom.instantiate."""
+        args = tuple(args[:self.num_parameters])
+        condition = []
+        if (self.condition is None or not self._instantiate_condition(
+                self.condition, args + self.constants, condition)):
+            return None
+        effect_args = args[:self.num_external_parameters]
+        name = "(%s)" % " ".join((self.name,) + effect_args)
+        return PropositionalAxiom(
+            name, condition, conditions.Atom(self.name, effect_args))
+
+
+class PropositionalAxiom:
+    # See PropositionalAction.
+    __slots__ = ["name", "condition", "effect"]
+    def __init__(self, name, condition, effect):
+        self.name = name
+        self.condition = condition
+        self.effect = effect
+
+    def clone(self):
+        return PropositionalAxiom(self.name, list(self.condition), self.effect)
+
+    def dump(self):
+        if self.effect.negated:
+            print("not", end=' ')
+        print(self.name)
+        for fact in self.condition:
+            print("PRE: %s" % fact)
+        print("EFF: %s" % self.effect)
+
+    @property
+    def key(self):
+        return (self.name, self.condition, self.effect)
+
+    def __lt__(self, other):
+        return self.key < other.key
+
+    def __le__(self, other):
+        return self.key <= other.key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+    def __repr__(self):
+        return '<PropositionalAxiom %s %s -> %s>' % (
+            self.name, self.condition, self.effect)
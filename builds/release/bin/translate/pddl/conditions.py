@@ -0,0 +1,394 @@
+# Conditions (of any type) are immutable, because they need to
+# be hashed occasionally. Immutability also allows more efficient comparison
+# based on a precomputed hash value.
+#
+# Careful: Most other classes (e.g. Effects, Axioms, Actions) are not!
+
+import tools
+
+class Condition:
+    def __init__(self, parts):
+        self.parts = tuple(parts)
+        self.hash = hash((self.__class__, self.parts))
+    def __hash__(self):
+        return self.hash
+    def __ne__(self, other):
+        return not self == other
+    def __lt__(self, other):
+        return self.hash < other.hash
+    def __le__(self, other):
+        return self.hash <= other.hash
+    def __reduce__(self):
+        # The precomputed hash value is only valid within the current
+        # process, so we pickle conditions by their constructor arguments.
+        return (self.__class__, (self.parts,))
+    def dump(self, indent="  "):
+        print("%s%s" % (indent, self._dump()))
+        for part in self.parts:
+            part.dump(indent + "  ")
+    def _dump(self):
+        return self.__class__.__name__
+    def _postorder_visit(self, method_name, *args):
+        part_results = [part._postorder_visit(method_name, *args)
+                        for part in self.parts]
+        method = getattr(self, method_name, self._propagate)
+        return method(part_results, *args)
+    def _propagate(self, parts, *args):
+        return self.change_parts(parts)
+    def simplified(self):
+        return self._postorder_visit("_simplified")
+    def relaxed(self):
+        return self._postorder_visit("_relaxed")
+    def untyped(self):
+        return self._postorder_visit("_untyped")
+
+    def uniquify_variables(self, type_map, renamings={}):
+        # Cannot used _postorder_visit because this requires preorder
+        # for quantified effects.
+        if not self.parts:
+            return self
+        else:
+            return self.__class__([part.uniquify_variables(type_map, renamings)
+                                   for part in self.parts])
+    def to_untyped_strips(self):
+        raise ValueError("Not a STRIPS condition: %s" % self.__class__.__name__)
+    def instantiate(self, var_mapping, init_facts, fluent_facts, result):
+        raise ValueError("Cannot instantiate condition: not normalized")
+    def free_variables(self):
+        result = set()
+        for part in self.parts:
+            result |= part.free_variables()
+        return result
+    def has_disjunction(self):
+        for part in self.parts:
+            if part.has_disjunction():
+                return True
+        return False
+    def has_existential_part(self):
+        for part in self.parts:
+            if part.has_existential_part():
+                return True
+        return False
+    def has_universal_part(self):
+        for part in self.parts:
+            if part.has_universal_part():
+                return True
+        return False
+
+class ConstantCondition(Condition):
+    # Defining __eq__ blocks inheritance of __hash__, so must set it explicitly.
+    __hash__ = Condition.__hash__
+    parts = ()
+    def __init__(self):
+        self.hash = hash(self.__class__)
+    def __reduce__(self):
+        return (self.__class__, ())
+    def change_parts(self, parts):
+        return self
+    def __eq__(self, other):
+        return self.__class__ is other.__class__
+
+class Impossible(Exception):
+    pass
+
+class Falsity(ConstantCondition):
+    def instantiate(self, var_mapping, init_facts, fluent_facts, result):
+        raise Impossible()
+    def negate(self):
+        return Truth()
+
+class Truth(ConstantCondition):
+    def to_untyped_strips(self):
+        return []
+    def instantiate(self, var_mapping, init_facts, fluent_facts, result):
+        pass
+    def negate(self):
+        return Falsity()
+
+class JunctorCondition(Condition):
+    # Defining __eq__ blocks inheritance of __hash__, so must set it explicitly.
+    __hash__ = Condition.__hash__
+    def __eq__(self, other):
+        # Compare hash first for speed reasons.
+        return (self.hash == other.hash and
+                self.__class__ is other.__class__ and
+                self.parts == other.parts)
+    def change_parts(self, parts):
+        return self.__class__(parts)
+
+class Conjunction(JunctorCondition):
+    def _simplified(self, parts):
+        result_parts = []
+        for part in parts:
+            if isinstance(part, Conjunction):
+                result_parts += part.parts
+            elif isinstance(part, Falsity):
+                return Falsity()
+            elif not isinstance(part, Truth):
+                result_parts.append(part)
+        if not result_parts:
+            return Truth()
+        if len(result_parts) == 1:
+            return result_parts[0]
+        return Conjunction(result_parts)
+    def to_untyped_strips(self):
+        result = []
+        for part in self.parts:
+            result += part.to_untyped_strips()
+        return result
+    def instantiate(self, var_mapping, init_facts, fluent_facts, result):
+        assert not result, "Condition not simplified"
+        for part in self.parts:
+            part.instantiate(var_mapping, init_facts, fluent_facts, result)
+    def negate(self):
+        return Disjunction([p.negate() for p in self.parts])
+
+class Disjunction(JunctorCondition):
+    def _simplified(self, parts):
+        result_parts = []
+        for part in parts:
+            if isinstance(part, Disjunction):
+                result_parts += part.parts
+            elif isinstance(part, Truth):
+                return Truth()
+            elif not isinstance(part, Falsity):
+                result_parts.append(part)
+        if not result_parts:
+            return Falsity()
+        if len(result_parts) == 1:
+            return result_parts[0]
+        return Disjunction(result_parts)
+    def negate(self):
+        return Conjunction([p.negate() for p in self.parts])
+    def has_disjunction(self):
+        return True
+
+class QuantifiedCondition(Condition):
+    # Defining __eq__ blocks inheritance of __hash__, so must set it explicitly.
+    __hash__ = Condition.__hash__
+    def __init__(self, parameters, parts):
+        self.parameters = tuple(parameters)
+        self.parts = tuple(parts)
+        self.hash = hash((self.__class__, self.parameters, self.parts))
+    def __reduce__(self):
+        return (self.__class__, (self.parameters, self.parts))
+    def __eq__(self, other):
+        # Compare hash first for speed reasons.
+        return (self.hash == other.hash and
+                self.__class__ is other.__class__ and
+                self.parameters == other.parameters and
+                self.parts == other.parts)
+    def _dump(self, indent="  "):
+        arglist = ", ".join(map(str, self.parameters))
+        return "%s %s" % (self.__class__.__name__, arglist)
+    def _simplified(self, parts):
+        if isinstance(parts[0], ConstantCondition):
+            return parts[0]
+        else:
+            return self._propagate(parts)
+
+    def uniquify_variables(self, type_map, renamings={}):
+        renamings = dict(renamings) # Create a copy.
+        new_parameters = [par.uniquify_name(type_map, renamings)
+                          for par in self.parameters]
+        new_parts = (self.parts[0].uniquify_variables(type_map, renamings),)
+        return self.__class__(new_parameters, new_parts)
+
+    def free_variables(self):
+        result = Condition.free_variables(self)
+        for par in self.parameters:
+            result.discard(par.name)
+        return result
+    def change_parts(self, parts):
+        return self.__class__(self.parameters, parts)
+
+class UniversalCondition(QuantifiedCondition):
+    def _untyped(self, parts):
+        type_literals = [par.get_atom().negate() for par in self.parameters]
+        return UniversalCondition(self.parameters,
+                                  [Disjunction(type_literals + parts)])
+    def negate(self):
+        return ExistentialCondition(self.parameters, [p.negate() for p in self.parts])
+    def has_universal_part(self):
+        return True
+
+class ExistentialCondition(QuantifiedCondition):
+    def _untyped(self, parts):
+        type_literals = [par.get_atom() for par in self.parameters]
+        return ExistentialCondition(self.parameters,
+                                    [Conjunction(type_literals + parts)])
+    def negate(self):
+        return UniversalCondition(self.parameters, [p.negate() for p in self.parts])
+    def instantiate(self, var_mapping, init_facts, fluent_facts, result):
+        assert not result, "Condition not simplified"
+        self.parts[0].instantiate(var_mapping, init_facts, fluent_facts, result)
+    def has_existential_part(self):
+        return True
+
+class Literal(Condition):
+    # Defining __eq__ blocks inheritance of __hash__, so must set it explicitly.
+    __hash__ = Condition.__hash__
+    parts = []
+    __slots__ = ["predicate", "args", "hash"]
+    def __init__(self, predicate, args):
+        self.predicate = predicate
+        self.args = tuple(args)
+        self.hash = hash((self.__class__, self.predicate, self.args))
+    def __reduce__(self):
+        return (self.__class__, (self.predicate, self.args))
+    def __eq__(self, other):
+        # Compare hash first for speed reasons.
+        return (self.hash == other.hash and
+                self.__class__ is other.__class__ and
+                self.predicate == other.predicate and
+                self.args == other.args)
+    def __ne__(self, other):
+        return not self == other
+    @property
+    def key(self):
+        return str(self.predicate), self.args
+    def __lt__(self, other):
+        return self.key < other.key
+    def __le__(self, other):
+        return self.key <= other.key
+    def __str__(self):
+        return "%s %s(%s)" % (self.__class__.__name__, self.predicate,
+                              ", ".join(map(str, self.args)))
+    def __repr__(self):
+        return '<%s>' % self
+    def _dump(self):
+        return str(self)
+    def change_parts(self, parts):
+        return self
+    def uniquify_variables(self, type_map, renamings={}):
+        return self.rename_variables(renamings)
+    def rename_variables(self, renamings):
+        new_args = tuple(renamings.get(arg, arg) for arg in self.args)
+        return self.__class__(self.predicate, new_args)
+    def replace_argument(self, position, new_arg):
+        new_args = list(self.args)
+        new_args[position] = new_arg
+        return self.__class__(self.predicate, new_args)
+    def free_variables(self):
+        return {arg for arg in self.args if arg[0] == "?"}
+
+class Atom(Literal):
+    negated = False
+    def to_untyped_strips(self):
+        return [self]
+    def instantiate(self, var_mapping, init_facts, fluent_facts, result):
+        args = [var_mapping.get(arg, arg) for arg in self.args]
+        atom = Atom(self.predicate, args)
+        if atom in fluent_facts:
+            result.append(atom)
+        elif atom not in init_facts:
+            raise Impossible()
+    def negate(self):
+        return NegatedAtom(self.predicate, self.args)
+    def positive(self):
+        return self
+
+class NegatedAtom(Literal):
+    negated = True
+    def _relaxed(self, parts):
+        return Truth()
+    def instantiate(self, var_mapping, init_facts, fluent_facts, result):
+        args = [var_mapping.get(arg, arg) for arg in self.args]
+        atom = Atom(self.predicate, args)
+        if atom in fluent_facts:
+            result.append(NegatedAtom(self.predicate, args))
+        elif atom in init_facts:
+            raise Impossible()
+    def negate(self):
+        return Atom(self.predicate, self.args)
+    positive = negate
+
+
+class FactIndex:
+    """Index a set of atoms by predicate and argument tuple.
+
+    This lets instantiated literals be looked up by their argument tuple
+    without creating an Atom (and computing its hash) for each of them."""
+    def __init__(self, atoms):
+        self.atoms_by_predicate = {}
+        for atom in atoms:
+            self.atoms_by_predicate.setdefault(
+                atom.predicate, {})[atom.args] = atom
+
+    def get_atoms(self, predicate):
+        """Return a dict from the argument tuples of the indexed atoms with
+        the given predicate to the atoms."""
+        return self.atoms_by_predicate.get(predicate, {})
+
+
+class ConditionInstantiator:
+    """Base class for instantiating the conditions of an action or axiom
+    for many argument tuples with the same result as
+    Condition.instantiate.
+
+    The literals of a condition are compiled into templates (negated,
+    predicate, getter, fluent_atoms, init_atoms) once. The getter selects
+    the arguments of the literal from the tuple of the arguments of the
+    action or axiom, followed by the constants used in the literals.
+    fluent_atoms and init_atoms are the entries of the FactIndex objects
+    for the predicate, so the arguments are looked up directly, and a
+    false condition is reported by the return value instead of the
+    Impossible exception."""
+    def __init__(self, init_facts, fluent_facts):
+        self.init_facts = init_facts
+        self.fluent_facts = fluent_facts
+
+    def _compile_args(self, args, positions, constants):
+        """Return the getter for the given arguments. The positions of
+        constants follow the positions of the variables."""
+        arg_positions = []
+        for arg in args:
+            if arg in positions:
+                arg_positions.append(positions[arg])
+            else:
+                if arg not in constants:
+                    constants.append(arg)
+                arg_positions.append(len(positions) + constants.index(arg))
+        return tools.get_tuple_getter(arg_positions)
+
+    def _compile_condition(self, condition, positions, constants):
+        """Return the list of templates for the literals of the condition or
+        None if the condition is always false."""
+        if isinstance(condition, Literal):
+            return [(condition.negated, condition.predicate,
+                     self._compile_args(condition.args, positions, constants),
+                     self.fluent_facts.get_atoms(condition.predicate),
+                     self.init_facts.get_atoms(condition.predicate))]
+        elif isinstance(condition, Truth):
+            return []
+        elif isinstance(condition, Falsity):
+            return None
+        elif isinstance(condition, Conjunction):
+            result = []
+            for part in condition.parts:
+                part_templates = self._compile_condition(
+                    part, positions, constants)
+                if part_templates is None:
+                    return None
+                result += part_templates
+            return result
+        elif isinstance(condition, ExistentialCondition):
+            return self._compile_condition(
+                condition.parts[0], positions, constants)
+        raise ValueError("Cannot instantiate condition: not normalized")
+
+    def _instantiate_condition(self, templates, args, result):
+        """Append the fluent literals of the condition instantiated with args
+        to result. Return False if the condition is false in the initial
+        state and only has static literals (see Literal.instantiate)."""
+        for negated, predicate, get_args, fluent_atoms, init_atoms in templates:
+            literal_args = get_args(args)
+            atom = fluent_atoms.get(literal_args)
+            if atom is not None:
+                if negated:
+                    result.append(NegatedAtom(predicate, literal_args))
+                else:
+                    result.append(atom)
+            elif (literal_args in init_atoms) == negated:
+                return False
+        return True
@@ -0,0 +1,10 @@
+class Predicate:
+    def __init__(self, name, arguments):
+        self.name = name
+        self.arguments = arguments
+
+    def __str__(self):
+        return "%s(%s)" % (self.name, ", ".join(map(str, self.arguments)))
+
+    def get_arity(self):
+        return len(self.arguments)
@@ -0,0 +1 @@
+from .pddl_file import open
@@ -0,0 +1,174 @@
+import gc
+import io
+import re
+import sys
+
+__all__ = ["ParseError", "parse_nested_list", "parse_nested_list_streaming"]
+
+class ParseError(Exception):
+    def __init__(self, value):
+        self.value = value
+    def __str__(self):
+        return self.value
+
+# Basic functions for parsing PDDL (Lisp) files.
+#
+# All tokens are interned, so that all occurrences of the same name in the
+# task share one string object. This saves a lot of memory for large tasks,
+# and comparisons of names (e.g. in Atom.__eq__) succeed on identity.
+def parse_nested_list(input_file):
+    tokens = tokenize(input_file)
+    next_token = next(tokens)
+    if next_token != "(":
+        raise ParseError("Expected '(', got %s." % next_token)
+    result = list(parse_list_aux(tokens))
+    for tok in tokens:  # Check that generator is exhausted.
+        raise ParseError("Unexpected token: %s." % tok)
+    return result
+
+def tokenize(input):
+    for line in input:
+        line = line.split(";", 1)[0]  # Strip comments.
+        check_ascii(line)
+        line = line.replace("(", " ( ").replace(")", " ) ").replace("?", " ?")
+        for token in line.split():
+            yield sys.intern(token.lower())
+
+def check_ascii(line):
+    try:
+        line.encode("ascii")
+    except UnicodeEncodeError:
+        raise ParseError("Non-ASCII character outside comment: %s" %
+                         line[0:-1])
+
+def parse_list_aux(tokenstream):
+    # Leading "(" has already been swallowed.
+    while True:
+        try:
+            token = next(tokenstream)
+        except StopIteration:
+            raise ParseError("Missing ')'")
+        if token == ")":
+            return
+        elif token == "(":
+            yield list(parse_list_aux(tokenstream))
+        else:
+            yield token
+
+
+# Streaming variant of the functions above. The input is read in large
+# chunks that are tokenized with a single regular expression each, and
+# nested lists are built with an explicit stack rather than with
+# recursive generators. The result is identical to parse_nested_list.
+
+# Number of characters read at once. Chunks are extended to the end of
+# the line, so comments and tokens never span two chunks.
+CHUNK_SIZE = 2 ** 20
+
+COMMENT_REGEX = re.compile(r";[^\n]*")
+NON_ASCII_REGEX = re.compile(r"[^\x00-\x7f]")
+# "?" always starts a new atom.
+ATOM_PATTERN = r"\?[^\s()?]*|[^\s()?]+"
+ATOM_REGEX = re.compile(ATOM_PATTERN)
+# Matches a complete list without nested lists, a single parenthesis or
+# a single atom. Matching innermost lists at once avoids a Python-level
+# loop iteration for each of their atoms, which make up most of the
+# tokens of typical PDDL files.
+TOKEN_REGEX = re.compile(r"\([^()]*\)|[()]|" + ATOM_PATTERN)
+
+def parse_nested_list_streaming(input_file, section_handlers=None):
+    """Parse input_file (an open text file) like parse_nested_list.
+
+    section_handlers optionally maps the first token of a top-level
+    section (e.g. ":init") to a function that is called on every
+    element of that section as soon as the element has been parsed. The
+    return value of the function replaces the element in the result, so
+    that the nested lists of large sections never exist all at once."""
+    # The parser allocates many small lists, none of which are part of
+    # reference cycles, but each of which counts towards triggering the
+    # cyclic garbage collector. Collecting is pointless here and more
+    # expensive than the parsing itself, so we suspend it.
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _parse_nested_list_streaming(input_file, section_handlers or {})
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+def _parse_nested_list_streaming(input_file, section_handlers):
+    result = None
+    current = None
+    ancestors = []
+    for tokens in tokenize_streaming(input_file):
+        for token in tokens:
+            first_char = token[0]
+            if first_char == ")":
+                if current is None:
+                    _raise_outside_list(result, token)
+                if not ancestors:
+                    current = None
+                    continue
+                current = ancestors.pop()
+            elif first_char != "(":
+                if current is None:
+                    _raise_outside_list(result, token)
+                current.append(sys.intern(token))
+                continue
+            elif len(token) == 1:
+                new_list = []
+                if current is None:
+                    if result is not None:
+                        _raise_outside_list(result, token)
+                    result = current = new_list
+                else:
+                    current.append(new_list)
+                    ancestors.append(current)
+                    current = new_list
+                continue
+            else:
+                # A complete list without nested lists.
+                if "?" in token:
+                    atoms = ATOM_REGEX.findall(token)
+                else:
+                    atoms = token[1:-1].split()
+                new_list = list(map(sys.intern, atoms))
+                if current is None:
+                    if result is not None:
+                        _raise_outside_list(result, "(")
+                    result = new_list
+                    continue
+                current.append(new_list)
+            if len(ancestors) == 1 and section_handlers:
+                # We just completed an element of a top-level section.
+                section_tag = current[0]
+                if isinstance(section_tag, str):
+                    handler = section_handlers.get(section_tag)
+                    if handler is not None:
+                        current[-1] = handler(current[-1])
+    if result is None:
+        raise ParseError("Expected '(', got end of file.")
+    if current is not None:
+        raise ParseError("Missing ')'")
+    return result
+
+def _raise_outside_list(result, token):
+    if result is None:
+        raise ParseError("Expected '(', got %s." % token)
+    raise ParseError("Unexpected token: %s." % token)
+
+def tokenize_streaming(input_file):
+    """Yield the tokens of input_file as one list per chunk. Innermost
+    lists are returned as a single token including the parentheses."""
+    while True:
+        chunk = input_file.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        if not chunk.endswith("\n"):
+            chunk += input_file.readline()
+        text = COMMENT_REGEX.sub("", chunk)
+        if NON_ASCII_REGEX.search(text):
+            # Report the offending line exactly like tokenize does.
+            for line in io.StringIO(chunk):
+                check_ascii(line.split(";", 1)[0])
+        yield TOKEN_REGEX.findall(text.lower())
@@ -0,0 +1,47 @@
+import domain_cache
+import options
+
+from . import lisp_parser
+from . import parsing_functions
+
+file_open = open
+
+
+def parse_pddl_file(type, filename, section_handlers=None):
+    try:
+        # The builtin open function is shadowed by this module's open function.
+        # We use the Latin-1 encoding (which allows a superset of ASCII, of the
+        # Latin-* encodings and of UTF-8) to allow special characters in
+        # comments. In all other parts, we later validate that only ASCII is
+        # used.
+        with file_open(filename, encoding='ISO-8859-1') as input_file:
+            if options.pddl_parser == "stream":
+                return lisp_parser.parse_nested_list_streaming(
+                    input_file, section_handlers)
+            else:
+                return lisp_parser.parse_nested_list(input_file)
+    except OSError as e:
+        raise SystemExit("Error: Could not read file: %s\nReason: %s." %
+                         (e.filename, e))
+    except lisp_parser.ParseError as e:
+        raise SystemExit("Error: Could not parse %s file: %s\nReason: %s." %
+                         (type, filename, e))
+
+
+def open(domain_filename=None, task_filename=None):
+    task_filename = task_filename or options.task
+    domain_filename = domain_filename or options.domain
+
+    domain = domain_cache.load(domain_filename, "domain")
+    if domain is None:
+        domain_pddl = parse_pddl_file("domain", domain_filename)
+        domain = parsing_functions.parse_domain(domain_pddl)
+        domain_cache.store(domain_filename, "domain", domain)
+    else:
+        print("Using cached domain.")
+    # The streaming parser converts initial facts while it reads them.
+    task_pddl = parse_pddl_file(
+        "task", task_filename,
+        {":init": parsing_functions.parse_init_fact})
+
+    return parsing_functions.parse_task_with_domain(domain, task_pddl)
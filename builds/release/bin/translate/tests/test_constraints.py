@@ -0,0 +1,59 @@
+import itertools
+import random
+
+import constraints
+
+
+def is_solvable_by_enumeration(system):
+    for assignments in itertools.product(*system.combinatorial_assignments):
+        equalities = []
+        for assignment in assignments:
+            equalities.extend(assignment.equalities)
+        combined = constraints.Assignment(equalities)
+        if not combined.is_consistent():
+            continue
+        mapping = combined.get_mapping()
+        if all(clause.apply_mapping(mapping).is_satisfiable()
+               for clause in system.neg_clauses):
+            return True
+    return False
+
+
+def get_random_system(rng):
+    symbols = ["?a", "?b", "?c", "?d", "x", "y", "z"]
+    def get_pair():
+        return tuple(rng.choice(symbols) for _ in range(2))
+    system = constraints.ConstraintSystem()
+    for _ in range(rng.randint(0, 4)):
+        system.add_assignment_disjunction(
+            [constraints.Assignment(
+                [get_pair() for _ in range(rng.randint(0, 3))])
+             for _ in range(rng.randint(0, 3))])
+    for _ in range(rng.randint(0, 3)):
+        system.add_negative_clause(constraints.NegativeClause(
+            [get_pair() for _ in range(rng.randint(1, 2))]))
+    return system
+
+
+def test_is_solvable():
+    rng = random.Random(2020)
+    for _ in range(2000):
+        system = get_random_system(rng)
+        expected = is_solvable_by_enumeration(system)
+        assert system.is_solvable() == expected, str(system)
+        # The second call is answered from the cache.
+        assert system.is_solvable() == expected, str(system)
+
+
+def test_key_ignores_order_and_symmetry():
+    system1 = constraints.ConstraintSystem()
+    system1.add_assignment_disjunction([
+        constraints.Assignment([("?a", "?b"), ("?c", "x")]),
+        constraints.Assignment([("?a", "y")])])
+    system1.add_negative_clause(constraints.NegativeClause([("?a", "?c")]))
+    system2 = constraints.ConstraintSystem()
+    system2.add_negative_clause(constraints.NegativeClause([("?c", "?a")]))
+    system2.add_assignment_disjunction([
+        constraints.Assignment([("?a", "y")]),
+        constraints.Assignment([("x", "?c"), ("?b", "?a")])])
+    assert system1.get_key() == system2.get_key()
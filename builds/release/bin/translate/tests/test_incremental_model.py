@@ -0,0 +1,61 @@
+import os.path
+import subprocess
+import sys
+
+import pytest
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+TRANSLATE_DIR = os.path.dirname(DIR)
+REPO = os.path.abspath(os.path.join(DIR, "..", "..", ".."))
+BENCHMARKS = os.path.join(REPO, "misc", "tests", "benchmarks")
+TASKS = [
+    ("gripper", "prob01.pddl"),
+    ("miconic-simpleadl", "s1-0.pddl"),
+    ("philosophers", "p01-phil2.pddl"),
+]
+
+# Importing the translator modules parses the command line, so the check
+# runs in a separate process. It explores variants of the task with some
+# initial facts removed and added back, and compares the result of each
+# update of the model to exploring the variant from scratch.
+CHECK = """
+import sys
+import instantiate
+import normalize
+import pddl
+import pddl_parser
+
+def load_task(removed):
+    task = pddl_parser.open()
+    normalize.normalize(task)
+    task.init = [fact for index, fact in enumerate(task.init)
+                 if index not in removed]
+    return task
+
+def describe(result):
+    relaxed_reachable, atoms, actions, axioms, _ = result
+    return (relaxed_reachable, sorted(map(str, atoms)),
+            sorted(action.name for action in actions),
+            sorted(str(axiom.name) + str(axiom.condition) for axiom in axioms))
+
+num_facts = len(load_task(set()).init)
+variants = [
+    set(range(0, num_facts, 3)),
+    set(range(num_facts // 2)),
+    set(range(1, num_facts, 3)),
+    set(),
+]
+explorer = instantiate.Explorer(load_task(set()))
+for removed in variants:
+    expected = describe(instantiate.explore(load_task(removed)))
+    actual = describe(explorer.explore(load_task(removed)))
+    assert expected == actual, sorted(removed)
+"""
+
+@pytest.mark.parametrize("domain_name, problem_name", TASKS)
+def test_incremental_model(domain_name, problem_name):
+    domain = os.path.join(BENCHMARKS, domain_name, "domain.pddl")
+    problem = os.path.join(BENCHMARKS, domain_name, problem_name)
+    subprocess.check_call(
+        [sys.executable, "-c", CHECK, domain, problem],
+        cwd=TRANSLATE_DIR, stdout=subprocess.DEVNULL)
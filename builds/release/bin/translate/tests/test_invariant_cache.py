@@ -0,0 +1,74 @@
+import os.path
+import subprocess
+import sys
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+TRANSLATE_DIR = os.path.dirname(DIR)
+REPO = os.path.abspath(os.path.join(DIR, "..", "..", ".."))
+BENCHMARKS = os.path.join(REPO, "misc", "tests", "benchmarks")
+DOMAIN = os.path.join(BENCHMARKS, "gripper", "domain.pddl")
+PROBLEM = os.path.join(BENCHMARKS, "gripper", "prob01.pddl")
+
+# Importing the translator modules parses the command line, so the check
+# runs in a separate process. It stores invariants proven with given
+# inequalities of the action pick(?obj, ?room, ?gripper) and checks for
+# which inequalities they are loaded again.
+CHECK = """
+import invariant_finder
+import normalize
+import pddl_parser
+
+task = pddl_parser.open()
+normalize.normalize(task)
+[pick_index] = [index for index, action in enumerate(task.actions)
+                if action.name == "pick"]
+
+def get_inequal_params(pick_inequal_params):
+    inequal_params = [[] for _ in task.actions]
+    inequal_params[pick_index] = pick_inequal_params
+    return inequal_params
+
+def get_candidates(inequal_params, balanced):
+    balance_checker = invariant_finder.BalanceChecker(
+        task, None, inequal_params)
+    return {candidate
+            for candidate in invariant_finder.get_initial_invariants(task)
+            if candidate.check_balance(balance_checker, lambda _: None) ==
+            balanced}
+
+def load(pick_inequal_params):
+    return invariant_finder.load_proven_invariants(
+        task, get_inequal_params(pick_inequal_params))
+
+params_a = [(0, 1), (0, 2)]
+params_b = [(0, 2), (1, 2)]
+common_params = [(0, 2)]
+# Invariants without inequalities hold for all tasks. The unbalanced
+# candidates are stored as well to see which invariants are kept.
+invariants = get_candidates(get_inequal_params([]), True)
+non_invariants = get_candidates(get_inequal_params(common_params), False)
+assert invariants and non_invariants
+
+invariant_finder.store_proven_invariants(
+    task, get_inequal_params(params_a), invariants | non_invariants)
+assert load(params_a) == invariants | non_invariants
+assert load([(0, 1), (0, 2), (1, 2)]) == invariants | non_invariants
+assert load(params_b) == set()
+assert load([(0, 1)]) == set()
+
+# Storing invariants for other inequalities merges the entries. The
+# merged entry only uses the common inequalities, with which the
+# unbalanced candidates are refuted.
+invariant_finder.store_proven_invariants(
+    task, get_inequal_params(params_b), invariants)
+assert load(params_a) == invariants
+assert load(params_b) == invariants
+assert load(common_params) == invariants
+assert load([(0, 1)]) == set()
+"""
+
+def test_invariant_cache(tmpdir):
+    subprocess.check_call(
+        [sys.executable, "-c", CHECK, DOMAIN, PROBLEM,
+         "--domain-cache", str(tmpdir.join("cache"))],
+        cwd=TRANSLATE_DIR, stdout=subprocess.DEVNULL)
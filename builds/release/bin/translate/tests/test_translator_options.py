@@ -0,0 +1,129 @@
+import filecmp
+import json
+import os.path
+import subprocess
+import sys
+
+import pytest
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+TRANSLATE_DIR = os.path.dirname(DIR)
+REPO = os.path.abspath(os.path.join(DIR, "..", "..", ".."))
+BENCHMARKS = os.path.join(REPO, "misc", "tests", "benchmarks")
+REGRESSION_TESTS = os.path.join(TRANSLATE_DIR, "regression-tests")
+TASKS = [
+    ("gripper", "prob01.pddl"),
+    ("miconic-simpleadl", "s1-0.pddl"),
+    ("philosophers", "p01-phil2.pddl"),
+]
+# Options that change how the translator computes its result, but not
+# the result itself.
+EQUIVALENT_OPTIONS = [
+    ["--pddl-parser", "stream"],
+    ["--datalog-engine", "semi-naive"],
+    ["--join-order", "cardinality"],
+    ["--model-jobs", "2"],
+    ["--invariant-generation-jobs", "2"],
+    ["--rule-statistics"],
+    ["--stream-actions"],
+]
+
+def translate(domain, problem, sas_file, options):
+    subprocess.check_call(
+        [sys.executable, "translate.py", domain, problem,
+         "--sas-file", sas_file] + options,
+        cwd=TRANSLATE_DIR, stdout=subprocess.DEVNULL)
+
+@pytest.mark.parametrize("options", EQUIVALENT_OPTIONS, ids=" ".join)
+def test_equivalent_options(options, tmpdir):
+    for domain_name, problem_name in TASKS:
+        domain = os.path.join(BENCHMARKS, domain_name, "domain.pddl")
+        problem = os.path.join(BENCHMARKS, domain_name, problem_name)
+        expected = str(tmpdir.join("expected.sas"))
+        actual = str(tmpdir.join("actual.sas"))
+        translate(domain, problem, expected, [])
+        translate(domain, problem, actual, options)
+        assert filecmp.cmp(expected, actual, shallow=False), domain_name
+
+def test_domain_cache(tmpdir):
+    cache_dir = str(tmpdir.join("cache"))
+    for domain_name, problem_name in TASKS:
+        domain = os.path.join(BENCHMARKS, domain_name, "domain.pddl")
+        problem = os.path.join(BENCHMARKS, domain_name, problem_name)
+        expected = str(tmpdir.join("expected.sas"))
+        translate(domain, problem, expected, [])
+        # The first run fills the cache, the second one uses it.
+        for _ in range(2):
+            actual = str(tmpdir.join("actual.sas"))
+            translate(domain, problem, actual, ["--domain-cache", cache_dir])
+            assert filecmp.cmp(expected, actual, shallow=False), domain_name
+    assert len(tmpdir.join("cache").listdir("*-domain.pickle")) == len(TASKS)
+    assert len(tmpdir.join("cache").listdir("*-invariants-*.pickle")) == len(TASKS)
+
+# The left gripper is also a room, so the robot can pick and drop with the
+# left gripper in the left room. Unlike in prob01, the room and gripper
+# parameters of pick and drop are not always different.
+GRIPPER_PROBLEM = """
+(define (problem gripper-room-and-gripper)
+   (:domain gripper-strips)
+   (:objects rooma left right ball1 ball2)
+   (:init (room rooma) (room left) (ball ball1) (ball ball2)
+          (at-robby rooma) (free left) (free right)
+          (at ball1 rooma) (at ball2 rooma)
+          (gripper left) (gripper right))
+   (:goal (and (at ball1 left) (at ball2 left))))
+"""
+
+def test_domain_cache_with_several_problems(tmpdir):
+    cache_dir = str(tmpdir.join("cache"))
+    domain = os.path.join(BENCHMARKS, "gripper", "domain.pddl")
+    other_problem = tmpdir.join("problem.pddl")
+    other_problem.write(GRIPPER_PROBLEM)
+    problems = [os.path.join(BENCHMARKS, "gripper", "prob01.pddl"),
+                str(other_problem)]
+    # The invariants cached for prob01 use inequalities that the other
+    # problem does not have, so the other problem cannot reuse them. After
+    # that, the cache entry only uses the inequalities that both problems
+    # have and is reused for both.
+    for problem, uses_cached_invariants in zip(
+            problems + problems, [False, False, True, True]):
+        expected = str(tmpdir.join("expected.sas"))
+        actual = str(tmpdir.join("actual.sas"))
+        translate(domain, problem, expected, [])
+        output = subprocess.check_output(
+            [sys.executable, "translate.py", domain, problem,
+             "--sas-file", actual, "--domain-cache", cache_dir],
+            cwd=TRANSLATE_DIR, universal_newlines=True)
+        assert filecmp.cmp(expected, actual, shallow=False), problem
+        assert ("cached invariants" in output) == uses_cached_invariants
+
+def get_rule_statistics(filename):
+    # The times differ between runs.
+    with open(filename) as statistics_file:
+        return sorted((result["rule"], result["origin"], result["fires"],
+                       result["derived atoms"], result["duplicate atoms"])
+                      for result in json.load(statistics_file))
+
+@pytest.mark.parametrize("engine", ["queue", "semi-naive"])
+def test_parallel_model(engine, tmpdir):
+    # The goal only mentions the robot, so the rules for the robot and the
+    # drone form two independent components of the Datalog program.
+    domain = os.path.join(REGRESSION_TESTS, "two-agents-domain.pddl")
+    problem = os.path.join(REGRESSION_TESTS, "two-agents-problem.pddl")
+    results = []
+    for model_jobs in ["1", "2"]:
+        sas_file = str(tmpdir.join("output%s.sas" % model_jobs))
+        statistics_file = str(tmpdir.join("statistics%s.json" % model_jobs))
+        output = subprocess.check_output(
+            [sys.executable, "translate.py", domain, problem,
+             "--sas-file", sas_file, "--datalog-engine", engine,
+             "--model-jobs", model_jobs,
+             "--rule-statistics-file", statistics_file],
+            cwd=TRANSLATE_DIR, universal_newlines=True)
+        results.append((sas_file, statistics_file, output))
+    (expected_sas, expected_statistics, _), (actual_sas, actual_statistics,
+                                            output) = results
+    assert "2 independent components" in output
+    assert filecmp.cmp(expected_sas, actual_sas, shallow=False)
+    assert (get_rule_statistics(expected_statistics) ==
+            get_rule_statistics(actual_statistics))
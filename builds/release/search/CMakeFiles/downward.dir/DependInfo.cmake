@@ -0,0 +1,227 @@
+
+# Consider dependencies only in project.
+set(CMAKE_DEPENDS_IN_PROJECT_ONLY OFF)
+
+# The set of languages for which implicit dependencies are needed:
+set(CMAKE_DEPENDS_LANGUAGES
+  )
+
+# The set of dependency files which are needed:
+set(CMAKE_DEPENDS_DEPENDENCY_FILES
+  "/root/package/src/search/abstract_task.cc" "search/CMakeFiles/downward.dir/abstract_task.cc.o" "gcc" "search/CMakeFiles/downward.dir/abstract_task.cc.o.d"
+  "/root/package/src/search/algorithms/equivalence_relation.cc" "search/CMakeFiles/downward.dir/algorithms/equivalence_relation.cc.o" "gcc" "search/CMakeFiles/downward.dir/algorithms/equivalence_relation.cc.o.d"
+  "/root/package/src/search/algorithms/int_packer.cc" "search/CMakeFiles/downward.dir/algorithms/int_packer.cc.o" "gcc" "search/CMakeFiles/downward.dir/algorithms/int_packer.cc.o.d"
+  "/root/package/src/search/algorithms/max_cliques.cc" "search/CMakeFiles/downward.dir/algorithms/max_cliques.cc.o" "gcc" "search/CMakeFiles/downward.dir/algorithms/max_cliques.cc.o.d"
+  "/root/package/src/search/algorithms/sccs.cc" "search/CMakeFiles/downward.dir/algorithms/sccs.cc.o" "gcc" "search/CMakeFiles/downward.dir/algorithms/sccs.cc.o.d"
+  "/root/package/src/search/axioms.cc" "search/CMakeFiles/downward.dir/axioms.cc.o" "gcc" "search/CMakeFiles/downward.dir/axioms.cc.o.d"
+  "/root/package/src/search/cegar/abstract_search.cc" "search/CMakeFiles/downward.dir/cegar/abstract_search.cc.o" "gcc" "search/CMakeFiles/downward.dir/cegar/abstract_search.cc.o.d"
+  "/root/package/src/search/cegar/abstract_state.cc" "search/CMakeFiles/downward.dir/cegar/abstract_state.cc.o" "gcc" "search/CMakeFiles/downward.dir/cegar/abstract_state.cc.o.d"
+  "/root/package/src/search/cegar/abstraction.cc" "search/CMakeFiles/downward.dir/cegar/abstraction.cc.o" "gcc" "search/CMakeFiles/downward.dir/cegar/abstraction.cc.o.d"
+  "/root/package/src/search/cegar/additive_cartesian_heuristic.cc" "search/CMakeFiles/downward.dir/cegar/additive_cartesian_heuristic.cc.o" "gcc" "search/CMakeFiles/downward.dir/cegar/additive_cartesian_heuristic.cc.o.d"
+  "/root/package/src/search/cegar/cartesian_heuristic_function.cc" "search/CMakeFiles/downward.dir/cegar/cartesian_heuristic_function.cc.o" "gcc" "search/CMakeFiles/downward.dir/cegar/cartesian_heuristic_function.cc.o.d"
+  "/root/package/src/search/cegar/cartesian_set.cc" "search/CMakeFiles/downward.dir/cegar/cartesian_set.cc.o" "gcc" "search/CMakeFiles/downward.dir/cegar/cartesian_set.cc.o.d"
+  "/root/package/src/search/cegar/cegar.cc" "search/CMakeFiles/downward.dir/cegar/cegar.cc.o" "gcc" "search/CMakeFiles/downward.dir/cegar/cegar.cc.o.d"
+  "/root/package/src/search/cegar/cost_saturation.cc" "search/CMakeFiles/downward.dir/cegar/cost_saturation.cc.o" "gcc" "search/CMakeFiles/downward.dir/cegar/cost_saturation.cc.o.d"
+  "/root/package/src/search/cegar/refinement_hierarchy.cc" "search/CMakeFiles/downward.dir/cegar/refinement_hierarchy.cc.o" "gcc" "search/CMakeFiles/downward.dir/cegar/refinement_hierarchy.cc.o.d"
+  "/root/package/src/search/cegar/split_selector.cc" "search/CMakeFiles/downward.dir/cegar/split_selector.cc.o" "gcc" "search/CMakeFiles/downward.dir/cegar/split_selector.cc.o.d"
+  "/root/package/src/search/cegar/subtask_generators.cc" "search/CMakeFiles/downward.dir/cegar/subtask_generators.cc.o" "gcc" "search/CMakeFiles/downward.dir/cegar/subtask_generators.cc.o.d"
+  "/root/package/src/search/cegar/transition_system.cc" "search/CMakeFiles/downward.dir/cegar/transition_system.cc.o" "gcc" "search/CMakeFiles/downward.dir/cegar/transition_system.cc.o.d"
+  "/root/package/src/search/cegar/utils.cc" "search/CMakeFiles/downward.dir/cegar/utils.cc.o" "gcc" "search/CMakeFiles/downward.dir/cegar/utils.cc.o.d"
+  "/root/package/src/search/cegar/utils_landmarks.cc" "search/CMakeFiles/downward.dir/cegar/utils_landmarks.cc.o" "gcc" "search/CMakeFiles/downward.dir/cegar/utils_landmarks.cc.o.d"
+  "/root/package/src/search/command_line.cc" "search/CMakeFiles/downward.dir/command_line.cc.o" "gcc" "search/CMakeFiles/downward.dir/command_line.cc.o.d"
+  "/root/package/src/search/evaluation_context.cc" "search/CMakeFiles/downward.dir/evaluation_context.cc.o" "gcc" "search/CMakeFiles/downward.dir/evaluation_context.cc.o.d"
+  "/root/package/src/search/evaluation_result.cc" "search/CMakeFiles/downward.dir/evaluation_result.cc.o" "gcc" "search/CMakeFiles/downward.dir/evaluation_result.cc.o.d"
+  "/root/package/src/search/evaluator.cc" "search/CMakeFiles/downward.dir/evaluator.cc.o" "gcc" "search/CMakeFiles/downward.dir/evaluator.cc.o.d"
+  "/root/package/src/search/evaluator_cache.cc" "search/CMakeFiles/downward.dir/evaluator_cache.cc.o" "gcc" "search/CMakeFiles/downward.dir/evaluator_cache.cc.o.d"
+  "/root/package/src/search/evaluators/combining_evaluator.cc" "search/CMakeFiles/downward.dir/evaluators/combining_evaluator.cc.o" "gcc" "search/CMakeFiles/downward.dir/evaluators/combining_evaluator.cc.o.d"
+  "/root/package/src/search/evaluators/const_evaluator.cc" "search/CMakeFiles/downward.dir/evaluators/const_evaluator.cc.o" "gcc" "search/CMakeFiles/downward.dir/evaluators/const_evaluator.cc.o.d"
+  "/root/package/src/search/evaluators/g_evaluator.cc" "search/CMakeFiles/downward.dir/evaluators/g_evaluator.cc.o" "gcc" "search/CMakeFiles/downward.dir/evaluators/g_evaluator.cc.o.d"
+  "/root/package/src/search/evaluators/max_evaluator.cc" "search/CMakeFiles/downward.dir/evaluators/max_evaluator.cc.o" "gcc" "search/CMakeFiles/downward.dir/evaluators/max_evaluator.cc.o.d"
+  "/root/package/src/search/evaluators/plugin_group.cc" "search/CMakeFiles/downward.dir/evaluators/plugin_group.cc.o" "gcc" "search/CMakeFiles/downward.dir/evaluators/plugin_group.cc.o.d"
+  "/root/package/src/search/evaluators/pref_evaluator.cc" "search/CMakeFiles/downward.dir/evaluators/pref_evaluator.cc.o" "gcc" "search/CMakeFiles/downward.dir/evaluators/pref_evaluator.cc.o.d"
+  "/root/package/src/search/evaluators/sum_evaluator.cc" "search/CMakeFiles/downward.dir/evaluators/sum_evaluator.cc.o" "gcc" "search/CMakeFiles/downward.dir/evaluators/sum_evaluator.cc.o.d"
+  "/root/package/src/search/evaluators/weighted_evaluator.cc" "search/CMakeFiles/downward.dir/evaluators/weighted_evaluator.cc.o" "gcc" "search/CMakeFiles/downward.dir/evaluators/weighted_evaluator.cc.o.d"
+  "/root/package/src/search/global_state.cc" "search/CMakeFiles/downward.dir/global_state.cc.o" "gcc" "search/CMakeFiles/downward.dir/global_state.cc.o.d"
+  "/root/package/src/search/heuristic.cc" "search/CMakeFiles/downward.dir/heuristic.cc.o" "gcc" "search/CMakeFiles/downward.dir/heuristic.cc.o.d"
+  "/root/package/src/search/heuristics/additive_heuristic.cc" "search/CMakeFiles/downward.dir/heuristics/additive_heuristic.cc.o" "gcc" "search/CMakeFiles/downward.dir/heuristics/additive_heuristic.cc.o.d"
+  "/root/package/src/search/heuristics/blind_search_heuristic.cc" "search/CMakeFiles/downward.dir/heuristics/blind_search_heuristic.cc.o" "gcc" "search/CMakeFiles/downward.dir/heuristics/blind_search_heuristic.cc.o.d"
+  "/root/package/src/search/heuristics/cea_heuristic.cc" "search/CMakeFiles/downward.dir/heuristics/cea_heuristic.cc.o" "gcc" "search/CMakeFiles/downward.dir/heuristics/cea_heuristic.cc.o.d"
+  "/root/package/src/search/heuristics/cg_cache.cc" "search/CMakeFiles/downward.dir/heuristics/cg_cache.cc.o" "gcc" "search/CMakeFiles/downward.dir/heuristics/cg_cache.cc.o.d"
+  "/root/package/src/search/heuristics/cg_heuristic.cc" "search/CMakeFiles/downward.dir/heuristics/cg_heuristic.cc.o" "gcc" "search/CMakeFiles/downward.dir/heuristics/cg_heuristic.cc.o.d"
+  "/root/package/src/search/heuristics/domain_transition_graph.cc" "search/CMakeFiles/downward.dir/heuristics/domain_transition_graph.cc.o" "gcc" "search/CMakeFiles/downward.dir/heuristics/domain_transition_graph.cc.o.d"
+  "/root/package/src/search/heuristics/ff_heuristic.cc" "search/CMakeFiles/downward.dir/heuristics/ff_heuristic.cc.o" "gcc" "search/CMakeFiles/downward.dir/heuristics/ff_heuristic.cc.o.d"
+  "/root/package/src/search/heuristics/goal_count_heuristic.cc" "search/CMakeFiles/downward.dir/heuristics/goal_count_heuristic.cc.o" "gcc" "search/CMakeFiles/downward.dir/heuristics/goal_count_heuristic.cc.o.d"
+  "/root/package/src/search/heuristics/hm_heuristic.cc" "search/CMakeFiles/downward.dir/heuristics/hm_heuristic.cc.o" "gcc" "search/CMakeFiles/downward.dir/heuristics/hm_heuristic.cc.o.d"
+  "/root/package/src/search/heuristics/lm_cut_heuristic.cc" "search/CMakeFiles/downward.dir/heuristics/lm_cut_heuristic.cc.o" "gcc" "search/CMakeFiles/downward.dir/heuristics/lm_cut_heuristic.cc.o.d"
+  "/root/package/src/search/heuristics/lm_cut_landmarks.cc" "search/CMakeFiles/downward.dir/heuristics/lm_cut_landmarks.cc.o" "gcc" "search/CMakeFiles/downward.dir/heuristics/lm_cut_landmarks.cc.o.d"
+  "/root/package/src/search/heuristics/max_heuristic.cc" "search/CMakeFiles/downward.dir/heuristics/max_heuristic.cc.o" "gcc" "search/CMakeFiles/downward.dir/heuristics/max_heuristic.cc.o.d"
+  "/root/package/src/search/heuristics/relaxation_heuristic.cc" "search/CMakeFiles/downward.dir/heuristics/relaxation_heuristic.cc.o" "gcc" "search/CMakeFiles/downward.dir/heuristics/relaxation_heuristic.cc.o.d"
+  "/root/package/src/search/landmarks/exploration.cc" "search/CMakeFiles/downward.dir/landmarks/exploration.cc.o" "gcc" "search/CMakeFiles/downward.dir/landmarks/exploration.cc.o.d"
+  "/root/package/src/search/landmarks/landmark_cost_assignment.cc" "search/CMakeFiles/downward.dir/landmarks/landmark_cost_assignment.cc.o" "gcc" "search/CMakeFiles/downward.dir/landmarks/landmark_cost_assignment.cc.o.d"
+  "/root/package/src/search/landmarks/landmark_count_heuristic.cc" "search/CMakeFiles/downward.dir/landmarks/landmark_count_heuristic.cc.o" "gcc" "search/CMakeFiles/downward.dir/landmarks/landmark_count_heuristic.cc.o.d"
+  "/root/package/src/search/landmarks/landmark_factory.cc" "search/CMakeFiles/downward.dir/landmarks/landmark_factory.cc.o" "gcc" "search/CMakeFiles/downward.dir/landmarks/landmark_factory.cc.o.d"
+  "/root/package/src/search/landmarks/landmark_factory_h_m.cc" "search/CMakeFiles/downward.dir/landmarks/landmark_factory_h_m.cc.o" "gcc" "search/CMakeFiles/downward.dir/landmarks/landmark_factory_h_m.cc.o.d"
+  "/root/package/src/search/landmarks/landmark_factory_merged.cc" "search/CMakeFiles/downward.dir/landmarks/landmark_factory_merged.cc.o" "gcc" "search/CMakeFiles/downward.dir/landmarks/landmark_factory_merged.cc.o.d"
+  "/root/package/src/search/landmarks/landmark_factory_rpg_exhaust.cc" "search/CMakeFiles/downward.dir/landmarks/landmark_factory_rpg_exhaust.cc.o" "gcc" "search/CMakeFiles/downward.dir/landmarks/landmark_factory_rpg_exhaust.cc.o.d"
+  "/root/package/src/search/landmarks/landmark_factory_rpg_sasp.cc" "search/CMakeFiles/downward.dir/landmarks/landmark_factory_rpg_sasp.cc.o" "gcc" "search/CMakeFiles/downward.dir/landmarks/landmark_factory_rpg_sasp.cc.o.d"
+  "/root/package/src/search/landmarks/landmark_factory_zhu_givan.cc" "search/CMakeFiles/downward.dir/landmarks/landmark_factory_zhu_givan.cc.o" "gcc" "search/CMakeFiles/downward.dir/landmarks/landmark_factory_zhu_givan.cc.o.d"
+  "/root/package/src/search/landmarks/landmark_graph.cc" "search/CMakeFiles/downward.dir/landmarks/landmark_graph.cc.o" "gcc" "search/CMakeFiles/downward.dir/landmarks/landmark_graph.cc.o.d"
+  "/root/package/src/search/landmarks/landmark_status_manager.cc" "search/CMakeFiles/downward.dir/landmarks/landmark_status_manager.cc.o" "gcc" "search/CMakeFiles/downward.dir/landmarks/landmark_status_manager.cc.o.d"
+  "/root/package/src/search/landmarks/util.cc" "search/CMakeFiles/downward.dir/landmarks/util.cc.o" "gcc" "search/CMakeFiles/downward.dir/landmarks/util.cc.o.d"
+  "/root/package/src/search/lp/lp_internals.cc" "search/CMakeFiles/downward.dir/lp/lp_internals.cc.o" "gcc" "search/CMakeFiles/downward.dir/lp/lp_internals.cc.o.d"
+  "/root/package/src/search/lp/lp_solver.cc" "search/CMakeFiles/downward.dir/lp/lp_solver.cc.o" "gcc" "search/CMakeFiles/downward.dir/lp/lp_solver.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/distances.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/distances.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/distances.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/factored_transition_system.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/factored_transition_system.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/factored_transition_system.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/fts_factory.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/fts_factory.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/fts_factory.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/label_equivalence_relation.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/label_equivalence_relation.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/label_equivalence_relation.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/label_reduction.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/label_reduction.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/label_reduction.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/labels.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/labels.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/labels.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/merge_and_shrink_algorithm.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_and_shrink_algorithm.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_and_shrink_algorithm.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/merge_and_shrink_heuristic.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_and_shrink_heuristic.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_and_shrink_heuristic.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/merge_and_shrink_representation.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_and_shrink_representation.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_and_shrink_representation.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/merge_scoring_function.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_scoring_function.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_scoring_function.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/merge_scoring_function_dfp.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_scoring_function_dfp.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_scoring_function_dfp.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/merge_scoring_function_goal_relevance.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_scoring_function_goal_relevance.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_scoring_function_goal_relevance.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/merge_scoring_function_miasm.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_scoring_function_miasm.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_scoring_function_miasm.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/merge_scoring_function_miasm_utils.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_scoring_function_miasm_utils.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_scoring_function_miasm_utils.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/merge_scoring_function_single_random.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_scoring_function_single_random.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_scoring_function_single_random.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/merge_scoring_function_total_order.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_scoring_function_total_order.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_scoring_function_total_order.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/merge_selector.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_selector.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_selector.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/merge_selector_score_based_filtering.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_selector_score_based_filtering.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_selector_score_based_filtering.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/merge_strategy.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_strategy.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_strategy.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/merge_strategy_factory.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_strategy_factory.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_strategy_factory.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/merge_strategy_factory_precomputed.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_strategy_factory_precomputed.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_strategy_factory_precomputed.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/merge_strategy_factory_sccs.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_strategy_factory_sccs.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_strategy_factory_sccs.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/merge_strategy_factory_stateless.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_strategy_factory_stateless.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_strategy_factory_stateless.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/merge_strategy_precomputed.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_strategy_precomputed.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_strategy_precomputed.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/merge_strategy_sccs.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_strategy_sccs.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_strategy_sccs.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/merge_strategy_stateless.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_strategy_stateless.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_strategy_stateless.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/merge_tree.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_tree.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_tree.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/merge_tree_factory.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_tree_factory.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_tree_factory.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/merge_tree_factory_linear.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_tree_factory_linear.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/merge_tree_factory_linear.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/shrink_bisimulation.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/shrink_bisimulation.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/shrink_bisimulation.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/shrink_bucket_based.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/shrink_bucket_based.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/shrink_bucket_based.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/shrink_fh.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/shrink_fh.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/shrink_fh.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/shrink_random.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/shrink_random.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/shrink_random.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/shrink_strategy.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/shrink_strategy.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/shrink_strategy.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/transition_system.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/transition_system.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/transition_system.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/types.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/types.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/types.cc.o.d"
+  "/root/package/src/search/merge_and_shrink/utils.cc" "search/CMakeFiles/downward.dir/merge_and_shrink/utils.cc.o" "gcc" "search/CMakeFiles/downward.dir/merge_and_shrink/utils.cc.o.d"
+  "/root/package/src/search/open_list_factory.cc" "search/CMakeFiles/downward.dir/open_list_factory.cc.o" "gcc" "search/CMakeFiles/downward.dir/open_list_factory.cc.o.d"
+  "/root/package/src/search/open_lists/alternation_open_list.cc" "search/CMakeFiles/downward.dir/open_lists/alternation_open_list.cc.o" "gcc" "search/CMakeFiles/downward.dir/open_lists/alternation_open_list.cc.o.d"
+  "/root/package/src/search/open_lists/best_first_open_list.cc" "search/CMakeFiles/downward.dir/open_lists/best_first_open_list.cc.o" "gcc" "search/CMakeFiles/downward.dir/open_lists/best_first_open_list.cc.o.d"
+  "/root/package/src/search/open_lists/epsilon_greedy_open_list.cc" "search/CMakeFiles/downward.dir/open_lists/epsilon_greedy_open_list.cc.o" "gcc" "search/CMakeFiles/downward.dir/open_lists/epsilon_greedy_open_list.cc.o.d"
+  "/root/package/src/search/open_lists/pareto_open_list.cc" "search/CMakeFiles/downward.dir/open_lists/pareto_open_list.cc.o" "gcc" "search/CMakeFiles/downward.dir/open_lists/pareto_open_list.cc.o.d"
+  "/root/package/src/search/open_lists/tiebreaking_open_list.cc" "search/CMakeFiles/downward.dir/open_lists/tiebreaking_open_list.cc.o" "gcc" "search/CMakeFiles/downward.dir/open_lists/tiebreaking_open_list.cc.o.d"
+  "/root/package/src/search/open_lists/type_based_open_list.cc" "search/CMakeFiles/downward.dir/open_lists/type_based_open_list.cc.o" "gcc" "search/CMakeFiles/downward.dir/open_lists/type_based_open_list.cc.o.d"
+  "/root/package/src/search/operator_cost.cc" "search/CMakeFiles/downward.dir/operator_cost.cc.o" "gcc" "search/CMakeFiles/downward.dir/operator_cost.cc.o.d"
+  "/root/package/src/search/operator_counting/constraint_generator.cc" "search/CMakeFiles/downward.dir/operator_counting/constraint_generator.cc.o" "gcc" "search/CMakeFiles/downward.dir/operator_counting/constraint_generator.cc.o.d"
+  "/root/package/src/search/operator_counting/lm_cut_constraints.cc" "search/CMakeFiles/downward.dir/operator_counting/lm_cut_constraints.cc.o" "gcc" "search/CMakeFiles/downward.dir/operator_counting/lm_cut_constraints.cc.o.d"
+  "/root/package/src/search/operator_counting/operator_counting_heuristic.cc" "search/CMakeFiles/downward.dir/operator_counting/operator_counting_heuristic.cc.o" "gcc" "search/CMakeFiles/downward.dir/operator_counting/operator_counting_heuristic.cc.o.d"
+  "/root/package/src/search/operator_counting/pho_constraints.cc" "search/CMakeFiles/downward.dir/operator_counting/pho_constraints.cc.o" "gcc" "search/CMakeFiles/downward.dir/operator_counting/pho_constraints.cc.o.d"
+  "/root/package/src/search/operator_counting/state_equation_constraints.cc" "search/CMakeFiles/downward.dir/operator_counting/state_equation_constraints.cc.o" "gcc" "search/CMakeFiles/downward.dir/operator_counting/state_equation_constraints.cc.o.d"
+  "/root/package/src/search/operator_id.cc" "search/CMakeFiles/downward.dir/operator_id.cc.o" "gcc" "search/CMakeFiles/downward.dir/operator_id.cc.o.d"
+  "/root/package/src/search/options/bounds.cc" "search/CMakeFiles/downward.dir/options/bounds.cc.o" "gcc" "search/CMakeFiles/downward.dir/options/bounds.cc.o.d"
+  "/root/package/src/search/options/doc_printer.cc" "search/CMakeFiles/downward.dir/options/doc_printer.cc.o" "gcc" "search/CMakeFiles/downward.dir/options/doc_printer.cc.o.d"
+  "/root/package/src/search/options/doc_utils.cc" "search/CMakeFiles/downward.dir/options/doc_utils.cc.o" "gcc" "search/CMakeFiles/downward.dir/options/doc_utils.cc.o.d"
+  "/root/package/src/search/options/errors.cc" "search/CMakeFiles/downward.dir/options/errors.cc.o" "gcc" "search/CMakeFiles/downward.dir/options/errors.cc.o.d"
+  "/root/package/src/search/options/option_parser.cc" "search/CMakeFiles/downward.dir/options/option_parser.cc.o" "gcc" "search/CMakeFiles/downward.dir/options/option_parser.cc.o.d"
+  "/root/package/src/search/options/options.cc" "search/CMakeFiles/downward.dir/options/options.cc.o" "gcc" "search/CMakeFiles/downward.dir/options/options.cc.o.d"
+  "/root/package/src/search/options/plugin.cc" "search/CMakeFiles/downward.dir/options/plugin.cc.o" "gcc" "search/CMakeFiles/downward.dir/options/plugin.cc.o.d"
+  "/root/package/src/search/options/raw_registry.cc" "search/CMakeFiles/downward.dir/options/raw_registry.cc.o" "gcc" "search/CMakeFiles/downward.dir/options/raw_registry.cc.o.d"
+  "/root/package/src/search/options/registries.cc" "search/CMakeFiles/downward.dir/options/registries.cc.o" "gcc" "search/CMakeFiles/downward.dir/options/registries.cc.o.d"
+  "/root/package/src/search/pdbs/canonical_pdbs.cc" "search/CMakeFiles/downward.dir/pdbs/canonical_pdbs.cc.o" "gcc" "search/CMakeFiles/downward.dir/pdbs/canonical_pdbs.cc.o.d"
+  "/root/package/src/search/pdbs/canonical_pdbs_heuristic.cc" "search/CMakeFiles/downward.dir/pdbs/canonical_pdbs_heuristic.cc.o" "gcc" "search/CMakeFiles/downward.dir/pdbs/canonical_pdbs_heuristic.cc.o.d"
+  "/root/package/src/search/pdbs/dominance_pruning.cc" "search/CMakeFiles/downward.dir/pdbs/dominance_pruning.cc.o" "gcc" "search/CMakeFiles/downward.dir/pdbs/dominance_pruning.cc.o.d"
+  "/root/package/src/search/pdbs/incremental_canonical_pdbs.cc" "search/CMakeFiles/downward.dir/pdbs/incremental_canonical_pdbs.cc.o" "gcc" "search/CMakeFiles/downward.dir/pdbs/incremental_canonical_pdbs.cc.o.d"
+  "/root/package/src/search/pdbs/match_tree.cc" "search/CMakeFiles/downward.dir/pdbs/match_tree.cc.o" "gcc" "search/CMakeFiles/downward.dir/pdbs/match_tree.cc.o.d"
+  "/root/package/src/search/pdbs/pattern_cliques.cc" "search/CMakeFiles/downward.dir/pdbs/pattern_cliques.cc.o" "gcc" "search/CMakeFiles/downward.dir/pdbs/pattern_cliques.cc.o.d"
+  "/root/package/src/search/pdbs/pattern_collection_generator_combo.cc" "search/CMakeFiles/downward.dir/pdbs/pattern_collection_generator_combo.cc.o" "gcc" "search/CMakeFiles/downward.dir/pdbs/pattern_collection_generator_combo.cc.o.d"
+  "/root/package/src/search/pdbs/pattern_collection_generator_genetic.cc" "search/CMakeFiles/downward.dir/pdbs/pattern_collection_generator_genetic.cc.o" "gcc" "search/CMakeFiles/downward.dir/pdbs/pattern_collection_generator_genetic.cc.o.d"
+  "/root/package/src/search/pdbs/pattern_collection_generator_hillclimbing.cc" "search/CMakeFiles/downward.dir/pdbs/pattern_collection_generator_hillclimbing.cc.o" "gcc" "search/CMakeFiles/downward.dir/pdbs/pattern_collection_generator_hillclimbing.cc.o.d"
+  "/root/package/src/search/pdbs/pattern_collection_generator_manual.cc" "search/CMakeFiles/downward.dir/pdbs/pattern_collection_generator_manual.cc.o" "gcc" "search/CMakeFiles/downward.dir/pdbs/pattern_collection_generator_manual.cc.o.d"
+  "/root/package/src/search/pdbs/pattern_collection_generator_systematic.cc" "search/CMakeFiles/downward.dir/pdbs/pattern_collection_generator_systematic.cc.o" "gcc" "search/CMakeFiles/downward.dir/pdbs/pattern_collection_generator_systematic.cc.o.d"
+  "/root/package/src/search/pdbs/pattern_collection_information.cc" "search/CMakeFiles/downward.dir/pdbs/pattern_collection_information.cc.o" "gcc" "search/CMakeFiles/downward.dir/pdbs/pattern_collection_information.cc.o.d"
+  "/root/package/src/search/pdbs/pattern_database.cc" "search/CMakeFiles/downward.dir/pdbs/pattern_database.cc.o" "gcc" "search/CMakeFiles/downward.dir/pdbs/pattern_database.cc.o.d"
+  "/root/package/src/search/pdbs/pattern_generator.cc" "search/CMakeFiles/downward.dir/pdbs/pattern_generator.cc.o" "gcc" "search/CMakeFiles/downward.dir/pdbs/pattern_generator.cc.o.d"
+  "/root/package/src/search/pdbs/pattern_generator_greedy.cc" "search/CMakeFiles/downward.dir/pdbs/pattern_generator_greedy.cc.o" "gcc" "search/CMakeFiles/downward.dir/pdbs/pattern_generator_greedy.cc.o.d"
+  "/root/package/src/search/pdbs/pattern_generator_manual.cc" "search/CMakeFiles/downward.dir/pdbs/pattern_generator_manual.cc.o" "gcc" "search/CMakeFiles/downward.dir/pdbs/pattern_generator_manual.cc.o.d"
+  "/root/package/src/search/pdbs/pattern_information.cc" "search/CMakeFiles/downward.dir/pdbs/pattern_information.cc.o" "gcc" "search/CMakeFiles/downward.dir/pdbs/pattern_information.cc.o.d"
+  "/root/package/src/search/pdbs/pdb_heuristic.cc" "search/CMakeFiles/downward.dir/pdbs/pdb_heuristic.cc.o" "gcc" "search/CMakeFiles/downward.dir/pdbs/pdb_heuristic.cc.o.d"
+  "/root/package/src/search/pdbs/plugin_group.cc" "search/CMakeFiles/downward.dir/pdbs/plugin_group.cc.o" "gcc" "search/CMakeFiles/downward.dir/pdbs/plugin_group.cc.o.d"
+  "/root/package/src/search/pdbs/utils.cc" "search/CMakeFiles/downward.dir/pdbs/utils.cc.o" "gcc" "search/CMakeFiles/downward.dir/pdbs/utils.cc.o.d"
+  "/root/package/src/search/pdbs/validation.cc" "search/CMakeFiles/downward.dir/pdbs/validation.cc.o" "gcc" "search/CMakeFiles/downward.dir/pdbs/validation.cc.o.d"
+  "/root/package/src/search/pdbs/zero_one_pdbs.cc" "search/CMakeFiles/downward.dir/pdbs/zero_one_pdbs.cc.o" "gcc" "search/CMakeFiles/downward.dir/pdbs/zero_one_pdbs.cc.o.d"
+  "/root/package/src/search/pdbs/zero_one_pdbs_heuristic.cc" "search/CMakeFiles/downward.dir/pdbs/zero_one_pdbs_heuristic.cc.o" "gcc" "search/CMakeFiles/downward.dir/pdbs/zero_one_pdbs_heuristic.cc.o.d"
+  "/root/package/src/search/per_state_bitset.cc" "search/CMakeFiles/downward.dir/per_state_bitset.cc.o" "gcc" "search/CMakeFiles/downward.dir/per_state_bitset.cc.o.d"
+  "/root/package/src/search/plan_manager.cc" "search/CMakeFiles/downward.dir/plan_manager.cc.o" "gcc" "search/CMakeFiles/downward.dir/plan_manager.cc.o.d"
+  "/root/package/src/search/planner.cc" "search/CMakeFiles/downward.dir/planner.cc.o" "gcc" "search/CMakeFiles/downward.dir/planner.cc.o.d"
+  "/root/package/src/search/potentials/diverse_potential_heuristics.cc" "search/CMakeFiles/downward.dir/potentials/diverse_potential_heuristics.cc.o" "gcc" "search/CMakeFiles/downward.dir/potentials/diverse_potential_heuristics.cc.o.d"
+  "/root/package/src/search/potentials/plugin_group.cc" "search/CMakeFiles/downward.dir/potentials/plugin_group.cc.o" "gcc" "search/CMakeFiles/downward.dir/potentials/plugin_group.cc.o.d"
+  "/root/package/src/search/potentials/potential_function.cc" "search/CMakeFiles/downward.dir/potentials/potential_function.cc.o" "gcc" "search/CMakeFiles/downward.dir/potentials/potential_function.cc.o.d"
+  "/root/package/src/search/potentials/potential_heuristic.cc" "search/CMakeFiles/downward.dir/potentials/potential_heuristic.cc.o" "gcc" "search/CMakeFiles/downward.dir/potentials/potential_heuristic.cc.o.d"
+  "/root/package/src/search/potentials/potential_max_heuristic.cc" "search/CMakeFiles/downward.dir/potentials/potential_max_heuristic.cc.o" "gcc" "search/CMakeFiles/downward.dir/potentials/potential_max_heuristic.cc.o.d"
+  "/root/package/src/search/potentials/potential_optimizer.cc" "search/CMakeFiles/downward.dir/potentials/potential_optimizer.cc.o" "gcc" "search/CMakeFiles/downward.dir/potentials/potential_optimizer.cc.o.d"
+  "/root/package/src/search/potentials/sample_based_potential_heuristics.cc" "search/CMakeFiles/downward.dir/potentials/sample_based_potential_heuristics.cc.o" "gcc" "search/CMakeFiles/downward.dir/potentials/sample_based_potential_heuristics.cc.o.d"
+  "/root/package/src/search/potentials/single_potential_heuristics.cc" "search/CMakeFiles/downward.dir/potentials/single_potential_heuristics.cc.o" "gcc" "search/CMakeFiles/downward.dir/potentials/single_potential_heuristics.cc.o.d"
+  "/root/package/src/search/potentials/util.cc" "search/CMakeFiles/downward.dir/potentials/util.cc.o" "gcc" "search/CMakeFiles/downward.dir/potentials/util.cc.o.d"
+  "/root/package/src/search/pruning/null_pruning_method.cc" "search/CMakeFiles/downward.dir/pruning/null_pruning_method.cc.o" "gcc" "search/CMakeFiles/downward.dir/pruning/null_pruning_method.cc.o.d"
+  "/root/package/src/search/pruning/stubborn_sets.cc" "search/CMakeFiles/downward.dir/pruning/stubborn_sets.cc.o" "gcc" "search/CMakeFiles/downward.dir/pruning/stubborn_sets.cc.o.d"
+  "/root/package/src/search/pruning/stubborn_sets_atom_centric.cc" "search/CMakeFiles/downward.dir/pruning/stubborn_sets_atom_centric.cc.o" "gcc" "search/CMakeFiles/downward.dir/pruning/stubborn_sets_atom_centric.cc.o.d"
+  "/root/package/src/search/pruning/stubborn_sets_ec.cc" "search/CMakeFiles/downward.dir/pruning/stubborn_sets_ec.cc.o" "gcc" "search/CMakeFiles/downward.dir/pruning/stubborn_sets_ec.cc.o.d"
+  "/root/package/src/search/pruning/stubborn_sets_simple.cc" "search/CMakeFiles/downward.dir/pruning/stubborn_sets_simple.cc.o" "gcc" "search/CMakeFiles/downward.dir/pruning/stubborn_sets_simple.cc.o.d"
+  "/root/package/src/search/pruning_method.cc" "search/CMakeFiles/downward.dir/pruning_method.cc.o" "gcc" "search/CMakeFiles/downward.dir/pruning_method.cc.o.d"
+  "/root/package/src/search/search_engine.cc" "search/CMakeFiles/downward.dir/search_engine.cc.o" "gcc" "search/CMakeFiles/downward.dir/search_engine.cc.o.d"
+  "/root/package/src/search/search_engines/eager_search.cc" "search/CMakeFiles/downward.dir/search_engines/eager_search.cc.o" "gcc" "search/CMakeFiles/downward.dir/search_engines/eager_search.cc.o.d"
+  "/root/package/src/search/search_engines/enforced_hill_climbing_search.cc" "search/CMakeFiles/downward.dir/search_engines/enforced_hill_climbing_search.cc.o" "gcc" "search/CMakeFiles/downward.dir/search_engines/enforced_hill_climbing_search.cc.o.d"
+  "/root/package/src/search/search_engines/iterated_search.cc" "search/CMakeFiles/downward.dir/search_engines/iterated_search.cc.o" "gcc" "search/CMakeFiles/downward.dir/search_engines/iterated_search.cc.o.d"
+  "/root/package/src/search/search_engines/lazy_search.cc" "search/CMakeFiles/downward.dir/search_engines/lazy_search.cc.o" "gcc" "search/CMakeFiles/downward.dir/search_engines/lazy_search.cc.o.d"
+  "/root/package/src/search/search_engines/plugin_astar.cc" "search/CMakeFiles/downward.dir/search_engines/plugin_astar.cc.o" "gcc" "search/CMakeFiles/downward.dir/search_engines/plugin_astar.cc.o.d"
+  "/root/package/src/search/search_engines/plugin_eager.cc" "search/CMakeFiles/downward.dir/search_engines/plugin_eager.cc.o" "gcc" "search/CMakeFiles/downward.dir/search_engines/plugin_eager.cc.o.d"
+  "/root/package/src/search/search_engines/plugin_eager_greedy.cc" "search/CMakeFiles/downward.dir/search_engines/plugin_eager_greedy.cc.o" "gcc" "search/CMakeFiles/downward.dir/search_engines/plugin_eager_greedy.cc.o.d"
+  "/root/package/src/search/search_engines/plugin_eager_wastar.cc" "search/CMakeFiles/downward.dir/search_engines/plugin_eager_wastar.cc.o" "gcc" "search/CMakeFiles/downward.dir/search_engines/plugin_eager_wastar.cc.o.d"
+  "/root/package/src/search/search_engines/plugin_lazy.cc" "search/CMakeFiles/downward.dir/search_engines/plugin_lazy.cc.o" "gcc" "search/CMakeFiles/downward.dir/search_engines/plugin_lazy.cc.o.d"
+  "/root/package/src/search/search_engines/plugin_lazy_greedy.cc" "search/CMakeFiles/downward.dir/search_engines/plugin_lazy_greedy.cc.o" "gcc" "search/CMakeFiles/downward.dir/search_engines/plugin_lazy_greedy.cc.o.d"
+  "/root/package/src/search/search_engines/plugin_lazy_wastar.cc" "search/CMakeFiles/downward.dir/search_engines/plugin_lazy_wastar.cc.o" "gcc" "search/CMakeFiles/downward.dir/search_engines/plugin_lazy_wastar.cc.o.d"
+  "/root/package/src/search/search_engines/search_common.cc" "search/CMakeFiles/downward.dir/search_engines/search_common.cc.o" "gcc" "search/CMakeFiles/downward.dir/search_engines/search_common.cc.o.d"
+  "/root/package/src/search/search_node_info.cc" "search/CMakeFiles/downward.dir/search_node_info.cc.o" "gcc" "search/CMakeFiles/downward.dir/search_node_info.cc.o.d"
+  "/root/package/src/search/search_progress.cc" "search/CMakeFiles/downward.dir/search_progress.cc.o" "gcc" "search/CMakeFiles/downward.dir/search_progress.cc.o.d"
+  "/root/package/src/search/search_space.cc" "search/CMakeFiles/downward.dir/search_space.cc.o" "gcc" "search/CMakeFiles/downward.dir/search_space.cc.o.d"
+  "/root/package/src/search/search_statistics.cc" "search/CMakeFiles/downward.dir/search_statistics.cc.o" "gcc" "search/CMakeFiles/downward.dir/search_statistics.cc.o.d"
+  "/root/package/src/search/state_id.cc" "search/CMakeFiles/downward.dir/state_id.cc.o" "gcc" "search/CMakeFiles/downward.dir/state_id.cc.o.d"
+  "/root/package/src/search/state_registry.cc" "search/CMakeFiles/downward.dir/state_registry.cc.o" "gcc" "search/CMakeFiles/downward.dir/state_registry.cc.o.d"
+  "/root/package/src/search/task_proxy.cc" "search/CMakeFiles/downward.dir/task_proxy.cc.o" "gcc" "search/CMakeFiles/downward.dir/task_proxy.cc.o.d"
+  "/root/package/src/search/task_utils/causal_graph.cc" "search/CMakeFiles/downward.dir/task_utils/causal_graph.cc.o" "gcc" "search/CMakeFiles/downward.dir/task_utils/causal_graph.cc.o.d"
+  "/root/package/src/search/task_utils/sampling.cc" "search/CMakeFiles/downward.dir/task_utils/sampling.cc.o" "gcc" "search/CMakeFiles/downward.dir/task_utils/sampling.cc.o.d"
+  "/root/package/src/search/task_utils/successor_generator.cc" "search/CMakeFiles/downward.dir/task_utils/successor_generator.cc.o" "gcc" "search/CMakeFiles/downward.dir/task_utils/successor_generator.cc.o.d"
+  "/root/package/src/search/task_utils/successor_generator_factory.cc" "search/CMakeFiles/downward.dir/task_utils/successor_generator_factory.cc.o" "gcc" "search/CMakeFiles/downward.dir/task_utils/successor_generator_factory.cc.o.d"
+  "/root/package/src/search/task_utils/successor_generator_internals.cc" "search/CMakeFiles/downward.dir/task_utils/successor_generator_internals.cc.o" "gcc" "search/CMakeFiles/downward.dir/task_utils/successor_generator_internals.cc.o.d"
+  "/root/package/src/search/task_utils/task_properties.cc" "search/CMakeFiles/downward.dir/task_utils/task_properties.cc.o" "gcc" "search/CMakeFiles/downward.dir/task_utils/task_properties.cc.o.d"
+  "/root/package/src/search/task_utils/variable_order_finder.cc" "search/CMakeFiles/downward.dir/task_utils/variable_order_finder.cc.o" "gcc" "search/CMakeFiles/downward.dir/task_utils/variable_order_finder.cc.o.d"
+  "/root/package/src/search/tasks/cost_adapted_task.cc" "search/CMakeFiles/downward.dir/tasks/cost_adapted_task.cc.o" "gcc" "search/CMakeFiles/downward.dir/tasks/cost_adapted_task.cc.o.d"
+  "/root/package/src/search/tasks/delegating_task.cc" "search/CMakeFiles/downward.dir/tasks/delegating_task.cc.o" "gcc" "search/CMakeFiles/downward.dir/tasks/delegating_task.cc.o.d"
+  "/root/package/src/search/tasks/domain_abstracted_task.cc" "search/CMakeFiles/downward.dir/tasks/domain_abstracted_task.cc.o" "gcc" "search/CMakeFiles/downward.dir/tasks/domain_abstracted_task.cc.o.d"
+  "/root/package/src/search/tasks/domain_abstracted_task_factory.cc" "search/CMakeFiles/downward.dir/tasks/domain_abstracted_task_factory.cc.o" "gcc" "search/CMakeFiles/downward.dir/tasks/domain_abstracted_task_factory.cc.o.d"
+  "/root/package/src/search/tasks/modified_goals_task.cc" "search/CMakeFiles/downward.dir/tasks/modified_goals_task.cc.o" "gcc" "search/CMakeFiles/downward.dir/tasks/modified_goals_task.cc.o.d"
+  "/root/package/src/search/tasks/modified_operator_costs_task.cc" "search/CMakeFiles/downward.dir/tasks/modified_operator_costs_task.cc.o" "gcc" "search/CMakeFiles/downward.dir/tasks/modified_operator_costs_task.cc.o.d"
+  "/root/package/src/search/tasks/root_task.cc" "search/CMakeFiles/downward.dir/tasks/root_task.cc.o" "gcc" "search/CMakeFiles/downward.dir/tasks/root_task.cc.o.d"
+  "/root/package/src/search/utils/countdown_timer.cc" "search/CMakeFiles/downward.dir/utils/countdown_timer.cc.o" "gcc" "search/CMakeFiles/downward.dir/utils/countdown_timer.cc.o.d"
+  "/root/package/src/search/utils/logging.cc" "search/CMakeFiles/downward.dir/utils/logging.cc.o" "gcc" "search/CMakeFiles/downward.dir/utils/logging.cc.o.d"
+  "/root/package/src/search/utils/markup.cc" "search/CMakeFiles/downward.dir/utils/markup.cc.o" "gcc" "search/CMakeFiles/downward.dir/utils/markup.cc.o.d"
+  "/root/package/src/search/utils/math.cc" "search/CMakeFiles/downward.dir/utils/math.cc.o" "gcc" "search/CMakeFiles/downward.dir/utils/math.cc.o.d"
+  "/root/package/src/search/utils/memory.cc" "search/CMakeFiles/downward.dir/utils/memory.cc.o" "gcc" "search/CMakeFiles/downward.dir/utils/memory.cc.o.d"
+  "/root/package/src/search/utils/rng.cc" "search/CMakeFiles/downward.dir/utils/rng.cc.o" "gcc" "search/CMakeFiles/downward.dir/utils/rng.cc.o.d"
+  "/root/package/src/search/utils/rng_options.cc" "search/CMakeFiles/downward.dir/utils/rng_options.cc.o" "gcc" "search/CMakeFiles/downward.dir/utils/rng_options.cc.o.d"
+  "/root/package/src/search/utils/strings.cc" "search/CMakeFiles/downward.dir/utils/strings.cc.o" "gcc" "search/CMakeFiles/downward.dir/utils/strings.cc.o.d"
+  "/root/package/src/search/utils/system.cc" "search/CMakeFiles/downward.dir/utils/system.cc.o" "gcc" "search/CMakeFiles/downward.dir/utils/system.cc.o.d"
+  "/root/package/src/search/utils/system_unix.cc" "search/CMakeFiles/downward.dir/utils/system_unix.cc.o" "gcc" "search/CMakeFiles/downward.dir/utils/system_unix.cc.o.d"
+  "/root/package/src/search/utils/system_windows.cc" "search/CMakeFiles/downward.dir/utils/system_windows.cc.o" "gcc" "search/CMakeFiles/downward.dir/utils/system_windows.cc.o.d"
+  "/root/package/src/search/utils/timer.cc" "search/CMakeFiles/downward.dir/utils/timer.cc.o" "gcc" "search/CMakeFiles/downward.dir/utils/timer.cc.o.d"
+  )
+
+# Targets to which this target links.
+set(CMAKE_TARGET_LINKED_INFO_FILES
+  )
+
+# Fortran module output directory.
+set(CMAKE_Fortran_TARGET_MODULE_DIR "")
@@ -0,0 +1,95 @@
+#! /usr/bin/env python3
+
+
+HELP = """\
+Measure how fast the translator computes the model of a synthetic Datalog
+program that is dominated by product rules.
+
+The program has unary predicates p0, ..., p{K-1}, each of which grows
+along a chain of N objects one atom at a time, and the rule
+pair(?x0, ..., ?x{K-1}) :- p0(?x0), ..., p{K-1}(?x{K-1}),
+which becomes a product rule with N^K resulting atoms.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(os.path.dirname(DIR))
+TRANSLATE_DIR = os.path.join(REPO, "src", "translate")
+ENGINES = ["queue", "semi-naive"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=HELP)
+    parser.add_argument(
+        "--objects", type=int, default=300,
+        help="number of objects N (default: %(default)d)")
+    parser.add_argument(
+        "--conditions", type=int, default=2,
+        help="number of conditions K of the product rule "
+             "(default: %(default)d)")
+    parser.add_argument(
+        "--repetitions", type=int, default=3,
+        help="run each engine this many times and report the fastest run "
+             "(default: %(default)d)")
+    return parser.parse_args()
+
+
+def build_program(num_objects, num_conditions):
+    import pddl
+    import pddl_to_prolog
+    prog = pddl_to_prolog.PrologProgram()
+    objects = ["o%d" % i for i in range(num_objects)]
+    for obj, next_obj in zip(objects, objects[1:]):
+        prog.add_fact(pddl.Atom("next", [obj, next_obj]))
+    conditions = []
+    for i in range(num_conditions):
+        predicate = "p%d" % i
+        prog.add_fact(pddl.Atom(predicate, [objects[0]]))
+        # Like the rules for an action and its effect.
+        step = "step%d" % i
+        prog.add_rule(pddl_to_prolog.Rule(
+            [pddl.Atom(predicate, ["?x"]), pddl.Atom("next", ["?x", "?y"])],
+            pddl.Atom(step, ["?x", "?y"])))
+        prog.add_rule(pddl_to_prolog.Rule(
+            [pddl.Atom(step, ["?x", "?y"])], pddl.Atom(predicate, ["?y"])))
+        conditions.append(pddl.Atom(predicate, ["?x%d" % i]))
+    prog.add_rule(pddl_to_prolog.Rule(
+        conditions, pddl.Atom("pair", [cond.args[0] for cond in conditions])))
+    with contextlib.redirect_stdout(io.StringIO()):
+        prog.normalize()
+        prog.split_rules()
+    return prog
+
+
+def main():
+    args = parse_args()
+    sys.path.insert(0, TRANSLATE_DIR)
+    import build_model
+
+    reference_model = None
+    for engine in ENGINES:
+        best_time = float("inf")
+        for _ in range(args.repetitions):
+            prog = build_program(args.objects, args.conditions)
+            start = time.process_time()
+            with contextlib.redirect_stdout(io.StringIO()):
+                model = build_model.compute_model(prog, engine)
+            best_time = min(best_time, time.process_time() - start)
+        print("{}: {:.3f}s, {} atoms, {:.0f} atoms/s".format(
+            engine, best_time, len(model), len(model) / max(best_time, 1e-9)))
+        if reference_model is None:
+            reference_model = set(model)
+        elif set(model) != reference_model:
+            sys.exit("Error: engines {} and {} compute different models.".format(
+                ENGINES[0], engine))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#! /usr/bin/env python3
+
+
+HELP = """\
+Measure the memory used by the ground representations of the translator.
+
+For each task, report the number of instantiated actions and axioms and of
+SAS operators and axioms, the average number of bytes per object used by
+the objects themselves and by the lists and tuples they contain (but not by
+the atoms and strings they refer to, which are shared), and the peak memory
+of a separate translator run.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(os.path.dirname(DIR))
+TRANSLATE_DIR = os.path.join(REPO, "src", "translate")
+BENCHMARKS_DIR = os.path.join(DIR, "benchmarks")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=HELP)
+    parser.add_argument(
+        "suite", nargs="*", default=["all"],
+        help='Use "all" to test all benchmarks (default) or '
+             '"<domain>:<problem>" to test individual tasks')
+    parser.add_argument(
+        "--benchmarks-dir", default=BENCHMARKS_DIR,
+        help="path to benchmark directory (default: %(default)s)")
+    return parser.parse_args()
+
+
+def get_tasks(args):
+    suite = []
+    for task in args.suite:
+        if task == "all":
+            for domain in sorted(os.listdir(args.benchmarks_dir)):
+                path = os.path.join(args.benchmarks_dir, domain)
+                if not os.path.isdir(path) or domain.startswith((".", "_")):
+                    continue
+                suite.extend(
+                    os.path.join(path, f) for f in sorted(os.listdir(path))
+                    if "domain" not in f)
+        else:
+            suite.append(os.path.join(args.benchmarks_dir, task.replace(":", "/")))
+    return suite
+
+
+def get_domain_file(task_file):
+    return os.path.join(os.path.dirname(task_file), "domain.pddl")
+
+
+def get_container_size(obj, seen):
+    """Return the size of obj, its instance dict and all lists and tuples
+    reachable from it that have not been seen yet."""
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (list, tuple)):
+        children = obj
+    elif hasattr(obj, "__dict__"):
+        size += sys.getsizeof(obj.__dict__)
+        children = obj.__dict__.values()
+    else:
+        children = [getattr(obj, slot, None)
+                    for slot in getattr(type(obj), "__slots__", [])]
+    for child in children:
+        if isinstance(child, (list, tuple)):
+            size += get_container_size(child, seen)
+    return size
+
+
+def get_average_size(objects):
+    seen = set()
+    total = sum(get_container_size(obj, seen) for obj in objects)
+    return total / max(len(objects), 1)
+
+
+def get_peak_memory(task_file):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log = subprocess.check_output(
+            [sys.executable, os.path.join(TRANSLATE_DIR, "translate.py"),
+             get_domain_file(task_file), task_file,
+             "--sas-file", os.path.join(tmp_dir, "output.sas")],
+            universal_newlines=True)
+    return int(re.search(
+        r"^Translator peak memory: (\d+) KB$", log, re.M).group(1))
+
+
+def main():
+    args = parse_args()
+    # The translator modules read the options from the command line.
+    sys.argv = [sys.argv[0], "domain.pddl", "task.pddl"]
+    sys.path.insert(0, TRANSLATE_DIR)
+    import instantiate
+    import normalize
+    import pddl_parser
+    import translate
+
+    print(" | ".join([
+        "task", "actions", "bytes/action", "axioms", "bytes/axiom",
+        "operators", "bytes/operator", "SAS axioms", "bytes/SAS axiom",
+        "peak memory"]))
+    for task_file in get_tasks(args):
+        task_name = "-".join(task_file.split("/")[-2:])
+        with contextlib.redirect_stdout(io.StringIO()):
+            task = pddl_parser.open(get_domain_file(task_file), task_file)
+            normalize.normalize(task)
+            _, _, actions, axioms, _ = instantiate.explore(task)
+            actions = list(actions)
+            task = pddl_parser.open(get_domain_file(task_file), task_file)
+            normalize.normalize(task)
+            sas_task = translate.pddl_to_sas(task)
+        print(" | ".join([
+            task_name,
+            str(len(actions)), "{:.0f}".format(get_average_size(actions)),
+            str(len(axioms)), "{:.0f}".format(get_average_size(axioms)),
+            str(len(sas_task.operators)),
+            "{:.0f}".format(get_average_size(sas_task.operators)),
+            str(len(sas_task.axioms)),
+            "{:.0f}".format(get_average_size(sas_task.axioms)),
+            "{} KB".format(get_peak_memory(task_file))]))
+
+
+if __name__ == "__main__":
+    main()
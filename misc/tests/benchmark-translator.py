@@ -0,0 +1,202 @@
+#! /usr/bin/env python3
+
+
+HELP = """\
+Compare the performance of alternative translator configurations.
+
+For each task, run the translator once per configuration of the chosen
+comparison and report the CPU time of the translator phases and the
+memory statistics relevant to the comparison. The output files are
+compared as well, since all configurations of a comparison must produce
+the same translation.
+"""
+
+import argparse
+from collections import defaultdict
+import filecmp
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(os.path.dirname(DIR))
+TRANSLATE = os.path.join(REPO, "src", "translate", "translate.py")
+BENCHMARKS_DIR = os.path.join(DIR, "benchmarks")
+
+# Map each comparison to the timers, memory statistics and throughputs it
+# reports and to its named configurations (lists of additional translator
+# options). A throughput (name, counters, timer) is the sum of the counters
+# (printed as "<number> <counter>") divided by the time of the timer.
+# "{tmp_dir}" in an option is replaced by a directory that persists for all
+# runs of the script.
+COMPARISONS = {
+    "parser": (
+        ["Parsing"],
+        ["Peak memory after parsing", "Translator peak memory"],
+        [],
+        [("lines", ["--pddl-parser", "lines"]),
+         ("stream", ["--pddl-parser", "stream"])]),
+    # Use at least two repetitions, since the first run fills the cache.
+    "domain-cache": (
+        ["Parsing", "Normalizing task"],
+        ["Translator peak memory"],
+        [],
+        [("no-cache", []),
+         ("cache", ["--domain-cache", "{tmp_dir}/cache"])]),
+    "datalog-engine": (
+        ["Preparing model", "Computing static atoms", "Computing model"],
+        ["Translator peak memory"],
+        [("atoms/s", ["relevant atoms", "auxiliary atoms"], "Computing model")],
+        [("queue", ["--datalog-engine", "queue"]),
+         ("semi-naive", ["--datalog-engine", "semi-naive"])]),
+    "join-order": (
+        ["Normalizing Datalog program", "Computing model"],
+        ["Translator peak memory"],
+        [("atoms/s", ["relevant atoms", "auxiliary atoms"], "Computing model")],
+        [("variables", ["--join-order", "variables"]),
+         ("cardinality", ["--join-order", "cardinality"])]),
+    "stream-actions": (
+        ["Completing instantiation", "Translating task"],
+        ["Translator peak memory"],
+        [],
+        [("list", []),
+         ("stream", ["--stream-actions"])]),
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=HELP)
+    parser.add_argument(
+        "comparison", choices=sorted(COMPARISONS),
+        help="which configurations to compare")
+    parser.add_argument(
+        "suite", nargs="*", default=["all"],
+        help='Use "all" to test all benchmarks (default) or '
+             '"<domain>:<problem>" to test individual tasks')
+    parser.add_argument(
+        "--benchmarks-dir", default=BENCHMARKS_DIR,
+        help="path to benchmark directory (default: %(default)s)")
+    parser.add_argument(
+        "--repetitions", type=int, default=1,
+        help="run each configuration this many times and report the "
+             "fastest run (default: %(default)d)")
+    return parser.parse_args()
+
+
+def get_tasks(args):
+    suite = []
+    for task in args.suite:
+        if task == "all":
+            for domain in sorted(os.listdir(args.benchmarks_dir)):
+                path = os.path.join(args.benchmarks_dir, domain)
+                if not os.path.isdir(path) or domain.startswith((".", "_")):
+                    continue
+                suite.extend(
+                    os.path.join(path, f) for f in sorted(os.listdir(path))
+                    if "domain" not in f)
+        else:
+            suite.append(os.path.join(args.benchmarks_dir, task.replace(":", "/")))
+    return suite
+
+
+def get_domain_file(task_file):
+    return os.path.join(os.path.dirname(task_file), "domain.pddl")
+
+
+def get_timer_regex(timer):
+    # Timers print either "<text>: [...]" (block) or "<text>... [...]".
+    return re.compile(
+        r"^{}(?::|\.\.\.) \[([\d.]+)s CPU, [\d.]+s wall-clock\]$".format(
+            re.escape(timer)), re.M)
+
+
+def get_memory_regex(statistic):
+    return re.compile(r"^{}: (\d+) KB$".format(re.escape(statistic)), re.M)
+
+
+def get_counter_regex(counter):
+    return re.compile(r"^(\d+) {}$".format(re.escape(counter)), re.M)
+
+
+def translate(task_file, translator_options, sas_file):
+    cmd = [sys.executable, TRANSLATE, get_domain_file(task_file), task_file,
+           "--sas-file", sas_file] + translator_options
+    return subprocess.check_output(cmd, universal_newlines=True)
+
+
+def get_time(log, timer):
+    return sum(float(time) for time in get_timer_regex(timer).findall(log))
+
+
+def get_throughput(log, throughput):
+    _, counters, timer = throughput
+    count = sum(int(get_counter_regex(counter).search(log).group(1))
+                for counter in counters)
+    # Timers have a resolution of 10 ms.
+    return count / max(get_time(log, timer), 0.01)
+
+
+def measure(task_file, timers, memory_statistics, throughputs,
+            translator_options, sas_file, repetitions):
+    best_times = defaultdict(lambda: float("inf"))
+    best_memory = defaultdict(lambda: float("inf"))
+    best_throughputs = defaultdict(float)
+    for _ in range(repetitions):
+        log = translate(task_file, translator_options, sas_file)
+        for timer in timers:
+            best_times[timer] = min(best_times[timer], get_time(log, timer))
+        for statistic in memory_statistics:
+            memory = int(get_memory_regex(statistic).search(log).group(1))
+            best_memory[statistic] = min(best_memory[statistic], memory)
+        for i, throughput in enumerate(throughputs):
+            best_throughputs[i] = max(
+                best_throughputs[i], get_throughput(log, throughput))
+    return ([best_times[timer] for timer in timers],
+            [best_memory[statistic] for statistic in memory_statistics],
+            [best_throughputs[i] for i in range(len(throughputs))])
+
+
+def main():
+    args = parse_args()
+    timers, memory_statistics, throughputs, configs = COMPARISONS[
+        args.comparison]
+    header = (["task", "config"] + timers + memory_statistics +
+              [name for name, _, _ in throughputs])
+    print(" | ".join(header))
+    totals = defaultdict(lambda: [0.0] * len(timers))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for task_file in get_tasks(args):
+            task_name = "-".join(task_file.split("/")[-2:])
+            reference_sas_file = None
+            for config_name, translator_options in configs:
+                sas_file = os.path.join(tmp_dir, config_name + ".sas")
+                translator_options = [
+                    option.format(tmp_dir=tmp_dir)
+                    for option in translator_options]
+                times, memory, rates = measure(
+                    task_file, timers, memory_statistics, throughputs,
+                    translator_options, sas_file, args.repetitions)
+                for i, time in enumerate(times):
+                    totals[config_name][i] += time
+                print(" | ".join(
+                    [task_name, config_name] +
+                    ["{:.3f}s".format(time) for time in times] +
+                    ["{} KB".format(kb) for kb in memory] +
+                    ["{:.0f}".format(rate) for rate in rates]))
+                if reference_sas_file is None:
+                    reference_sas_file = sas_file
+                elif not filecmp.cmp(reference_sas_file, sas_file, shallow=False):
+                    sys.exit("Error: configurations {} and {} produce different "
+                             "output for {}.".format(
+                                 configs[0][0], config_name, task_name))
+    for config_name, _ in configs:
+        print(" | ".join(
+            ["total", config_name] +
+            ["{:.3f}s".format(time) for time in totals[config_name]]))
+
+
+if __name__ == "__main__":
+    main()
@@ -38,6 +38,23 @@ class AxiomDependencies(object):
                 self.negative_dependencies.pop(var, None)
 
 
+class OperatorConditions(object):
+    """The literals occurring in the preconditions and in the effect
+    conditions of operators, which is all that handle_axioms needs to know
+    about the operators. Operators can be added one at a time, so that they
+    need not be kept in memory (see option --stream-actions)."""
+    def __init__(self, operators=()):
+        self.precondition_literals = set()
+        self.effect_condition_literals = set()
+        for op in operators:
+            self.add_operator(op)
+
+    def add_operator(self, op):
+        self.precondition_literals.update(op.precondition)
+        for condition, effect in chain(op.add_effects, op.del_effects):
+            self.effect_condition_literals.update(condition)
+
+
 class AxiomCluster(object):
     def __init__(self, derived_variables):
         self.variables = derived_variables
@@ -53,6 +70,9 @@ class AxiomCluster(object):
 
 
 def handle_axioms(operators, axioms, goals, layer_strategy):
+    # operators may also be given as OperatorConditions.
+    if not isinstance(operators, OperatorConditions):
+        operators = OperatorConditions(operators)
     clusters = compute_clusters(axioms, goals, operators)
     axiom_layers = compute_axiom_layers(clusters, layer_strategy)
 
@@ -71,23 +91,22 @@ def handle_axioms(operators, axioms, goals, layer_strategy):
     return axioms, axiom_layers
 
 
-def compute_necessary_literals(dependencies, goals, operators):
+def compute_necessary_literals(dependencies, goals, operator_conditions):
     necessary_literals = set()
 
     for g in goals:
         if g.positive() in dependencies.derived_variables:
             necessary_literals.add(g)
 
-    for op in operators:
-        derived_preconditions = (l for l in op.precondition if l.positive()
-                                 in dependencies.derived_variables)
-        necessary_literals.update(derived_preconditions)
+    derived_preconditions = (
+        l for l in operator_conditions.precondition_literals
+        if l.positive() in dependencies.derived_variables)
+    necessary_literals.update(derived_preconditions)
 
-        for condition, effect in chain(op.add_effects, op.del_effects):
-            for c in condition:
-                if c.positive() in dependencies.derived_variables:
-                    necessary_literals.add(c)
-                    necessary_literals.add(c.negate())
+    for c in operator_conditions.effect_condition_literals:
+        if c.positive() in dependencies.derived_variables:
+            necessary_literals.add(c)
+            necessary_literals.add(c.negate())
 
     literals_to_process = list(necessary_literals)
     while literals_to_process:
@@ -163,11 +182,12 @@ def compute_simplified_axioms(axioms):
     return [axiom for axiom in axioms if id(axiom) not in axioms_to_skip]
 
 
-def compute_clusters(axioms, goals, operators):
+def compute_clusters(axioms, goals, operator_conditions):
     dependencies = AxiomDependencies(axioms)
 
     # Compute necessary literals and prune unnecessary vars from dependencies.
-    necessary_literals = compute_necessary_literals(dependencies, goals, operators)
+    necessary_literals = compute_necessary_literals(
+        dependencies, goals, operator_conditions)
     dependencies.remove_unnecessary_variables(necessary_literals)
 
     groups = get_strongly_connected_components(dependencies)
@@ -3,9 +3,14 @@
 
 import sys
 import itertools
+import json
+import multiprocessing
+import time
+from operator import itemgetter
 
 import pddl
 import timers
+import tools
 from functools import reduce
 
 def convert_rules(prog):
@@ -54,10 +59,53 @@ class BuildRule:
     def prepare_effect(self, new_atom, cond_index):
         effect_args = list(self.effect.args)
         cond = self.conditions[cond_index]
-        for var_no, obj in zip(cond.args, new_atom.args):
+        for var_no, obj in zip(cond.args, new_atom[1:]):
             if isinstance(var_no, int):
                 effect_args[var_no] = obj
         return effect_args
+    def prepare_batches(self):
+        """Prepare the rule for fire_batch, which works on tuples of
+        arguments instead of atoms.
+
+        fire_batch computes the effect arguments from the concatenation
+        of the argument tuples of all conditions (in the order of the
+        conditions) and of the constant effect arguments."""
+        self.constant_filters = []
+        for cond in self.conditions:
+            constant_positions = [
+                pos for pos, arg in enumerate(cond.args)
+                if not isinstance(arg, int) and arg[0] != "?"]
+            constants = tuple(cond.args[pos] for pos in constant_positions)
+            if constants:
+                self.constant_filters.append(
+                    (tools.get_tuple_getter(constant_positions), constants))
+            else:
+                self.constant_filters.append(None)
+        offsets = {}
+        offset = 0
+        for cond in self.conditions:
+            for pos, arg in enumerate(cond.args):
+                if isinstance(arg, int):
+                    offsets.setdefault(arg, offset + pos)
+            offset += len(cond.args)
+        self.effect_constants = tuple(
+            arg for arg in self.effect.args if not isinstance(arg, int))
+        effect_positions = []
+        for arg in self.effect.args:
+            if isinstance(arg, int):
+                effect_positions.append(offsets[arg])
+            else:
+                effect_positions.append(offset)
+                offset += 1
+        self.get_effect_args = tools.get_tuple_getter(effect_positions)
+    def filter_batch(self, args_list, cond_index):
+        """Return the argument tuples that match the constants of the
+        given condition."""
+        constant_filter = self.constant_filters[cond_index]
+        if constant_filter is None:
+            return args_list
+        get_constants, constants = constant_filter
+        return [args for args in args_list if get_constants(args) == constants]
     def __str__(self):
         return "%s :- %s" % (self.effect, ", ".join(map(str, self.conditions)))
     def __repr__(self):
@@ -75,7 +123,11 @@ class JoinRule(BuildRule):
         self.common_var_positions = [
             [args.index(var) for var in common_vars]
             for args in (list(left_args), list(right_args))]
-        self.atoms_by_key = ({}, {})
+        # Atoms are tuples (predicate, arg1, ..., argN), see Queue.
+        self.get_atom_keys = [
+            tools.get_tuple_getter([position + 1 for position in positions])
+            for positions in self.common_var_positions]
+        self.atoms_by_key = [{}, {}]
     def validate(self):
         assert len(self.conditions) == 2, self
         left_args = self.conditions[0].args
@@ -90,24 +142,64 @@ class JoinRule(BuildRule):
         assert left_vars & right_vars, self
         assert (left_vars | right_vars) == (left_vars & right_vars) | eff_vars, self
     def update_index(self, new_atom, cond_index):
-        ordered_common_args = [
-            new_atom.args[position]
-            for position in self.common_var_positions[cond_index]]
-        key = tuple(ordered_common_args)
-        self.atoms_by_key[cond_index].setdefault(key, []).append(new_atom)
-    def fire(self, new_atom, cond_index, enqueue_func):
+        index = self.atoms_by_key[cond_index]
+        if index is not None:
+            key = self.get_atom_keys[cond_index](new_atom)
+            index.setdefault(key, []).append(new_atom)
+    def fire(self, new_atom, cond_index, queue):
         effect_args = self.prepare_effect(new_atom, cond_index)
-        ordered_common_args = [
-            new_atom.args[position]
-            for position in self.common_var_positions[cond_index]]
-        key = tuple(ordered_common_args)
+        key = self.get_atom_keys[cond_index](new_atom)
         other_cond_index = 1 - cond_index
         other_cond = self.conditions[other_cond_index]
         for atom in self.atoms_by_key[other_cond_index].get(key, []):
-            for var_no, obj in zip(other_cond.args, atom.args):
+            for var_no, obj in zip(other_cond.args, atom[1:]):
                 if isinstance(var_no, int):
                     effect_args[var_no] = obj
-            enqueue_func(self.effect.predicate, effect_args)
+            queue.push(self.effect.predicate, effect_args)
+    def release_indexes(self, active_predicates):
+        # The index of one condition is only used when atoms for the other
+        # condition arrive.
+        num_released = 0
+        for cond_index, cond in enumerate(self.conditions):
+            other_index = self.atoms_by_key[1 - cond_index]
+            if other_index is not None and cond.predicate not in active_predicates:
+                num_released += sum(len(atoms) for atoms in other_index.values())
+                self.atoms_by_key[1 - cond_index] = None
+        return num_released
+    def has_indexes(self):
+        return any(index is not None for index in self.atoms_by_key)
+    def prepare_batches(self):
+        super().prepare_batches()
+        self.get_keys = [tools.get_tuple_getter(positions)
+                         for positions in self.common_var_positions]
+    def fire_batch(self, new_args_lists):
+        """Return the effect arguments of all rule applications that use
+        at least one of the new argument tuples (a list or None for each
+        condition). Afterwards, the new tuples are considered known.
+
+        The result consists of new_left x (known_right + new_right) and
+        known_left x new_right."""
+        new_left, new_right = new_args_lists
+        left_index, right_index = self.atoms_by_key
+        get_left_key, get_right_key = self.get_keys
+        get_effect_args = self.get_effect_args
+        constants = self.effect_constants
+        result = []
+        if new_right and right_index is not None:
+            for args in new_right:
+                right_index.setdefault(get_right_key(args), []).append(args)
+        if new_left:
+            for args in new_left:
+                for right_args in right_index.get(get_left_key(args), ()):
+                    result.append(get_effect_args(args + right_args + constants))
+        if new_right:
+            for args in new_right:
+                for left_args in left_index.get(get_right_key(args), ()):
+                    result.append(get_effect_args(left_args + args + constants))
+        if new_left and left_index is not None:
+            for args in new_left:
+                left_index.setdefault(get_left_key(args), []).append(args)
+        return result
 
 class ProductRule(BuildRule):
     def __init__(self, effect, conditions):
@@ -115,6 +207,32 @@ class ProductRule(BuildRule):
         self.conditions = conditions
         self.atoms_by_index = [[] for c in self.conditions]
         self.empty_atom_list_no = len(self.conditions)
+        # Instead of the atoms themselves, the queue-based engine stores
+        # the bindings of each atom, i.e., the tuple of its arguments at the
+        # positions of the variables of the condition. The new atoms are
+        # built from the concatenation of the bindings for all conditions
+        # and of the predicate and the constant arguments of the effect.
+        self.get_bindings = []
+        var_positions = {}
+        offset = 0
+        for cond in conditions:
+            positions = [pos for pos, arg in enumerate(cond.args)
+                         if isinstance(arg, int)]
+            for pos in positions:
+                var_positions[cond.args[pos]] = offset
+                offset += 1
+            self.get_bindings.append(
+                tools.get_tuple_getter([pos + 1 for pos in positions]))
+        self.atom_constants = (effect.predicate,) + tuple(
+            arg for arg in effect.args if not isinstance(arg, int))
+        atom_positions = [offset]
+        for arg in effect.args:
+            if isinstance(arg, int):
+                atom_positions.append(var_positions[arg])
+            else:
+                offset += 1
+                atom_positions.append(offset)
+        self.get_atom = tools.get_tuple_getter(atom_positions)
     def validate(self):
         assert len(self.conditions) >= 2, self
         cond_vars = [{v for v in cond.args
@@ -126,39 +244,60 @@ class ProductRule(BuildRule):
         assert len(all_cond_vars) == len(eff_vars), self
         assert len(all_cond_vars) == sum([len(c) for c in cond_vars])
     def update_index(self, new_atom, cond_index):
-        atom_list = self.atoms_by_index[cond_index]
-        if not atom_list:
+        bindings_list = self.atoms_by_index[cond_index]
+        if bindings_list is None:
+            # Released, see release_indexes.
+            return
+        if not bindings_list:
             self.empty_atom_list_no -= 1
-        atom_list.append(new_atom)
+        bindings_list.append(self.get_bindings[cond_index](new_atom))
 
-    def _get_bindings(self, atom, cond):
-        return [(var_no, obj) for var_no, obj in zip(cond.args, atom.args)
-                if isinstance(var_no, int)]
-
-    def fire(self, new_atom, cond_index, enqueue_func):
+    def fire(self, new_atom, cond_index, queue):
         if self.empty_atom_list_no:
             return
 
-        # Binding: a (var_no, object) pair
-        # Bindings: List-of(Binding)
-        # BindingsFactor: List-of(Bindings)
-        # BindingsFactors: List-of(BindingsFactor)
-        bindings_factors = []
-        for pos, cond in enumerate(self.conditions):
-            if pos == cond_index:
+        # Combine the bindings of the new atom with all bindings of the
+        # other conditions, and build all new atoms at once.
+        factors = list(self.atoms_by_index)
+        factors[cond_index] = [self.get_bindings[cond_index](new_atom)]
+        factors.append([self.atom_constants])
+        combinations = itertools.product(*factors)
+        queue.push_atoms(list(map(self.get_atom, map(
+            tuple, map(itertools.chain.from_iterable, combinations)))))
+    def fire_batch(self, new_args_lists):
+        """See JoinRule.fire_batch. The new tuples of each condition are
+        combined with the known tuples of all other conditions, where the
+        conditions before it already include their new tuples."""
+        get_effect_args = self.get_effect_args
+        constants = self.effect_constants
+        chain = itertools.chain.from_iterable
+        result = []
+        for cond_index, new_args in enumerate(new_args_lists):
+            if not new_args:
                 continue
-            atoms = self.atoms_by_index[pos]
-            assert atoms, "if we have no atoms, this should never be called"
-            factor = [self._get_bindings(atom, cond) for atom in atoms]
-            bindings_factors.append(factor)
-
-        eff_args = self.prepare_effect(new_atom, cond_index)
-
-        for bindings_list in itertools.product(*bindings_factors):
-            bindings = itertools.chain(*bindings_list)
-            for var_no, obj in bindings:
-                eff_args[var_no] = obj
-            enqueue_func(self.effect.predicate, eff_args)
+            factors = list(self.atoms_by_index)
+            factors[cond_index] = new_args
+            if all(factors):
+                factors.append([constants])
+                result.extend(map(get_effect_args, map(
+                    tuple, map(chain, itertools.product(*factors)))))
+            if self.atoms_by_index[cond_index] is not None:
+                self.atoms_by_index[cond_index].extend(new_args)
+        return result
+    def release_indexes(self, active_predicates):
+        # The atoms of one condition are only used when atoms for another
+        # condition arrive. Empty lists are kept for empty_atom_list_no.
+        num_released = 0
+        for cond_index, atoms in enumerate(self.atoms_by_index):
+            if atoms and not any(
+                    cond.predicate in active_predicates
+                    for pos, cond in enumerate(self.conditions)
+                    if pos != cond_index):
+                num_released += len(atoms)
+                self.atoms_by_index[cond_index] = None
+        return num_released
+    def has_indexes(self):
+        return any(atoms is not None for atoms in self.atoms_by_index)
 
 
 class ProjectRule(BuildRule):
@@ -169,118 +308,104 @@ class ProjectRule(BuildRule):
         assert len(self.conditions) == 1
     def update_index(self, new_atom, cond_index):
         pass
-    def fire(self, new_atom, cond_index, enqueue_func):
+    def release_indexes(self, active_predicates):
+        return 0
+    def has_indexes(self):
+        return False
+    def fire(self, new_atom, cond_index, queue):
         effect_args = self.prepare_effect(new_atom, cond_index)
-        enqueue_func(self.effect.predicate, effect_args)
+        queue.push(self.effect.predicate, effect_args)
+    def fire_batch(self, new_args_lists):
+        """See JoinRule.fire_batch."""
+        get_effect_args = self.get_effect_args
+        constants = self.effect_constants
+        return [get_effect_args(args + constants)
+                for args in new_args_lists[0]]
 
 class Unifier:
+    # For each predicate, the conditions that an atom of the predicate can
+    # match are precomputed: as a tuple if no condition of the predicate
+    # has constant arguments and as a MatchTable otherwise. unify returns
+    # these tuples without copying them.
     def __init__(self, rules):
-        self.predicate_to_rule_generator = {}
+        conditions_by_predicate = {}
         for rule in rules:
-            for i, cond in enumerate(rule.conditions):
-                self._insert_condition(rule, i)
+            for cond_index, cond in enumerate(rule.conditions):
+                conditions_by_predicate.setdefault(cond.predicate, []).append(
+                    (rule, cond_index))
+        self.predicate_to_matches = {}
+        self.predicate_to_match_table = {}
+        for pred, conditions in conditions_by_predicate.items():
+            table = MatchTable(conditions)
+            if table.constant_positions:
+                self.predicate_to_match_table[pred] = table
+            else:
+                self.predicate_to_matches[pred] = tuple(conditions)
     def unify(self, atom):
-        result = []
-        generator = self.predicate_to_rule_generator.get(atom.predicate)
-        if generator:
-            generator.generate(atom, result)
-        return result
-    def _insert_condition(self, rule, cond_index):
-        condition = rule.conditions[cond_index]
-        root = self.predicate_to_rule_generator.get(condition.predicate)
-        if not root:
-            root = LeafGenerator()
-        constant_arguments = [
-            (arg_index, arg)
-            for (arg_index, arg) in enumerate(condition.args)
-            if not isinstance(arg, int) and arg[0] != "?"]
-        newroot = root._insert(constant_arguments, (rule, cond_index))
-        self.predicate_to_rule_generator[condition.predicate] = newroot
+        matches = self.predicate_to_matches.get(atom[0])
+        if matches is not None:
+            return matches
+        table = self.predicate_to_match_table.get(atom[0])
+        if table is None:
+            return ()
+        return table.get_matches(atom)
     def dump(self):
-        predicates = sorted(self.predicate_to_rule_generator)
         print("Unifier:")
-        for pred in predicates:
+        for pred, matches in sorted(self.predicate_to_matches.items(),
+                                    key=lambda item: str(item[0])):
+            print("    %s:" % pred)
+            for match in matches:
+                print("        %s" % (match,))
+        for pred, table in sorted(self.predicate_to_match_table.items(),
+                                  key=lambda item: str(item[0])):
             print("    %s:" % pred)
-            rule_gen = self.predicate_to_rule_generator[pred]
-            rule_gen.dump("    " * 2)
+            table.dump("    " * 2)
 
-class LeafGenerator:
-    index = sys.maxsize
-    def __init__(self):
-        self.matches = []
-    def empty(self):
-        return not self.matches
-    def generate(self, atom, result):
-        result += self.matches
-    def _insert(self, args, value):
-        if not args:
-            self.matches.append(value)
-            return self
-        else:
-            root = LeafGenerator()
-            root.matches.append(value)
-            for arg_index, arg in args[::-1]:
-                new_root = MatchGenerator(arg_index, LeafGenerator())
-                new_root.match_generator[arg] = root
-                root = new_root
-            root.matches = self.matches # can be swapped in C++
-            return root
+class MatchTable:
+    """Maps the arguments of an atom at the positions where some condition
+    has a constant to the tuple of conditions (pairs (rule, cond_index))
+    that the atom matches. Entries are computed on first use."""
+    def __init__(self, conditions):
+        self.constant_positions = sorted({
+            pos for rule, cond_index in conditions
+            for pos, arg in enumerate(rule.conditions[cond_index].args)
+            if not isinstance(arg, int) and arg[0] != "?"})
+        # Atoms are tuples (predicate, arg1, ..., argN), see Queue.
+        self.get_key = tools.get_tuple_getter(
+            [pos + 1 for pos in self.constant_positions])
+        self.conditions = []
+        for rule, cond_index in conditions:
+            args = rule.conditions[cond_index].args
+            constants = [(key_index, args[pos]) for key_index, pos
+                         in enumerate(self.constant_positions)
+                         if not isinstance(args[pos], int) and
+                         args[pos][0] != "?"]
+            self.conditions.append((rule, cond_index, constants))
+        self.matches_by_key = {}
+    def get_matches(self, atom):
+        key = self.get_key(atom)
+        matches = self.matches_by_key.get(key)
+        if matches is None:
+            matches = tuple(
+                (rule, cond_index)
+                for rule, cond_index, constants in self.conditions
+                if all(key[key_index] == arg for key_index, arg in constants))
+            self.matches_by_key[key] = matches
+        return matches
     def dump(self, indent):
-        for match in self.matches:
-            print("%s%s" % (indent, match))
-
-class MatchGenerator:
-    def __init__(self, index, next):
-        self.index = index
-        self.matches = []
-        self.match_generator = {}
-        self.next = next
-    def empty(self):
-        return False
-    def generate(self, atom, result):
-        result += self.matches
-        generator = self.match_generator.get(atom.args[self.index])
-        if generator:
-            generator.generate(atom, result)
-        self.next.generate(atom, result)
-    def _insert(self, args, value):
-        if not args:
-            self.matches.append(value)
-            return self
-        else:
-            arg_index, arg = args[0]
-            if self.index < arg_index:
-                self.next = self.next._insert(args, value)
-                return self
-            elif self.index > arg_index:
-                new_parent = MatchGenerator(arg_index, self)
-                new_branch = LeafGenerator()._insert(args[1:], value)
-                new_parent.match_generator[arg] = new_branch
-                return new_parent
-            else:
-                branch_generator = self.match_generator.get(arg)
-                if not branch_generator:
-                    branch_generator = LeafGenerator()
-                self.match_generator[arg] = branch_generator._insert(
-                    args[1:], value)
-                return self
-    def dump(self, indent):
-        for match in self.matches:
-            print("%s%s" % (indent, match))
-        for key in sorted(self.match_generator.keys()):
-            print("%sargs[%s] == %s:" % (indent, self.index, key))
-            self.match_generator[key].dump(indent + "    ")
-        if not self.next.empty():
-            assert isinstance(self.next, MatchGenerator)
-            print("%s[*]" % indent)
-            self.next.dump(indent + "    ")
+        for rule, cond_index, constants in self.conditions:
+            print("%s%s if %s" % (indent, (rule, cond_index), ", ".join(
+                "args[%d] == %s" % (self.constant_positions[key_index], arg)
+                for key_index, arg in constants) or "always"))
 
 class Queue:
+    # To save time and memory, atoms are represented as tuples
+    # (predicate, arg1, ..., argN) rather than as pddl.Atom objects while
+    # computing the model. The same tuples are used for deduplication.
     def __init__(self, atoms):
         self.queue = atoms
         self.queue_pos = 0
-        self.enqueued = {(atom.predicate,) + tuple(atom.args)
-                         for atom in self.queue}
+        self.enqueued = set(self.queue)
         self.num_pushes = len(atoms)
     def __bool__(self):
         return self.queue_pos < len(self.queue)
@@ -290,42 +415,674 @@ class Queue:
         eff_tuple = (predicate,) + tuple(args)
         if eff_tuple not in self.enqueued:
             self.enqueued.add(eff_tuple)
-            self.queue.append(pddl.Atom(predicate, list(args)))
+            self.queue.append(eff_tuple)
+    def push_atoms(self, atoms):
+        self.num_pushes += len(atoms)
+        enqueued = self.enqueued
+        for atom in atoms:
+            if atom not in enqueued:
+                enqueued.add(atom)
+                self.queue.append(atom)
     def pop(self):
         result = self.queue[self.queue_pos]
         self.queue_pos += 1
         return result
+    def take_processed(self):
+        """Remove the atoms popped so far from the queue and return them.
+        They are still used for deduplication."""
+        processed = self.queue[:self.queue_pos]
+        del self.queue[:self.queue_pos]
+        self.queue_pos = 0
+        return processed
+
+class IndexReleaser:
+    """Release the indexes of rules as soon as they can no longer be used
+    because no more atoms can arrive for the other conditions."""
+    def __init__(self, rules):
+        self.rules = [rule for rule in rules if rule.has_indexes()]
+        self.rules_by_predicate = {}
+        for rule in rules:
+            for cond in rule.conditions:
+                self.rules_by_predicate.setdefault(
+                    cond.predicate, []).append(rule)
+        self.pending_predicates = None
+        self.active_predicates = None
+        self.num_released_atoms = 0
+    def update(self, pending_predicates):
+        """Release all indexes that are no longer needed if atoms of the
+        given predicates are the only ones yet to be processed."""
+        if pending_predicates == self.pending_predicates:
+            return
+        self.pending_predicates = pending_predicates
+        # Predicates that may still get atoms to process.
+        active_predicates = set(pending_predicates)
+        open_list = list(pending_predicates)
+        while open_list:
+            pred = open_list.pop()
+            for rule in self.rules_by_predicate.get(pred, ()):
+                effect_pred = rule.effect.predicate
+                if effect_pred not in active_predicates:
+                    active_predicates.add(effect_pred)
+                    open_list.append(effect_pred)
+        self.active_predicates = active_predicates
+        for rule in self.rules:
+            self.num_released_atoms += rule.release_indexes(active_predicates)
+        self.rules = [rule for rule in self.rules if rule.has_indexes()]
+
+def get_static_predicates(rules):
+    """Return the predicates that cannot be derived from fluent atoms,
+    i.e., those that only occur in facts and the ones that are only
+    derived by rules whose conditions use static predicates."""
+    rules_by_effect = {}
+    for rule in rules:
+        rules_by_effect.setdefault(rule.effect.predicate, []).append(rule)
+    static_predicates = {
+        cond.predicate for rule in rules for cond in rule.conditions
+        if cond.predicate not in rules_by_effect}
+    changed = True
+    while changed:
+        changed = False
+        for pred, pred_rules in rules_by_effect.items():
+            if pred not in static_predicates and all(
+                    cond.predicate in static_predicates
+                    for rule in pred_rules for cond in rule.conditions):
+                static_predicates.add(pred)
+                changed = True
+    return static_predicates
+
+def evaluate_static_rules(rules, fact_atoms, rule_statistics=None):
+    """Apply the rules whose conditions only use static predicates until
+    no more atoms can be derived.
+
+    Return the static predicates, the remaining rules and a dict mapping
+    each predicate to the list of argument tuples of the facts and of the
+    atoms derived by the static rules."""
+    static_predicates = get_static_predicates(rules)
+    static_rules_by_predicate = {}
+    remaining_rules = []
+    for rule in rules:
+        rule.prepare_batches()
+        if all(cond.predicate in static_predicates for cond in rule.conditions):
+            for cond_index, cond in enumerate(rule.conditions):
+                static_rules_by_predicate.setdefault(
+                    cond.predicate, []).append((rule, cond_index))
+        else:
+            remaining_rules.append(rule)
+    args_by_predicate = {}
+    known_args_by_predicate = {}
+    delta = {}
+    for atom in fact_atoms:
+        known_args = known_args_by_predicate.setdefault(atom.predicate, set())
+        if atom.args not in known_args:
+            known_args.add(atom.args)
+            args_by_predicate.setdefault(atom.predicate, []).append(atom.args)
+            delta.setdefault(atom.predicate, []).append(atom.args)
+    # Same as in compute_model_semi_naive, but we only need to continue with
+    # the atoms of static predicates.
+    while delta:
+        new_args_by_rule = {}
+        for pred, new_args in delta.items():
+            for rule, cond_index in static_rules_by_predicate.get(pred, ()):
+                new_args_lists = new_args_by_rule.setdefault(
+                    rule, [None] * len(rule.conditions))
+                new_args_lists[cond_index] = rule.filter_batch(
+                    new_args, cond_index)
+        delta = {}
+        for rule, new_args_lists in new_args_by_rule.items():
+            start_time = time.perf_counter()
+            pred = rule.effect.predicate
+            known_args = known_args_by_predicate.setdefault(pred, set())
+            num_known_args = len(known_args)
+            derived_args = rule.fire_batch(new_args_lists)
+            for args in derived_args:
+                if args not in known_args:
+                    known_args.add(args)
+                    args_by_predicate.setdefault(pred, []).append(args)
+                    if pred in static_predicates:
+                        delta.setdefault(pred, []).append(args)
+            if rule_statistics is not None:
+                rule_statistics.add(
+                    rule, len(derived_args), len(known_args) - num_known_args,
+                    time.perf_counter() - start_time)
+    return static_predicates, remaining_rules, args_by_predicate
+
+def print_join_size_estimates(estimates, auxiliary_atoms_by_predicate):
+    if not estimates:
+        return
+    print("%d intermediate relations: estimated size %.1f, actual size %d" % (
+        len(estimates), sum(estimates.values()),
+        sum(auxiliary_atoms_by_predicate.get(pred, 0) for pred in estimates)))
+    largest = sorted(estimates, key=lambda pred: (
+        -auxiliary_atoms_by_predicate.get(pred, 0), -estimates[pred], pred))
+    for pred in largest[:5]:
+        print("  %s: estimated size %.1f, actual size %d" % (
+            pred, estimates[pred], auxiliary_atoms_by_predicate.get(pred, 0)))
+
+class RuleStatistics:
+    """The work done by each rule while computing the model (see option
+    --rule-statistics): the number of times it fired, the number of atoms
+    it derived, how many of them were new, and the time spent in it.
+
+    Rules split from the same rule of the original program (see
+    split_rules) are attributed to the action or axiom of that rule."""
+    def __init__(self, rules=(), rule_origins=()):
+        self.rules = list(rules)
+        self.origins = dict(zip(self.rules, rule_origins))
+        # Maps each rule to [fires, derived atoms, new atoms, seconds].
+        self.by_rule = {}
+    def add(self, rule, num_derived, num_new, seconds):
+        entry = self.by_rule.get(rule)
+        if entry is None:
+            entry = self.by_rule[rule] = [0, 0, 0, 0.0]
+        entry[0] += 1
+        entry[1] += num_derived
+        entry[2] += num_new
+        entry[3] += seconds
+    def get_results(self):
+        """Return a dict for each rule, starting with the most expensive."""
+        results = []
+        for rule in self.rules:
+            fires, derived, new, seconds = self.by_rule.get(rule, [0, 0, 0, 0.0])
+            results.append({
+                "rule": format_rule(rule),
+                "origin": get_origin_name(self.origins.get(rule)),
+                "fires": fires,
+                "derived atoms": derived,
+                "duplicate atoms": derived - new,
+                "time": seconds,
+            })
+        results.sort(key=lambda result: (-result["time"], -result["fires"]))
+        return results
+    def print_report(self, num_rules=10):
+        results = self.get_results()
+        print("Rules with the highest time (of %d rules, %.3fs in total):" % (
+            len(results), sum(result["time"] for result in results)))
+        for result in results[:num_rules]:
+            print("  %.3fs, %d fires, %d atoms, %d duplicates: %s [%s]" % (
+                result["time"], result["fires"], result["derived atoms"],
+                result["duplicate atoms"], result["rule"], result["origin"]))
+        # The origins sum up the work of all rules split from them.
+        time_by_origin = {}
+        for result in results:
+            time_by_origin[result["origin"]] = (
+                time_by_origin.get(result["origin"], 0) + result["time"])
+        print("Origins with the highest time:")
+        for origin, seconds in sorted(time_by_origin.items(), key=lambda
+                                      item: (-item[1], item[0]))[:num_rules]:
+            print("  %.3fs: %s" % (seconds, origin))
+    def write_json(self, filename):
+        with open(filename, "w") as output_file:
+            json.dump(self.get_results(), output_file, indent=2)
+
+def get_predicate_name(predicate):
+    if isinstance(predicate, (pddl.Action, pddl.Axiom)):
+        return predicate.name
+    return str(predicate)
+
+def format_rule(rule):
+    def format_atom(atom):
+        # Variables that occur in the effect are numbered by their position.
+        args = ["?%d" % arg if isinstance(arg, int) else arg
+                for arg in atom.args]
+        return "%s(%s)" % (get_predicate_name(atom.predicate), ", ".join(args))
+    return "%s :- %s" % (format_atom(rule.effect),
+                         ", ".join(map(format_atom, rule.conditions)))
+
+def get_origin_name(original_rule):
+    """Return the action or axiom that the rule of the original program was
+    built for (see normalize.build_exploration_rules)."""
+    if original_rule is None:
+        return "unknown"
+    for atom in [original_rule.effect] + original_rule.conditions:
+        if isinstance(atom.predicate, pddl.Action):
+            return "action %s" % atom.predicate.name
+        elif isinstance(atom.predicate, pddl.Axiom):
+            return "axiom %s" % atom.predicate.name
+    return "rule for %s" % original_rule.effect.predicate
+
+def is_auxiliary_predicate(predicate):
+    # Auxiliary predicates p$N are introduced when splitting rules.
+    return isinstance(predicate, str) and "$" in predicate
 
-def compute_model(prog):
+class DerivedAtoms:
+    """The atoms derived while computing the model. Only the atoms of
+    relevant predicates are kept, the atoms of auxiliary predicates are
+    counted (see print_join_size_estimates)."""
+    def __init__(self):
+        # Pairs (predicate, list of argument tuples) in derivation order.
+        self.relevant_atoms = []
+        self.auxiliary_atoms_by_predicate = {}
+    def add(self, pred, args_list):
+        if is_auxiliary_predicate(pred):
+            self.auxiliary_atoms_by_predicate[pred] = (
+                self.auxiliary_atoms_by_predicate.get(pred, 0) + len(args_list))
+        else:
+            self.relevant_atoms.append((pred, args_list))
+    def update(self, other):
+        self.relevant_atoms.extend(other.relevant_atoms)
+        for pred, num_atoms in other.auxiliary_atoms_by_predicate.items():
+            self.auxiliary_atoms_by_predicate[pred] = (
+                self.auxiliary_atoms_by_predicate.get(pred, 0) + num_atoms)
+    def get_num_atoms(self):
+        return (sum(len(args_list) for _, args_list in self.relevant_atoms) +
+                sum(self.auxiliary_atoms_by_predicate.values()))
+
+def compute_fluent_atoms_with_queue(rules, static_predicates,
+                                    args_by_predicate, rule_statistics=None):
+    """Compute the atoms of the fluent predicates derived by the given rules
+    from the facts and static atoms in args_by_predicate, recording the
+    work of each rule in rule_statistics if given.
+
+    Return the DerivedAtoms and a list of pairs (statistic, value)."""
+    # The atoms of static predicates never enter the queue: they are
+    # added to the indexes of the rules in advance.
+    for rule in rules:
+        for cond_index, cond in enumerate(rule.conditions):
+            if cond.predicate in static_predicates:
+                for args in rule.filter_batch(
+                        args_by_predicate.get(cond.predicate, []), cond_index):
+                    rule.update_index((cond.predicate,) + args, cond_index)
+    unifier = Unifier(rules)
+    # unifier.dump()
+    queue = Queue([(pred,) + args
+                   for pred, args_list in args_by_predicate.items()
+                   if pred not in static_predicates
+                   for args in args_list])
+    releaser = IndexReleaser(rules)
+    derived_atoms = DerivedAtoms()
+    # The atoms of auxiliary predicates by predicate. They are only needed
+    # for deduplication while atoms of their predicate can be derived.
+    auxiliary_atoms = {}
+    def take_processed_atoms():
+        for pred, pred_atoms in itertools.groupby(
+                queue.take_processed(), key=itemgetter(0)):
+            pred_atoms = list(pred_atoms)
+            if is_auxiliary_predicate(pred):
+                auxiliary_atoms.setdefault(pred, []).extend(pred_atoms)
+                derived_atoms.add(pred, pred_atoms)
+            else:
+                derived_atoms.add(pred, [atom[1:] for atom in pred_atoms])
+    layer_end = 0
+    while queue:
+        if queue.queue_pos == layer_end:
+            # The atoms derived from the previous layer form the next one.
+            take_processed_atoms()
+            layer_end = len(queue.queue)
+            releaser.update({atom[0] for atom in queue.queue})
+            for pred in list(auxiliary_atoms):
+                if pred not in releaser.active_predicates:
+                    queue.enqueued.difference_update(auxiliary_atoms.pop(pred))
+        next_atom = queue.pop()
+        matches = unifier.unify(next_atom)
+        if rule_statistics is None:
+            for rule, cond_index in matches:
+                rule.update_index(next_atom, cond_index)
+                rule.fire(next_atom, cond_index, queue)
+        else:
+            for rule, cond_index in matches:
+                start_time = time.perf_counter()
+                num_pushes = queue.num_pushes
+                queue_length = len(queue.queue)
+                rule.update_index(next_atom, cond_index)
+                rule.fire(next_atom, cond_index, queue)
+                rule_statistics.add(
+                    rule, queue.num_pushes - num_pushes,
+                    len(queue.queue) - queue_length,
+                    time.perf_counter() - start_time)
+    take_processed_atoms()
+    statistics = [
+        ("atoms released early from rule indexes", releaser.num_released_atoms),
+        ("final queue length", derived_atoms.get_num_atoms()),
+        ("total queue pushes", queue.num_pushes)]
+    return derived_atoms, statistics
+
+def compute_fluent_atoms_semi_naive(rules, static_predicates,
+                                    args_by_predicate, rule_statistics=None):
+    """See compute_fluent_atoms_with_queue."""
+    # Semi-naive evaluation: in each round, every rule is only applied to
+    # combinations of atoms that use at least one atom derived in the
+    # previous round (the "delta"). Atoms are represented as tuples of
+    # arguments, grouped by predicate. The result contains the same atoms
+    # as the one of the queue-based engine, ordered by round instead of by
+    # queue position.
+    rules_by_predicate = {}
+    for rule in rules:
+        static_args_lists = [None] * len(rule.conditions)
+        for cond_index, cond in enumerate(rule.conditions):
+            if cond.predicate in static_predicates:
+                static_args_lists[cond_index] = rule.filter_batch(
+                    args_by_predicate.get(cond.predicate, []), cond_index)
+            else:
+                rules_by_predicate.setdefault(cond.predicate, []).append(
+                    (rule, cond_index))
+        if any(args_list is not None for args_list in static_args_lists):
+            # Since no atoms of fluent predicates are known yet, this only
+            # adds the atoms of static predicates to the indexes.
+            derived_args = rule.fire_batch(static_args_lists)
+            assert not derived_args
+    derived_atoms = DerivedAtoms()
+    known_args_by_predicate = {}
+    delta = {}
+    for pred, args_list in args_by_predicate.items():
+        if pred not in static_predicates:
+            known_args_by_predicate[pred] = set(args_list)
+            delta[pred] = args_list
+    releaser = IndexReleaser(rules)
+    num_rounds = 0
+    num_derivations = 0
+    while delta:
+        num_rounds += 1
+        releaser.update(set(delta))
+        # No more atoms are derived for inactive predicates, so we no
+        # longer need to check for duplicates.
+        for pred in list(known_args_by_predicate):
+            if pred not in releaser.active_predicates:
+                del known_args_by_predicate[pred]
+        for pred, args_list in delta.items():
+            derived_atoms.add(pred, args_list)
+        new_args_by_rule = {}
+        for pred, new_args in delta.items():
+            for rule, cond_index in rules_by_predicate.get(pred, ()):
+                new_args_lists = new_args_by_rule.setdefault(
+                    rule, [None] * len(rule.conditions))
+                new_args_lists[cond_index] = rule.filter_batch(
+                    new_args, cond_index)
+        delta = {}
+        for rule, new_args_lists in new_args_by_rule.items():
+            start_time = time.perf_counter()
+            pred = rule.effect.predicate
+            derived_args = rule.fire_batch(new_args_lists)
+            num_derivations += len(derived_args)
+            known_args = known_args_by_predicate.setdefault(pred, set())
+            num_known_args = len(known_args)
+            for args in derived_args:
+                if args not in known_args:
+                    known_args.add(args)
+                    delta.setdefault(pred, []).append(args)
+            if rule_statistics is not None:
+                rule_statistics.add(
+                    rule, len(derived_args), len(known_args) - num_known_args,
+                    time.perf_counter() - start_time)
+    statistics = [
+        ("atoms released early from rule indexes", releaser.num_released_atoms),
+        ("rounds", num_rounds),
+        ("total derivations", num_derivations)]
+    return derived_atoms, statistics
+
+ENGINES = {
+    "queue": compute_fluent_atoms_with_queue,
+    "semi-naive": compute_fluent_atoms_semi_naive,
+}
+
+def get_independent_components(rules, static_predicates):
+    """Partition the rules into groups that can be evaluated independently
+    once the static atoms are known, i.e., the connected components of the
+    graph connecting the fluent predicates in the effect and the conditions
+    of each rule.
+
+    Unlike strongly connected components, these need no atoms from each
+    other, so the workers only have to send their results back. Most of
+    the work is done in a single strongly connected component of the
+    action and effect predicates anyway (e.g., 43216 of 47048 atoms on
+    satellite p25-HC-pfile5), so evaluating independent strongly
+    connected components concurrently would not gain more."""
+    parent = {}
+    def find(pred):
+        while parent.setdefault(pred, pred) != pred:
+            parent[pred] = parent[parent[pred]]
+            pred = parent[pred]
+        return pred
+    for rule in rules:
+        root = find(rule.effect.predicate)
+        for cond in rule.conditions:
+            if cond.predicate not in static_predicates:
+                cond_root = find(cond.predicate)
+                if cond_root != root:
+                    parent[cond_root] = root
+    components = {}
+    for rule in rules:
+        components.setdefault(find(rule.effect.predicate), []).append(rule)
+    return list(components.values())
+
+# Set before starting the worker processes, which inherit it.
+_worker_input = None
+
+def _compute_component(component_index):
+    (engine, components, static_predicates, args_by_predicate, predicate_ids,
+     rule_statistics) = _worker_input
+    rules = components[component_index]
+    component_predicates = {rule.effect.predicate for rule in rules}
+    for rule in rules:
+        component_predicates.update(cond.predicate for cond in rule.conditions)
+    component_args = {
+        pred: args_list for pred, args_list in args_by_predicate.items()
+        if pred in component_predicates}
+    derived_atoms, statistics = ENGINES[engine](
+        rules, static_predicates, component_args, rule_statistics)
+    # Predicates may be actions and axioms, which must not be copied.
+    # For the same reason, rules are referred to by their position.
+    rule_results = []
+    if rule_statistics is not None:
+        rule_results = [(rule_index, rule_statistics.by_rule[rule])
+                        for rule_index, rule in enumerate(rules)
+                        if rule in rule_statistics.by_rule]
+    return ([(predicate_ids[pred], args_list)
+             for pred, args_list in derived_atoms.relevant_atoms],
+            derived_atoms.auxiliary_atoms_by_predicate, statistics,
+            rule_results)
+
+def compute_fluent_atoms_in_parallel(
+        engine, components, static_predicates, args_by_predicate, num_jobs,
+        rule_statistics=None):
+    global _worker_input
+    predicates = list(args_by_predicate)
+    for rules in components:
+        for rule in rules:
+            predicates.append(rule.effect.predicate)
+    predicate_ids = {pred: pred_id for pred_id, pred in enumerate(predicates)}
+    # Each worker collects the statistics of its own rules.
+    worker_rule_statistics = None
+    if rule_statistics is not None:
+        worker_rule_statistics = RuleStatistics()
+    _worker_input = (engine, components, static_predicates, args_by_predicate,
+                     predicate_ids, worker_rule_statistics)
+    try:
+        # Evaluate large components first to balance the load.
+        order = sorted(range(len(components)),
+                       key=lambda index: -len(components[index]))
+        context = multiprocessing.get_context("fork")
+        with context.Pool(min(num_jobs, len(components))) as pool:
+            results = pool.map(_compute_component, order, chunksize=1)
+    finally:
+        _worker_input = None
+    results_by_component = dict(zip(order, results))
+    all_atoms = DerivedAtoms()
+    # Facts of fluent predicates that occur in no rule (such as "=" or
+    # object types that no action uses) belong to no component.
+    rule_predicates = set()
+    for rules in components:
+        for rule in rules:
+            rule_predicates.add(rule.effect.predicate)
+            rule_predicates.update(cond.predicate for cond in rule.conditions)
+    for pred, args_list in args_by_predicate.items():
+        if pred not in static_predicates and pred not in rule_predicates:
+            all_atoms.add(pred, args_list)
+    all_statistics = None
+    for index in range(len(components)):
+        (relevant_atoms, auxiliary_atoms_by_predicate, statistics,
+         rule_results) = results_by_component[index]
+        for rule_index, rule_result in rule_results:
+            rule_statistics.by_rule[components[index][rule_index]] = rule_result
+        derived_atoms = DerivedAtoms()
+        derived_atoms.relevant_atoms = [
+            (predicates[pred_id], args_list)
+            for pred_id, args_list in relevant_atoms]
+        derived_atoms.auxiliary_atoms_by_predicate = (
+            auxiliary_atoms_by_predicate)
+        all_atoms.update(derived_atoms)
+        if all_statistics is None:
+            all_statistics = statistics
+        else:
+            all_statistics = [(name, value + other_value) for
+                              (name, value), (_, other_value) in
+                              zip(all_statistics, statistics)]
+    return all_atoms, all_statistics
+
+def compute_model(prog, engine="queue", num_jobs=1,
+                  print_rule_statistics=False, rule_statistics_file=None):
+    """Return the relevant atoms of the model of the Datalog program.
+
+    engine is a key of ENGINES. With num_jobs > 1, independent components
+    of the program are evaluated in parallel. The statistics of the rules
+    are printed and/or written as JSON to rule_statistics_file if
+    requested."""
     with timers.timing("Preparing model"):
         rules = convert_rules(prog)
-        unifier = Unifier(rules)
-        # unifier.dump()
         fact_atoms = sorted(fact.atom for fact in prog.facts)
-        queue = Queue(fact_atoms)
-
     print("Generated %d rules." % len(rules))
+    rule_statistics = None
+    if print_rule_statistics or rule_statistics_file:
+        rule_statistics = RuleStatistics(rules, prog.rule_origins)
+    with timers.timing("Computing static atoms"):
+        static_predicates, rules, args_by_predicate = evaluate_static_rules(
+            rules, fact_atoms, rule_statistics)
+    static_atoms = [(pred, args_list)
+                    for pred, args_list in args_by_predicate.items()
+                    if pred in static_predicates]
+    print("%d static atoms" % sum(
+        len(args_list) for _, args_list in static_atoms))
+
     with timers.timing("Computing model"):
+        components = [rules]
+        if num_jobs > 1 and "fork" in (
+                multiprocessing.get_all_start_methods()):
+            components = get_independent_components(rules, static_predicates)
+            print("%d independent components" % len(components))
+        if len(components) > 1:
+            fluent_atoms, statistics = compute_fluent_atoms_in_parallel(
+                engine, components, static_predicates,
+                args_by_predicate, num_jobs, rule_statistics)
+        else:
+            fluent_atoms, statistics = ENGINES[engine](
+                rules, static_predicates, args_by_predicate, rule_statistics)
+        derived_atoms = DerivedAtoms()
+        for pred, args_list in static_atoms:
+            derived_atoms.add(pred, args_list)
+        derived_atoms.update(fluent_atoms)
         relevant_atoms = 0
-        auxiliary_atoms = 0
+        model = []
+        for pred, args_list in derived_atoms.relevant_atoms:
+            relevant_atoms += len(args_list)
+            # Only the relevant atoms are needed for instantiation.
+            model.extend(pddl.Atom(pred, args) for args in args_list)
+    auxiliary_atoms_by_predicate = derived_atoms.auxiliary_atoms_by_predicate
+    print("%d relevant atoms" % relevant_atoms)
+    print("%d auxiliary atoms" % sum(auxiliary_atoms_by_predicate.values()))
+    for name, value in statistics:
+        print("%d %s" % (value, name))
+    print_join_size_estimates(
+        prog.join_size_estimates, auxiliary_atoms_by_predicate)
+    if print_rule_statistics:
+        rule_statistics.print_report()
+    if rule_statistics_file:
+        rule_statistics.write_json(rule_statistics_file)
+    return model
+
+class IncrementalModel:
+    """The model of a Datalog program that can be updated when facts are
+    added to or removed from the program.
+
+    Additions are handled incrementally: the queue-based engine continues
+    from its previous state with the new facts. For removals, the atoms of
+    all predicates that depend on the predicates of the removed facts are
+    discarded and recomputed, while all other atoms and rule indexes are
+    kept. To make this possible, the static pre-pass and the early release
+    of rule indexes are not used here."""
+    def __init__(self, prog):
+        self.rules = convert_rules(prog)
+        facts = list(dict.fromkeys(
+            (atom.predicate,) + tuple(atom.args)
+            for atom in sorted(fact.atom for fact in prog.facts)))
+        self.facts = set(facts)
+        self.queue = Queue(facts)
+        self.unifier = Unifier(self.rules)
+        self._process_queue()
+
+    def _process_queue(self):
+        queue = self.queue
+        unifier = self.unifier
         while queue:
             next_atom = queue.pop()
-            pred = next_atom.predicate
-            if isinstance(pred, str) and "$" in pred:
-                auxiliary_atoms += 1
-            else:
-                relevant_atoms += 1
-            matches = unifier.unify(next_atom)
-            for rule, cond_index in matches:
+            for rule, cond_index in unifier.unify(next_atom):
                 rule.update_index(next_atom, cond_index)
-                rule.fire(next_atom, cond_index, queue.push)
-    print("%d relevant atoms" % relevant_atoms)
-    print("%d auxiliary atoms" % auxiliary_atoms)
-    print("%d final queue length" % len(queue.queue))
-    print("%d total queue pushes" % queue.num_pushes)
-    return queue.queue
+                rule.fire(next_atom, cond_index, queue)
+
+    def _get_dependent_predicates(self, predicates):
+        rules_by_predicate = {}
+        for rule in self.rules:
+            for cond in rule.conditions:
+                rules_by_predicate.setdefault(cond.predicate, []).append(rule)
+        result = set(predicates)
+        stack = list(result)
+        while stack:
+            for rule in rules_by_predicate.get(stack.pop(), ()):
+                if rule.effect.predicate not in result:
+                    result.add(rule.effect.predicate)
+                    stack.append(rule.effect.predicate)
+        return result
+
+    def _recompute(self, predicates):
+        # Rules deriving atoms of the given predicates start over with empty
+        # indexes. Since the predicates are closed under dependency, all
+        # other rules only use atoms that are kept.
+        self.rules = [
+            rule.__class__(rule.effect, rule.conditions)
+            if rule.effect.predicate in predicates else rule
+            for rule in self.rules]
+        new_rules = [rule for rule in self.rules
+                     if rule.effect.predicate in predicates]
+        kept_atoms = [atom for atom in self.queue.queue
+                      if atom[0] not in predicates]
+        self.queue = Queue(kept_atoms)
+        self.queue.queue_pos = len(kept_atoms)
+        self.unifier = Unifier(self.rules)
+        # The kept atoms have already been processed by all other rules.
+        new_rules_unifier = Unifier(new_rules)
+        for atom in kept_atoms:
+            for rule, cond_index in new_rules_unifier.unify(atom):
+                rule.update_index(atom, cond_index)
+                rule.fire(atom, cond_index, self.queue)
+        self.queue.push_atoms(
+            [fact for fact in self.facts if fact[0] in predicates])
+
+    def update(self, added_facts=(), removed_facts=()):
+        """Update the model after adding and removing the given facts, which
+        are pddl.Atom objects.
+
+        Return the number of predicates whose atoms were recomputed."""
+        added = [fact for fact in dict.fromkeys(
+            (atom.predicate,) + tuple(atom.args)
+            for atom in sorted(added_facts)) if fact not in self.facts]
+        removed = {(atom.predicate,) + tuple(atom.args)
+                   for atom in removed_facts} & self.facts
+        self.facts -= removed
+        self.facts.update(added)
+        recomputed_predicates = set()
+        if removed:
+            recomputed_predicates = self._get_dependent_predicates(
+                {fact[0] for fact in removed})
+            self._recompute(recomputed_predicates)
+        self.queue.push_atoms(added)
+        self._process_queue()
+        return len(recomputed_predicates)
+
+    def get_atoms(self):
+        """Return the relevant atoms of the model, see compute_model."""
+        return [pddl.Atom(atom[0], atom[1:]) for atom in self.queue.queue
+                if not is_auxiliary_predicate(atom[0])]
 
 if __name__ == "__main__":
+    import options
     import pddl_parser
     import normalize
     import pddl_to_prolog
@@ -335,9 +1092,11 @@ if __name__ == "__main__":
     print("Normalizing...")
     normalize.normalize(task)
     print("Writing rules...")
-    prog = pddl_to_prolog.translate(task)
+    prog = pddl_to_prolog.translate(task, options.join_order)
 
-    model = compute_model(prog)
+    model = compute_model(
+        prog, options.datalog_engine, options.model_jobs,
+        options.rule_statistics, options.rule_statistics_file)
     for atom in model:
         print(atom)
     print("%d atoms" % len(model))
@@ -1,10 +1,22 @@
-import itertools
+# Results of ConstraintSystem.is_solvable by canonical key of the system.
+# Invariant synthesis builds systems with the same constraints (up to
+# order and duplicates) for the same action many times.
+_solvable_cache = {}
+MAX_CACHE_SIZE = 100000
+
+
+def _get_equality_key(v1, v2):
+    if v1 <= v2:
+        return (v1, v2)
+    return (v2, v1)
+
 
 class NegativeClause:
     # disjunction of inequalities
     def __init__(self, parts):
         self.parts = parts
         assert len(parts)
+        self.key = None
 
     def __str__(self):
         disj = " or ".join(["(%s != %s)" % (v1, v2)
@@ -21,6 +33,12 @@ class NegativeClause:
         new_parts = [(m.get(v1, v1), m.get(v2, v2)) for (v1, v2) in self.parts]
         return NegativeClause(new_parts)
 
+    def get_key(self):
+        if self.key is None:
+            self.key = frozenset(_get_equality_key(v1, v2)
+                                 for (v1, v2) in self.parts)
+        return self.key
+
 
 class Assignment:
     def __init__(self, equalities):
@@ -31,6 +49,7 @@ class Assignment:
         self.consistent = None
         self.mapping = None
         self.eq_classes = None
+        self.key = None
 
     def __str__(self):
         conj = " and ".join(["(%s = %s)" % (v1, v2)
@@ -84,6 +103,12 @@ class Assignment:
             self._compute_mapping()
         return self.mapping
 
+    def get_key(self):
+        if self.key is None:
+            self.key = frozenset(_get_equality_key(v1, v2)
+                                 for (v1, v2) in self.equalities)
+        return self.key
+
 
 class ConstraintSystem:
     def __init__(self):
@@ -102,20 +127,6 @@ class ConstraintSystem:
         neg_clauses = " and ".join(neg_clauses)
         return assigs + "(" + neg_clauses + ")"
 
-    def _all_clauses_satisfiable(self, assignment):
-        mapping = assignment.get_mapping()
-        for neg_clause in self.neg_clauses:
-            clause = neg_clause.apply_mapping(mapping)
-            if not clause.is_satisfiable():
-                return False
-        return True
-
-    def _combine_assignments(self, assignments):
-        new_equalities = []
-        for a in assignments:
-            new_equalities.extend(a.equalities)
-        return Assignment(new_equalities)
-
     def add_assignment(self, assignment):
         self.add_assignment_disjunction([assignment])
 
@@ -147,14 +158,78 @@ class ConstraintSystem:
         for neg_clause in self.neg_clauses:
             print("  NEG: ", str(neg_clause))
 
+    def get_key(self):
+        """Return a key that is equal for systems with the same constraints,
+        regardless of their order and of duplicates."""
+        return (frozenset(frozenset(assignment.get_key()
+                                    for assignment in assignments)
+                          for assignments in self.combinatorial_assignments),
+                frozenset(clause.get_key() for clause in self.neg_clauses))
+
     def is_solvable(self):
         """Check whether the combinatorial assignments include at least
            one consistent assignment under which the negative clauses
            are satisfiable"""
-        for assignments in itertools.product(*self.combinatorial_assignments):
-            combined = self._combine_assignments(assignments)
-            if not combined.is_consistent():
-                continue
-            if self._all_clauses_satisfiable(combined):
+        key = self.get_key()
+        result = _solvable_cache.get(key)
+        if result is None:
+            result = self._solve()
+            if len(_solvable_cache) >= MAX_CACHE_SIZE:
+                _solvable_cache.clear()
+            _solvable_cache[key] = result
+        return result
+
+    def _solve(self):
+        """Choose one assignment of each disjunction by depth-first search,
+        maintaining the equivalence classes of the chosen equalities in a
+        union-find structure. The root of a class is a constant if the
+        class contains one. A partial choice is pruned as soon as it
+        equates two constants or falsifies a negative clause, since
+        further equalities cannot undo this."""
+        disjunctions = sorted(self.combinatorial_assignments, key=len)
+        neg_clauses = [clause.parts for clause in self.neg_clauses]
+        parent = {}
+        trail = []
+
+        def find(item):
+            while item in parent:
+                item = parent[item]
+            return item
+
+        def add_equalities(equalities):
+            for v1, v2 in equalities:
+                root1 = find(v1)
+                root2 = find(v2)
+                if root1 == root2:
+                    continue
+                if not root2.startswith("?"):
+                    if not root1.startswith("?"):
+                        return False
+                    root1, root2 = root2, root1
+                parent[root2] = root1
+                trail.append(root2)
+            return True
+
+        def clauses_satisfiable():
+            for parts in neg_clauses:
+                for v1, v2 in parts:
+                    if find(v1) != find(v2):
+                        break
+                else:
+                    return False
+            return True
+
+        def search(index):
+            if index == len(disjunctions):
                 return True
-        return False
+            for assignment in disjunctions[index]:
+                trail_length = len(trail)
+                if (add_equalities(assignment.equalities) and
+                        clauses_satisfiable() and search(index + 1)):
+                    return True
+                for item in trail[trail_length:]:
+                    del parent[item]
+                del trail[trail_length:]
+            return False
+
+        return clauses_satisfiable() and search(0)
@@ -0,0 +1,96 @@
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+
+# The cache (see option --domain-cache) stores intermediate results of the
+# translator that only depend on the domain file, so that they can be reused
+# when translating other tasks of the same domain. Each entry is identified
+# by the kind of result and a key derived from the contents of the domain
+# file and from the translator itself, so that changes to either invalidate
+# the entry. A missing or unreadable entry is never an error: the result
+# is simply recomputed.
+#
+# The most recently used entries are also kept in memory (in pickled form,
+# so that every load returns fresh objects that the caller may modify) for
+# translating several tasks within the same process.
+
+TRANSLATOR_DIR = os.path.dirname(os.path.abspath(__file__))
+MAX_ENTRIES_IN_MEMORY = 16
+
+_translator_version = None
+_entries_in_memory = {}
+
+
+def _keep_in_memory(path, data):
+    _entries_in_memory.pop(path, None)
+    while len(_entries_in_memory) >= MAX_ENTRIES_IN_MEMORY:
+        # Dictionaries keep the insertion order, so this is the least
+        # recently used entry.
+        del _entries_in_memory[next(iter(_entries_in_memory))]
+    _entries_in_memory[path] = data
+
+
+def get_translator_version():
+    """Return a fingerprint of the translator source code."""
+    global _translator_version
+    if _translator_version is None:
+        hasher = hashlib.sha1()
+        hasher.update(("%d.%d" % sys.version_info[:2]).encode("ascii"))
+        for dirpath, dirnames, filenames in os.walk(TRANSLATOR_DIR):
+            dirnames[:] = sorted(d for d in dirnames if d != "tests")
+            for filename in sorted(filenames):
+                if filename.endswith(".py"):
+                    with open(os.path.join(dirpath, filename), "rb") as source:
+                        hasher.update(filename.encode("utf-8"))
+                        hasher.update(source.read())
+        _translator_version = hasher.hexdigest()
+    return _translator_version
+
+
+def get_key(domain_filename):
+    hasher = hashlib.sha1(get_translator_version().encode("ascii"))
+    with open(domain_filename, "rb") as domain_file:
+        hasher.update(domain_file.read())
+    return hasher.hexdigest()
+
+
+class DomainCache:
+    """The cache entries for the domain file domain_filename, stored in the
+    given directory."""
+    def __init__(self, directory, domain_filename):
+        self.directory = directory
+        self.domain_filename = domain_filename
+
+    def _get_path(self, kind):
+        return os.path.join(self.directory, "%s-%s.pickle" % (
+            get_key(self.domain_filename), kind))
+
+    def load(self, kind):
+        """Return the cached result of the given kind or None if there is
+        no such entry."""
+        try:
+            path = self._get_path(kind)
+            data = _entries_in_memory.get(path)
+            if data is None:
+                with open(path, "rb") as cache_file:
+                    data = cache_file.read()
+            _keep_in_memory(path, data)
+            return pickle.loads(data)
+        except Exception:
+            # Unpickling an outdated or corrupt entry can raise almost any
+            # exception, so all of them are treated as a cache miss.
+            return None
+
+    def store(self, kind, result):
+        path = self._get_path(kind)
+        data = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+        _keep_in_memory(path, data)
+        os.makedirs(self.directory, exist_ok=True)
+        # Write to a temporary file first and then rename it, so that
+        # concurrent translator runs never see incomplete entries.
+        with tempfile.NamedTemporaryFile(
+                dir=self.directory, delete=False) as cache_file:
+            cache_file.write(data)
+        os.replace(cache_file.name, path)
@@ -104,8 +104,12 @@ def collect_all_mutex_groups(groups, atoms):
 def sort_groups(groups):
     return sorted(sorted(group) for group in groups)
 
-def compute_groups(task, atoms, reachable_action_params):
-    groups = invariant_finder.get_groups(task, reachable_action_params)
+def compute_groups(task, atoms, reachable_action_params, cache=None):
+    groups = invariant_finder.get_groups(
+        task, reachable_action_params, cache,
+        options.invariant_generation_max_candidates,
+        options.invariant_generation_max_time,
+        options.invariant_generation_jobs)
 
     with timers.timing("Instantiating groups"):
         groups = instantiate_groups(groups, task, atoms)
@@ -1,5 +1,3 @@
-import sys
-
 import pddl
 import pddl_to_prolog
 
@@ -23,10 +21,64 @@ class OccurrencesTracker:
     def variables(self):
         return set(self.occurrences)
 
+class JoinSizeEstimator:
+    """Estimates the number of atoms of the relations in a rule, based on
+    the number of facts per predicate and on the sizes of the types of the
+    variables, assuming that the arguments of a relation are independent."""
+    def __init__(self, facts, derived_predicates, objects):
+        self.facts_by_predicate = {}
+        for fact in facts:
+            self.facts_by_predicate.setdefault(
+                fact.atom.predicate, []).append(fact.atom.args)
+        self.derived_predicates = derived_predicates
+        self.num_objects = max(len(objects), 1)
+        self.sizes = {}
+        # Estimated sizes of the auxiliary predicates introduced by
+        # greedy_join, for comparing them with the actual sizes.
+        self.estimates = {}
+    def start_rule(self, rule):
+        # Type predicates are unary static predicates "type@<type>".
+        self.domain_sizes = {}
+        for cond in rule.conditions:
+            if (len(cond.args) == 1 and cond.args[0][0] == "?" and
+                    isinstance(cond.predicate, str) and
+                    cond.predicate.startswith("type@")):
+                var = cond.args[0]
+                size = len(self.facts_by_predicate.get(cond.predicate, ()))
+                self.domain_sizes[var] = min(
+                    self.domain_sizes.get(var, self.num_objects), size)
+    def get_domain_size(self, var):
+        return max(self.domain_sizes.get(var, self.num_objects), 1)
+    def get_max_size(self, variables):
+        result = 1.0
+        for var in variables:
+            result *= self.get_domain_size(var)
+        return result
+    def get_size(self, atom):
+        size = self.sizes.get(atom.predicate)
+        if size is not None:
+            return size
+        if atom.predicate in self.derived_predicates:
+            return self.get_max_size(pddl_to_prolog.get_variables([atom]))
+        return sum(
+            1 for args in self.facts_by_predicate.get(atom.predicate, ())
+            if all(arg == obj or arg[0] == "?"
+                   for arg, obj in zip(atom.args, args)))
+    def get_join_size(self, left, right):
+        left_vars = pddl_to_prolog.get_variables([left])
+        right_vars = pddl_to_prolog.get_variables([right])
+        return (self.get_size(left) * self.get_size(right) /
+                self.get_max_size(left_vars & right_vars))
+    def add_relation(self, atom, size):
+        size = min(size, self.get_max_size(pddl_to_prolog.get_variables([atom])))
+        self.sizes[atom.predicate] = size
+        self.estimates[atom.predicate] = size
+
 class CostMatrix:
-    def __init__(self, joinees):
+    def __init__(self, joinees, size_estimator=None):
         self.joinees = []
         self.cost_matrix = []
+        self.size_estimator = size_estimator
         for joinee in joinees:
             self.add_entry(joinee)
     def add_entry(self, joinee):
@@ -40,7 +92,7 @@ class CostMatrix:
         del self.joinees[index]
     def find_min_pair(self):
         assert len(self.joinees) >= 2
-        min_cost = (sys.maxsize, sys.maxsize)
+        min_cost = (float("inf"),)
         for i, row in enumerate(self.cost_matrix):
             for j, entry in enumerate(row):
                 if entry < min_cost:
@@ -60,17 +112,24 @@ class CostMatrix:
         if len(left_vars) > len(right_vars):
             left_vars, right_vars = right_vars, left_vars
         common_vars = left_vars & right_vars
-        return (len(left_vars) - len(common_vars),
+        cost = (len(left_vars) - len(common_vars),
                 len(right_vars) - len(common_vars),
                 -len(common_vars))
+        if self.size_estimator:
+            # Prefer the join with the smallest result among those with
+            # common variables. The variable counts break ties.
+            return (not common_vars, self.size_estimator.get_join_size(
+                left_joinee, right_joinee)) + cost
+        return cost
     def can_join(self):
         return len(self.joinees) >= 2
 
 class ResultList:
-    def __init__(self, rule, name_generator):
+    def __init__(self, rule, name_generator, size_estimator=None):
         self.final_effect = rule.effect
         self.result = []
         self.name_generator = name_generator
+        self.size_estimator = size_estimator
     def get_result(self):
         self.result[-1].effect = self.final_effect
         return self.result
@@ -79,13 +138,21 @@ class ResultList:
         rule = pddl_to_prolog.Rule(conditions, effect)
         rule.type = type
         self.result.append(rule)
+        if self.size_estimator:
+            if type == "join":
+                size = self.size_estimator.get_join_size(*conditions)
+            else:
+                size = self.size_estimator.get_size(conditions[0])
+            self.size_estimator.add_relation(effect, size)
         return rule.effect
 
-def greedy_join(rule, name_generator):
+def greedy_join(rule, name_generator, size_estimator=None):
     assert len(rule.conditions) >= 2
-    cost_matrix = CostMatrix(rule.conditions)
+    if size_estimator:
+        size_estimator.start_rule(rule)
+    cost_matrix = CostMatrix(rule.conditions, size_estimator)
     occurrences = OccurrencesTracker(rule)
-    result = ResultList(rule, name_generator)
+    result = ResultList(rule, name_generator, size_estimator)
 
     while cost_matrix.can_join():
         joinees = list(cost_matrix.remove_min_pair())
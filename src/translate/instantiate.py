@@ -29,7 +29,10 @@ def get_objects_by_type(typed_objects, types):
             result[type].append(obj.name)
     return result
 
-def instantiate(task, model):
+def instantiate(task, model, stream_actions=False):
+    """Instantiate the actions and axioms of the task that are reachable in
+    the given model. If stream_actions is true, the instantiated actions are
+    returned as an iterator that instantiates them on demand."""
     relaxed_reachable = False
     fluent_facts = get_fluent_facts(task, model)
     init_facts = set()
@@ -41,52 +44,122 @@ def instantiate(task, model):
             init_facts.add(element)
 
     type_to_objects = get_objects_by_type(task.objects, task.types)
+    init_index = pddl.FactIndex(init_facts)
+    fluent_index = pddl.FactIndex(fluent_facts)
 
-    instantiated_actions = []
     instantiated_axioms = []
+    axiom_instantiators = {}
     reachable_action_parameters = defaultdict(list)
+    # The actions of the action atoms in the model, in model order.
+    action_order = []
     for atom in model:
         if isinstance(atom.predicate, pddl.Action):
             action = atom.predicate
-            parameters = action.parameters
-            inst_parameters = atom.args[:len(parameters)]
+            inst_parameters = atom.args[:len(action.parameters)]
             # Note: It's important that we use the action object
             # itself as the key in reachable_action_parameters (rather
             # than action.name) since we can have multiple different
             # actions with the same name after normalization, and we
             # want to distinguish their instantiations.
             reachable_action_parameters[action].append(inst_parameters)
-            variable_mapping = {par.name: arg
-                                for par, arg in zip(parameters, atom.args)}
-            inst_action = action.instantiate(
-                variable_mapping, init_facts, init_assignments,
-                fluent_facts, type_to_objects,
-                task.use_min_cost_metric)
-            if inst_action:
-                instantiated_actions.append(inst_action)
+            action_order.append(action)
         elif isinstance(atom.predicate, pddl.Axiom):
             axiom = atom.predicate
-            variable_mapping = {par.name: arg
-                                for par, arg in zip(axiom.parameters, atom.args)}
-            inst_axiom = axiom.instantiate(variable_mapping, init_facts, fluent_facts)
+            instantiator = axiom_instantiators.get(axiom)
+            if instantiator is None:
+                instantiator = axiom_instantiators[axiom] = (
+                    axiom.get_instantiator(init_index, fluent_index))
+            inst_axiom = instantiator.instantiate(atom.args)
             if inst_axiom:
                 instantiated_axioms.append(inst_axiom)
         elif atom.predicate == "@goal-reachable":
             relaxed_reachable = True
 
+    instantiated_actions = instantiate_actions(
+        action_order, reachable_action_parameters, init_index,
+        init_assignments, fluent_index, type_to_objects,
+        task.use_min_cost_metric)
+    if not stream_actions:
+        instantiated_actions = list(instantiated_actions)
+
     return (relaxed_reachable, fluent_facts, instantiated_actions,
             sorted(instantiated_axioms), reachable_action_parameters)
 
-def explore(task):
-    prog = pddl_to_prolog.translate(task)
-    model = build_model.compute_model(prog)
+def instantiate_actions(action_order, reachable_action_parameters, init_facts,
+                        init_assignments, fluent_facts, objects_by_type,
+                        metric):
+    """Generate the instantiated actions in the given order, where each
+    action is instantiated with its next tuple of reachable parameters.
+    Each action is compiled once (see pddl.ActionInstantiator).
+    init_facts and fluent_facts are pddl.FactIndex objects."""
+    instantiators = {}
+    for action in action_order:
+        entry = instantiators.get(action)
+        if entry is None:
+            instantiator = action.get_instantiator(
+                init_facts, init_assignments, fluent_facts, objects_by_type,
+                metric)
+            entry = instantiators[action] = (
+                instantiator.instantiate,
+                iter(reachable_action_parameters[action]))
+        instantiate_action, parameters = entry
+        inst_action = instantiate_action(next(parameters))
+        if inst_action:
+            yield inst_action
+
+def explore(task, join_order="variables", engine="queue", model_jobs=1,
+            print_rule_statistics=False, rule_statistics_file=None,
+            stream_actions=False):
+    """Compute the relaxed reachability model of the task (see
+    build_model.compute_model for the settings) and instantiate the task.
+    With stream_actions, the actions are returned as an iterator."""
+    prog = pddl_to_prolog.translate(task, join_order)
+    model = build_model.compute_model(
+        prog, engine, model_jobs, print_rule_statistics,
+        rule_statistics_file)
     with timers.timing("Completing instantiation"):
-        return instantiate(task, model)
+        return instantiate(task, model, stream_actions=stream_actions)
+
+class Explorer:
+    """Explore several tasks that only differ in their initial states.
+
+    The relaxed reachability model of the first task is updated for each
+    further task instead of being computed from scratch. All tasks must be
+    normalized and have the same domain, objects and goal."""
+    def __init__(self, task, join_order="variables"):
+        prog = pddl_to_prolog.translate(task, join_order)
+        with timers.timing("Computing model"):
+            self.model = build_model.IncrementalModel(prog)
+        self.task = task
+        self.init_facts = get_init_facts(task)
+
+    def explore(self, task):
+        init_facts = get_init_facts(task)
+        with timers.timing("Updating model", block=True):
+            num_recomputed = self.model.update(
+                init_facts - self.init_facts, self.init_facts - init_facts)
+            print("%d predicates recomputed" % num_recomputed)
+        self.init_facts = init_facts
+        # The model refers to the actions and axioms of the first task, but
+        # the instantiated task must use those of the given task.
+        predicate_map = dict(zip(self.task.actions + self.task.axioms,
+                                 task.actions + task.axioms))
+        model = [pddl.Atom(predicate_map.get(atom.predicate, atom.predicate),
+                           atom.args)
+                 for atom in self.model.get_atoms()]
+        with timers.timing("Completing instantiation"):
+            return instantiate(task, model)
+
+def get_init_facts(task):
+    return {fact for fact in task.init if isinstance(fact, pddl.Atom)}
 
 if __name__ == "__main__":
+    import options
     import pddl_parser
     task = pddl_parser.open()
-    relaxed_reachable, atoms, actions, axioms, _ = explore(task)
+    relaxed_reachable, atoms, actions, axioms, _ = explore(
+        task, options.join_order, options.datalog_engine, options.model_jobs,
+        options.rule_statistics, options.rule_statistics_file)
     print("goal relaxed reachable: %s" % relaxed_reachable)
     print("%d atoms:" % len(atoms))
     for atom in atoms:
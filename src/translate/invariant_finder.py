@@ -2,20 +2,46 @@
 
 
 from collections import deque, defaultdict
+import hashlib
 import itertools
+import multiprocessing
+import pickle
 import time
 
 import invariants
-import options
 import pddl
 import timers
 
 class BalanceChecker:
-    def __init__(self, task, reachable_action_params):
+    """Provide the actions threatening an invariant candidate and the data
+    of each action needed for checking a candidate. The data only depends
+    on the action (and the arity of the candidate), so it is computed on
+    first use and then reused for all candidates.
+
+    If inequal_params is given, it replaces the pairs of parameters that
+    are derived from reachable_action_params (see get_inequal_params)."""
+    def __init__(self, task, reachable_action_params, inequal_params=None):
         self.predicates_to_add_actions = defaultdict(set)
         self.action_to_heavy_action = {}
-        for act in task.actions:
-            action = self.add_inequality_preconds(act, reachable_action_params)
+        # Effects (in the order of the action) by action and predicate.
+        self.effects_by_predicate = {}
+        self.del_effects = {}
+        self.precondition_literals = {}
+        self.parameter_pairs = {}
+        # Variable names not used in the action by action and arity.
+        self.unique_variables = {}
+        # Effects are not hashable, so the left-hand sides of add effects
+        # are stored by the action and the id of the effect.
+        self.lhs_by_effect = {}
+        # Pairs of parameter positions of each action (in task order) that
+        # differ in all reachable groundings, see add_inequality_preconds.
+        if inequal_params is None:
+            inequal_params = [
+                self.get_inequal_params(act, reachable_action_params)
+                for act in task.actions]
+        self.inequal_params = inequal_params
+        for act, act_inequal_params in zip(task.actions, inequal_params):
+            action = self.add_inequality_preconds(act, act_inequal_params)
             too_heavy_effects = []
             create_heavy_act = False
             heavy_act = action
@@ -42,18 +68,94 @@ class BalanceChecker:
     def get_heavy_action(self, action):
         return self.action_to_heavy_action[action]
 
-    def add_inequality_preconds(self, action, reachable_action_params):
-        if reachable_action_params is None or len(action.parameters) < 2:
-            return action
-        inequal_params = []
-        combs = itertools.combinations(range(len(action.parameters)), 2)
-        for pos1, pos2 in combs:
-            for params in reachable_action_params[action]:
-                if params[pos1] == params[pos2]:
-                    break
-            else:
-                inequal_params.append((pos1, pos2))
+    def get_effects(self, action, predicates):
+        """Return the effects of the action on the given predicates in the
+        order of the effects of the action. The result must not be
+        modified."""
+        effects_by_predicate = self.effects_by_predicate.get(action)
+        if effects_by_predicate is None:
+            effects_by_predicate = defaultdict(list)
+            for eff in action.effects:
+                effects_by_predicate[eff.literal.predicate].append(eff)
+            self.effects_by_predicate[action] = effects_by_predicate
+        relevant_predicates = [predicate for predicate in predicates
+                               if predicate in effects_by_predicate]
+        if not relevant_predicates:
+            return []
+        elif len(relevant_predicates) == 1:
+            return effects_by_predicate[relevant_predicates[0]]
+        return [eff for eff in action.effects
+                if eff.literal.predicate in predicates]
+
+    def get_del_effects(self, action):
+        result = self.del_effects.get(action)
+        if result is None:
+            result = [eff for eff in action.effects if eff.literal.negated]
+            self.del_effects[action] = result
+        return result
+
+    def get_precondition_literals(self, action):
+        result = self.precondition_literals.get(action)
+        if result is None:
+            result = list(invariants.get_literals(action.precondition))
+            self.precondition_literals[action] = result
+        return result
 
+    def get_parameter_pairs(self, action):
+        result = self.parameter_pairs.get(action)
+        if result is None:
+            result = list(itertools.combinations(
+                [par.name for par in action.parameters], 2))
+            self.parameter_pairs[action] = result
+        return result
+
+    def get_unique_variables(self, action, arity):
+        key = (action, arity)
+        result = self.unique_variables.get(key)
+        if result is None:
+            result = invariants.find_unique_variables(action, arity)
+            self.unique_variables[key] = result
+        return result
+
+    def get_lhs_by_pred(self, action, add_effect):
+        """Return the literals of the precondition, of the condition of the
+        add effect and the negated add effect by predicate."""
+        key = (action, id(add_effect))
+        result = self.lhs_by_effect.get(key)
+        if result is None:
+            result = defaultdict(list)
+            for lit in itertools.chain(
+                    self.get_precondition_literals(action),
+                    invariants.get_literals(add_effect.condition),
+                    [add_effect.literal.negate()]):
+                result[lit.predicate].append(lit)
+            self.lhs_by_effect[key] = result
+        return result
+
+    def get_inequal_params(self, action, reachable_action_params):
+        """Return the pairs of parameter positions that differ in all
+        reachable groundings of the action. The groundings are traversed
+        once; groundings with pairwise different parameters (usually
+        most of them) are recognized by the size of their set."""
+        num_params = len(action.parameters)
+        if reachable_action_params is None or num_params < 2:
+            return []
+        inequal_params = set(itertools.combinations(range(num_params), 2))
+        for params in reachable_action_params[action]:
+            if len(set(params)) == num_params:
+                continue
+            positions_by_param = defaultdict(list)
+            for pos, param in enumerate(params):
+                positions_by_param[param].append(pos)
+            for positions in positions_by_param.values():
+                if len(positions) > 1:
+                    inequal_params.difference_update(
+                        itertools.combinations(positions, 2))
+            if not inequal_params:
+                break
+        return sorted(inequal_params)
+
+    def add_inequality_preconds(self, action, inequal_params):
         if inequal_params:
             precond_parts = [action.precondition]
             for pos1, pos2 in inequal_params:
@@ -83,28 +185,184 @@ def get_initial_invariants(task):
             part = invariants.InvariantPart(predicate.name, order, omitted_arg)
             yield invariants.Invariant((part,))
 
-def find_invariants(task, reachable_action_params):
-    limit = options.invariant_generation_max_candidates
+def get_cache_kind(task, use_inequalities):
+    """Return the kind of the domain cache entry for the invariants of the
+    normalized actions of the task. Invariants proven with the inequality
+    preconditions derived from the reachable action parameters are stored
+    separately, since they only hold if these inequalities hold."""
+    hasher = hashlib.sha1()
+    for action in task.actions:
+        hasher.update(pickle.dumps(
+            (action.name, action.parameters, action.num_external_parameters,
+             action.precondition, action.effects, action.cost),
+            pickle.HIGHEST_PROTOCOL))
+    return "invariants-%s-%s" % (
+        hasher.hexdigest(), "inequalities" if use_inequalities else "plain")
+
+def encode_invariants(invariants):
+    return [[(part.predicate, part.order, part.omitted_pos)
+             for part in invariant.parts]
+            for invariant in invariants]
+
+def decode_invariants(data):
+    return {invariants.Invariant([invariants.InvariantPart(*part)
+                                  for part in parts])
+            for parts in data}
+
+def load_proven_invariants(cache, task, inequal_params):
+    """Return the invariants in the domain cache that hold for the task.
+    Entries without inequalities always hold, and entries with
+    inequalities hold if the task has at least the same ones. Since adding
+    preconditions cannot unbalance an invariant, find_invariants does not
+    need to check these invariants again."""
+    proven_invariants = set()
+    if cache is None:
+        return proven_invariants
+    data = cache.load(get_cache_kind(task, False))
+    if data is not None:
+        proven_invariants |= decode_invariants(data)
+    if any(inequal_params):
+        entry = cache.load(get_cache_kind(task, True))
+        if entry is not None:
+            cached_inequal_params, data = entry
+            if all(set(cached) <= set(current) for cached, current in
+                   zip(cached_inequal_params, inequal_params)):
+                proven_invariants |= decode_invariants(data)
+    if proven_invariants:
+        print("Using %d cached invariants." % len(proven_invariants))
+    return proven_invariants
+
+def store_proven_invariants(cache, task, inequal_params, proven_invariants):
+    """Store the invariants proven for the task in the domain cache.
+
+    There is only one entry with inequalities. If it has other
+    inequalities than the task, it is replaced by an entry with the
+    inequalities common to both (for each action) and the invariants of
+    both that are balanced with these inequalities. This keeps the entry
+    usable for all tasks that stored it."""
+    use_inequalities = any(inequal_params)
+    if use_inequalities:
+        entry = cache.load(get_cache_kind(task, True))
+        if entry is not None:
+            cached_inequal_params, data = entry
+            common_inequal_params = [
+                sorted(set(cached) & set(current)) for cached, current in
+                zip(cached_inequal_params, inequal_params)]
+            if common_inequal_params != inequal_params:
+                cached_invariants = decode_invariants(data)
+                known_invariants = set()
+                if common_inequal_params == cached_inequal_params:
+                    known_invariants = cached_invariants
+                balance_checker = BalanceChecker(
+                    task, None, common_inequal_params)
+                proven_invariants = {
+                    invariant for invariant in
+                    proven_invariants | cached_invariants
+                    if invariant in known_invariants or
+                    invariant.check_balance(
+                        balance_checker, lambda refined_invariant: None)}
+                inequal_params = common_inequal_params
+    data = encode_invariants(proven_invariants)
+    if use_inequalities:
+        data = (inequal_params, data)
+    cache.store(get_cache_kind(task, use_inequalities), data)
+
+def find_invariants(task, reachable_action_params, cache=None,
+                    max_candidates=100000, max_time=300, num_jobs=1):
+    """Generate the invariants of the task. If a domain_cache.DomainCache is
+    given, invariants proven for other tasks of the domain are reused, and
+    the invariants proven for this task are stored in it. See the
+    --invariant-generation-* options for the other parameters."""
+    limit = max_candidates
     candidates = deque(itertools.islice(get_initial_invariants(task), 0, limit))
     print(len(candidates), "initial candidates")
     seen_candidates = set(candidates)
 
     balance_checker = BalanceChecker(task, reachable_action_params)
+    inequal_params = balance_checker.inequal_params
+    proven_invariants = load_proven_invariants(cache, task, inequal_params)
 
     def enqueue_func(invariant):
         if len(seen_candidates) < limit and invariant not in seen_candidates:
             candidates.append(invariant)
             seen_candidates.add(invariant)
 
+    if num_jobs > 1 and "fork" in multiprocessing.get_all_start_methods():
+        search = find_invariants_in_parallel(
+            candidates, balance_checker, enqueue_func, proven_invariants,
+            max_time, num_jobs)
+    else:
+        search = find_invariants_sequentially(
+            candidates, balance_checker, enqueue_func, proven_invariants,
+            max_time)
+    # The found invariants are proven even if the search is aborted.
+    found_invariants = set()
+    for invariant in search:
+        found_invariants.add(invariant)
+        yield invariant
+    if cache is not None and not found_invariants <= proven_invariants:
+        store_proven_invariants(cache, task, inequal_params,
+                                proven_invariants | found_invariants)
+
+def find_invariants_sequentially(candidates, balance_checker, enqueue_func,
+                                 proven_invariants, max_time):
     start_time = time.process_time()
     while candidates:
         candidate = candidates.popleft()
-        if time.process_time() - start_time > options.invariant_generation_max_time:
+        if time.process_time() - start_time > max_time:
             print("Time limit reached, aborting invariant generation")
             return
-        if candidate.check_balance(balance_checker, enqueue_func):
+        # Balanced candidates are not refined, so proven invariants can be
+        # yielded without checking them.
+        if (candidate in proven_invariants or
+                candidate.check_balance(balance_checker, enqueue_func)):
             yield candidate
 
+# Set before starting the worker processes, which inherit it.
+_balance_checker = None
+
+def _check_candidate(candidate):
+    refined_candidates = []
+    balanced = candidate.check_balance(
+        _balance_checker, refined_candidates.append)
+    return balanced, refined_candidates
+
+def find_invariants_in_parallel(candidates, balance_checker, enqueue_func,
+                                proven_invariants, max_time, num_jobs):
+    """Check the candidates with num_jobs processes in rounds. Each round
+    checks all queued candidates and then enqueues their refined candidates
+    in queue order, which is the order in which the sequential algorithm
+    enqueues them. Therefore both find the same invariants in the same
+    order."""
+    global _balance_checker
+    _balance_checker = balance_checker
+    start_time = time.perf_counter()
+    try:
+        context = multiprocessing.get_context("fork")
+        with context.Pool(num_jobs) as pool:
+            while candidates:
+                frontier = list(candidates)
+                candidates.clear()
+                unproven_candidates = [candidate for candidate in frontier
+                                       if candidate not in proven_invariants]
+                chunksize = max(1, len(unproven_candidates) // (4 * num_jobs))
+                results = pool.imap(
+                    _check_candidate, unproven_candidates, chunksize)
+                for candidate in frontier:
+                    if candidate in proven_invariants:
+                        balanced, refined_candidates = True, []
+                    else:
+                        balanced, refined_candidates = next(results)
+                    if time.perf_counter() - start_time > max_time:
+                        print("Time limit reached, aborting invariant generation")
+                        return
+                    for refined_candidate in refined_candidates:
+                        enqueue_func(refined_candidate)
+                    if balanced:
+                        yield candidate
+    finally:
+        _balance_checker = None
+
 def useful_groups(invariants, initial_facts):
     predicate_to_invariants = defaultdict(list)
     for invariant in invariants:
@@ -126,15 +384,19 @@ def useful_groups(invariants, initial_facts):
     for (invariant, parameters) in useful_groups:
         yield [part.instantiate(parameters) for part in sorted(invariant.parts)]
 
-def get_groups(task, reachable_action_params=None):
+def get_groups(task, reachable_action_params=None, cache=None,
+               max_candidates=100000, max_time=300, num_jobs=1):
     with timers.timing("Finding invariants", block=True):
-        invariants = sorted(find_invariants(task, reachable_action_params))
+        invariants = sorted(find_invariants(
+            task, reachable_action_params, cache, max_candidates, max_time,
+            num_jobs))
     with timers.timing("Checking invariant weight"):
         result = list(useful_groups(invariants, task.init))
     return result
 
 if __name__ == "__main__":
     import normalize
+    import options
     import pddl_parser
 
     print("Parsing...")
@@ -144,9 +406,12 @@ if __name__ == "__main__":
     print("Finding invariants...")
     print("NOTE: not passing in reachable_action_params.")
     print("This means fewer invariants might be found.")
-    for invariant in find_invariants(task, None):
+    settings = (options.invariant_generation_max_candidates,
+                options.invariant_generation_max_time,
+                options.invariant_generation_jobs)
+    for invariant in find_invariants(task, None, None, *settings):
         print(invariant)
     print("Finding fact groups...")
-    groups = get_groups(task)
+    groups = get_groups(task, None, None, *settings)
     for group in groups:
         print("[%s]" % ", ".join(map(str, group)))
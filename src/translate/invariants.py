@@ -26,14 +26,14 @@ def instantiate_factored_mapping(pairs):
     return tools.cartesian_product(part_mappings)
 
 
-def find_unique_variables(action, invariant):
+def find_unique_variables(action, arity):
     # find unique names for invariant variables
     params = {p.name for p in action.parameters}
     for eff in action.effects:
         params.update([p.name for p in eff.parameters])
     inv_vars = []
     counter = itertools.count()
-    for _ in range(invariant.arity()):
+    for _ in range(arity):
         while True:
             new_name = "?v%i" % next(counter)
             if new_name not in params:
@@ -241,27 +241,29 @@ class Invariant:
             actions_to_check |= balance_checker.get_threats(part.predicate)
         for action in actions_to_check:
             heavy_action = balance_checker.get_heavy_action(action)
-            if self.operator_too_heavy(heavy_action):
+            if self.operator_too_heavy(heavy_action, balance_checker):
                 return False
-            if self.operator_unbalanced(action, enqueue_func):
+            if self.operator_unbalanced(action, balance_checker, enqueue_func):
                 return False
         return True
 
-    def operator_too_heavy(self, h_action):
-        add_effects = [eff for eff in h_action.effects
-                       if not eff.literal.negated and
-                       self.predicate_to_part.get(eff.literal.predicate)]
-        inv_vars = find_unique_variables(h_action, self)
+    def operator_too_heavy(self, h_action, balance_checker):
+        add_effects = [eff for eff in balance_checker.get_effects(
+                           h_action, self.predicates)
+                       if not eff.literal.negated]
 
         if len(add_effects) <= 1:
             return False
 
+        inv_vars = balance_checker.get_unique_variables(
+            h_action, self.arity())
+        precondition = balance_checker.get_precondition_literals(h_action)
         for eff1, eff2 in itertools.combinations(add_effects, 2):
             system = constraints.ConstraintSystem()
             ensure_inequality(system, eff1.literal, eff2.literal)
             ensure_cover(system, eff1.literal, self, inv_vars)
             ensure_cover(system, eff2.literal, self, inv_vars)
-            ensure_conjunction_sat(system, get_literals(h_action.precondition),
+            ensure_conjunction_sat(system, precondition,
                                    get_literals(eff1.condition),
                                    get_literals(eff2.condition),
                                    [eff1.literal.negate()],
@@ -270,21 +272,21 @@ class Invariant:
                 return True
         return False
 
-    def operator_unbalanced(self, action, enqueue_func):
-        inv_vars = find_unique_variables(action, self)
-        relevant_effs = [eff for eff in action.effects
-                         if self.predicate_to_part.get(eff.literal.predicate)]
+    def operator_unbalanced(self, action, balance_checker, enqueue_func):
+        inv_vars = balance_checker.get_unique_variables(action, self.arity())
+        relevant_effs = balance_checker.get_effects(action, self.predicates)
         add_effects = [eff for eff in relevant_effs
                        if not eff.literal.negated]
         del_effects = [eff for eff in relevant_effs
                        if eff.literal.negated]
         for eff in add_effects:
             if self.add_effect_unbalanced(action, eff, del_effects, inv_vars,
-                                          enqueue_func):
+                                          balance_checker, enqueue_func):
                 return True
         return False
 
-    def minimal_covering_renamings(self, action, add_effect, inv_vars):
+    def minimal_covering_renamings(self, action, add_effect, inv_vars,
+                                   balance_checker):
         """computes the minimal renamings of the action parameters such
            that the add effect is covered by the action.
            Each renaming is an constraint system"""
@@ -294,30 +296,24 @@ class Invariant:
 
         # renaming of operator parameters must be minimal
         minimal_renamings = []
-        params = [p.name for p in action.parameters]
         for assignment in assigs:
             system = constraints.ConstraintSystem()
             system.add_assignment(assignment)
             mapping = assignment.get_mapping()
-            if len(params) > 1:
-                for (n1, n2) in itertools.combinations(params, 2):
-                    if mapping.get(n1, n1) != mapping.get(n2, n2):
-                        negative_clause = constraints.NegativeClause([(n1, n2)])
-                        system.add_negative_clause(negative_clause)
+            for (n1, n2) in balance_checker.get_parameter_pairs(action):
+                if mapping.get(n1, n1) != mapping.get(n2, n2):
+                    negative_clause = constraints.NegativeClause([(n1, n2)])
+                    system.add_negative_clause(negative_clause)
             minimal_renamings.append(system)
         return minimal_renamings
 
     def add_effect_unbalanced(self, action, add_effect, del_effects,
-                              inv_vars, enqueue_func):
+                              inv_vars, balance_checker, enqueue_func):
 
-        minimal_renamings = self.minimal_covering_renamings(action, add_effect,
-                                                            inv_vars)
+        minimal_renamings = self.minimal_covering_renamings(
+            action, add_effect, inv_vars, balance_checker)
 
-        lhs_by_pred = defaultdict(list)
-        for lit in itertools.chain(get_literals(action.precondition),
-                                   get_literals(add_effect.condition),
-                                   get_literals(add_effect.literal.negate())):
-            lhs_by_pred[lit.predicate].append(lit)
+        lhs_by_pred = balance_checker.get_lhs_by_pred(action, add_effect)
 
         for del_effect in del_effects:
             minimal_renamings = self.unbalanced_renamings(
@@ -326,14 +322,15 @@ class Invariant:
                 return False
 
         # Otherwise, the balance check fails => Generate new candidates.
-        self.refine_candidate(add_effect, action, enqueue_func)
+        self.refine_candidate(add_effect, action, balance_checker, enqueue_func)
         return True
 
-    def refine_candidate(self, add_effect, action, enqueue_func):
+    def refine_candidate(self, add_effect, action, balance_checker,
+                         enqueue_func):
         """refines the candidate for an add effect that is unbalanced in the
            action and adds the refined one to the queue"""
         part = self.predicate_to_part[add_effect.literal.predicate]
-        for del_eff in [eff for eff in action.effects if eff.literal.negated]:
+        for del_eff in balance_checker.get_del_effects(action):
             if del_eff.literal.predicate not in self.predicate_to_part:
                 for match in part.possible_matches(add_effect.literal,
                                                    del_eff.literal):
@@ -401,7 +398,7 @@ class Invariant:
         for literal in itertools.chain(get_literals(del_effect.condition),
                                        [del_effect.literal.negate()]):
             poss_assignments = []
-            for match in lhs_by_pred[literal.predicate]:
+            for match in lhs_by_pred.get(literal.predicate, []):
                 if match.negated != literal.negated:
                     continue
                 else:
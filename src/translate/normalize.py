@@ -308,16 +308,18 @@ def eliminate_existential_quantifiers_from_conditional_effects(task):
                 effect.parameters.extend(condition.parameters)
                 effect.condition = condition.parts[0]
 
-def substitute_complicated_goal(task):
+def has_simple_goal(task):
     goal = task.goal
     if isinstance(goal, pddl.Literal):
-        return
+        return True
     elif isinstance(goal, pddl.Conjunction):
-        for item in goal.parts:
-            if not isinstance(item, pddl.Literal):
-                break
-        else:
-            return
+        return all(isinstance(item, pddl.Literal) for item in goal.parts)
+    return False
+
+def substitute_complicated_goal(task):
+    if has_simple_goal(task):
+        return
+    goal = task.goal
     new_axiom = task.add_axiom([], goal)
     task.goal = pddl.Atom(new_axiom.name, new_axiom.parameters)
 
@@ -336,13 +338,47 @@ def normalize(task):
 
     verify_axiom_predicates(task)
 
+# If the goal is simple (a literal or a conjunction of literals), all steps
+# above leave it unchanged, and only the check of the initial state in
+# verify_axiom_predicates depends on anything but the domain. For such
+# tasks, normalize(task) is equivalent to normalize_domain(task) followed
+# by normalize_goal(task), and the actions, axioms and predicates produced
+# by normalize_domain can be reused for all tasks of the same domain (see
+# get_normalized_domain and set_normalized_domain).
+
+def normalize_domain(task):
+    assert has_simple_goal(task)
+    remove_universal_quantifiers(task)
+    build_DNF(task)
+    split_disjunctions(task)
+    move_existential_quantifiers(task)
+    eliminate_existential_quantifiers_from_axioms(task)
+    eliminate_existential_quantifiers_from_preconditions(task)
+    eliminate_existential_quantifiers_from_conditional_effects(task)
+    verify_effect_predicates(task)
+
+def normalize_goal(task):
+    assert has_simple_goal(task)
+    verify_init_predicates(task)
+
+def get_normalized_domain(task):
+    return (task.actions, task.axioms, task.predicates, task.axiom_counter)
+
+def set_normalized_domain(task, normalized_domain):
+    (task.actions, task.axioms, task.predicates,
+     task.axiom_counter) = normalized_domain
+
 def verify_axiom_predicates(task):
     # Verify that derived predicates are not used in :init or
     # action effects.
-    axiom_names = set()
-    for axiom in task.axioms:
-        axiom_names.add(axiom.name)
+    verify_init_predicates(task)
+    verify_effect_predicates(task)
+
+def get_axiom_names(task):
+    return {axiom.name for axiom in task.axioms}
 
+def verify_init_predicates(task):
+    axiom_names = get_axiom_names(task)
     for fact in task.init:
         # Note that task.init can contain the assignment to (total-cost)
         # in addition to regular atoms.
@@ -351,6 +387,8 @@ def verify_axiom_predicates(task):
                 "error: derived predicate %r appears in :init fact '%s'" %
                 (fact.predicate, fact))
 
+def verify_effect_predicates(task):
+    axiom_names = get_axiom_names(task)
     for action in task.actions:
         for effect in action.effects:
             if effect.literal.predicate in axiom_names:
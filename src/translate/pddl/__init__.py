@@ -9,11 +9,15 @@ from .predicates import Predicate
 from .functions import Function
 
 from .actions import Action
+from .actions import ActionInstantiator
 from .actions import PropositionalAction
 
 from .axioms import Axiom
+from .axioms import AxiomInstantiator
 from .axioms import PropositionalAxiom
 
+from .conditions import ConditionInstantiator
+from .conditions import FactIndex
 from .conditions import Literal
 from .conditions import Atom
 from .conditions import NegatedAtom
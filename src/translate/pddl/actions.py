@@ -1,6 +1,8 @@
 import copy
+import itertools
 
 from . import conditions
+from .f_expression import NumericConstant, PrimitiveNumericExpression
 
 
 class Action:
@@ -71,7 +73,11 @@ class Action:
         while instantiating.
         Precondition and effect conditions must be normalized for this to work.
         Returns None if var_mapping does not correspond to a valid instantiation
-        (because it has impossible preconditions or an empty effect list.)"""
+        (because it has impossible preconditions or an empty effect list.)
+
+        The translator instantiates actions with get_instantiator. This
+        method only exists as the reference implementation that
+        tests/test_instantiate.py checks the instantiators against."""
         arg_list = [var_mapping[par.name]
                     for par in self.parameters[:self.num_external_parameters]]
         name = "(%s %s)" % (self.name, " ".join(arg_list))
@@ -99,8 +105,189 @@ class Action:
         else:
             return None
 
+    def get_instantiator(self, init_facts, init_assignments, fluent_facts,
+                         objects_by_type, metric):
+        """Return an ActionInstantiator for instantiating this action with
+        many argument tuples. The arguments have the same meaning as for
+        instantiate, except that init_facts and fluent_facts are
+        conditions.FactIndex objects."""
+        return ActionInstantiator(self, init_facts, init_assignments,
+                                  fluent_facts, objects_by_type, metric)
+
+
+class ActionInstantiator(conditions.ConditionInstantiator):
+    """Instantiate an action for many argument tuples with the same result
+    as Action.instantiate.
+
+    The precondition, the effect conditions and the effects are compiled
+    once (see ConditionInstantiator). For universal effects, the arguments
+    of the effect follow the action arguments. This avoids building a
+    variable mapping and walking the condition trees for each
+    instantiation."""
+    def __init__(self, action, init_facts, init_assignments, fluent_facts,
+                 objects_by_type, metric):
+        super().__init__(init_facts, fluent_facts)
+        self.name = action.name
+        self.num_parameters = len(action.parameters)
+        self.num_external_parameters = action.num_external_parameters
+        self.init_assignments = init_assignments
+        positions = {par.name: index
+                     for index, par in enumerate(action.parameters)}
+        constants = []
+        self.precondition = self._compile_condition(
+            action.precondition, positions, constants)
+        # Each effect is compiled to (object_lists, filters, condition,
+        # literal, constants), where object_lists is None for effects
+        # without parameters, which use the constants of the action. See
+        # _compile_universal_effect for the filters.
+        self.effects = []
+        for eff in action.effects:
+            if eff.parameters:
+                self.effects.append(self._compile_universal_effect(
+                    eff, positions, constants, objects_by_type))
+            else:
+                condition = self._compile_condition(
+                    eff.condition, positions, constants)
+                literal = self._compile_condition(
+                    eff.literal, positions, constants)
+                self.effects.append((None, [], condition, literal, ()))
+        # The cost is either a number or a pair (symbol, getter) for
+        # the primitive numeric expression, see get_cost.
+        self.cost = 1
+        if metric:
+            self.cost = 0
+            if action.cost is not None:
+                expression = action.cost.expression
+                if isinstance(expression, NumericConstant):
+                    self.cost = expression.value
+                else:
+                    self.cost = (expression.symbol, self._compile_args(
+                        expression.args, positions, constants))
+        self.constants = tuple(constants)
+
+    def _compile_universal_effect(self, eff, positions, constants,
+                                  objects_by_type):
+        """Compile an effect with parameters.
+
+        The object tuples of the effect parameters are enumerated with
+        itertools.product over the object lists in reverse parameter order,
+        so that the first parameter varies fastest as in
+        Effect.instantiate. A positive static literal of the effect
+        condition whose only effect parameter is a single argument is
+        compiled into a filter (index, get_key, allowed) instead of a
+        template: the list at the given index is restricted to the objects
+        allowed for the key of the other arguments (taken from the action
+        arguments) before enumerating the tuples. Such a literal is true for
+        exactly these objects, so the filter yields the same effects as
+        testing the literal for each tuple."""
+        num_parameters = len(eff.parameters)
+        effect_positions = dict(positions)
+        for index, par in enumerate(eff.parameters):
+            effect_positions[par.name] = (len(positions) + num_parameters -
+                                          1 - index)
+        object_lists = [objects_by_type.get(par.type_name, [])
+                        for par in reversed(eff.parameters)]
+        if isinstance(eff.condition, conditions.Conjunction):
+            condition_parts = eff.condition.parts
+        else:
+            condition_parts = [eff.condition]
+        filters = []
+        remaining_parts = []
+        for part in condition_parts:
+            if (isinstance(part, conditions.Atom) and
+                    not self.fluent_facts.get_atoms(part.predicate)):
+                effect_args = [(arg_index, arg) for arg_index, arg
+                               in enumerate(part.args)
+                               if effect_positions.get(arg, -1) >= len(positions)]
+                if len(effect_args) == 1:
+                    filters.append(self._compile_filter(
+                        part, effect_args[0], effect_positions,
+                        positions, constants))
+                    continue
+            remaining_parts.append(part)
+        effect_constants = []
+        condition = self._compile_condition(
+            conditions.Conjunction(remaining_parts), effect_positions,
+            effect_constants)
+        literal = self._compile_condition(
+            eff.literal, effect_positions, effect_constants)
+        return (object_lists, filters, condition, literal,
+                tuple(effect_constants))
+
+    def _compile_filter(self, atom, effect_arg, effect_positions, positions,
+                        constants):
+        arg_index, arg = effect_arg
+        list_index = effect_positions[arg] - len(positions)
+        key_args = atom.args[:arg_index] + atom.args[arg_index + 1:]
+        get_key = self._compile_args(key_args, positions, constants)
+        allowed = {}
+        for fact_args in self.init_facts.get_atoms(atom.predicate):
+            if len(fact_args) == len(atom.args):
+                key = fact_args[:arg_index] + fact_args[arg_index + 1:]
+                allowed.setdefault(key, set()).add(fact_args[arg_index])
+        return (list_index, get_key, allowed)
+
+    def get_cost(self, args):
+        if not isinstance(self.cost, tuple):
+            return self.cost
+        symbol, get_args = self.cost
+        pne = PrimitiveNumericExpression(symbol, get_args(args))
+        # See PrimitiveNumericExpression.instantiate.
+        result = self.init_assignments.get(pne)
+        assert result is not None, "Could not find instantiation for PNE: %r" % (
+            str(pne),)
+        return int(result.value)
+
+    def instantiate(self, args):
+        """Return the PropositionalAction for the given arguments (the
+        arguments of an atom of the action predicate in the model) or None,
+        see Action.instantiate."""
+        args = tuple(args[:self.num_parameters])
+        name = "(%s %s)" % (
+            self.name, " ".join(args[:self.num_external_parameters]))
+        action_args = args + self.constants
+        precondition = []
+        if (self.precondition is None or not self._instantiate_condition(
+                self.precondition, action_args, precondition)):
+            return None
+        effects = []
+        for object_lists, filters, condition, literal, constants in self.effects:
+            if condition is None:
+                continue
+            if object_lists is None:
+                args_tuples = [action_args]
+            else:
+                if filters:
+                    object_lists = list(object_lists)
+                    for index, get_key, allowed in filters:
+                        objects = allowed.get(tuple(get_key(action_args)), ())
+                        object_lists[index] = [
+                            obj for obj in object_lists[index] if obj in objects]
+                args_tuples = [
+                    args + object_tuple + constants for object_tuple in
+                    itertools.product(*object_lists)]
+            for effect_args in args_tuples:
+                effect_condition = []
+                if not self._instantiate_condition(
+                        condition, effect_args, effect_condition):
+                    continue
+                effect = []
+                if not self._instantiate_condition(
+                        literal, effect_args, effect):
+                    raise conditions.Impossible()
+                if effect:
+                    effects.append((effect_condition, effect[0]))
+        if effects:
+            return PropositionalAction(name, precondition, effects,
+                                       self.get_cost(action_args))
+        else:
+            return None
+
 
 class PropositionalAction:
+    # There can be millions of instantiated actions, so we save the memory
+    # of an instance dict.
+    __slots__ = ["name", "precondition", "add_effects", "del_effects", "cost"]
     def __init__(self, name, precondition, effects, cost):
         self.name = name
         self.precondition = precondition
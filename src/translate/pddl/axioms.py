@@ -23,6 +23,11 @@ class Axiom:
         self.condition = self.condition.uniquify_variables(self.type_map)
 
     def instantiate(self, var_mapping, init_facts, fluent_facts):
+        """Return the PropositionalAxiom for the arguments in var_mapping
+        or None if its condition is impossible.
+
+        Like Action.instantiate, this method only exists as the reference
+        implementation for the instantiators (see get_instantiator)."""
         # The comments for Action.instantiate apply accordingly.
         arg_list = [self.name] + [
             var_mapping[par.name]
@@ -40,8 +45,46 @@ class Axiom:
         effect = conditions.Atom(self.name, effect_args)
         return PropositionalAxiom(name, condition, effect)
 
+    def get_instantiator(self, init_facts, fluent_facts):
+        """Return an AxiomInstantiator for instantiating this axiom with
+        many argument tuples. init_facts and fluent_facts are
+        conditions.FactIndex objects of the facts passed to instantiate."""
+        return AxiomInstantiator(self, init_facts, fluent_facts)
+
+
+class AxiomInstantiator(conditions.ConditionInstantiator):
+    """Instantiate an axiom for many argument tuples with the same result
+    as Axiom.instantiate (see ConditionInstantiator)."""
+    def __init__(self, axiom, init_facts, fluent_facts):
+        super().__init__(init_facts, fluent_facts)
+        self.name = axiom.name
+        self.num_parameters = len(axiom.parameters)
+        self.num_external_parameters = axiom.num_external_parameters
+        positions = {par.name: index
+                     for index, par in enumerate(axiom.parameters)}
+        constants = []
+        self.condition = self._compile_condition(
+            axiom.condition, positions, constants)
+        self.constants = tuple(constants)
+
+    def instantiate(self, args):
+        """Return the PropositionalAxiom for the given arguments (the
+        arguments of an atom of the axiom predicate in the model) or None,
+        see Axiom.instantiate."""
+        args = tuple(args[:self.num_parameters])
+        condition = []
+        if (self.condition is None or not self._instantiate_condition(
+                self.condition, args + self.constants, condition)):
+            return None
+        effect_args = args[:self.num_external_parameters]
+        name = "(%s)" % " ".join((self.name,) + effect_args)
+        return PropositionalAxiom(
+            name, condition, conditions.Atom(self.name, effect_args))
+
 
 class PropositionalAxiom:
+    # See PropositionalAction.
+    __slots__ = ["name", "condition", "effect"]
     def __init__(self, name, condition, effect):
         self.name = name
         self.condition = condition
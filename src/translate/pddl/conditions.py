@@ -4,6 +4,8 @@
 #
 # Careful: Most other classes (e.g. Effects, Axioms, Actions) are not!
 
+import tools
+
 class Condition:
     def __init__(self, parts):
         self.parts = tuple(parts)
@@ -16,6 +18,10 @@ class Condition:
         return self.hash < other.hash
     def __le__(self, other):
         return self.hash <= other.hash
+    def __reduce__(self):
+        # The precomputed hash value is only valid within the current
+        # process, so we pickle conditions by their constructor arguments.
+        return (self.__class__, (self.parts,))
     def dump(self, indent="  "):
         print("%s%s" % (indent, self._dump()))
         for part in self.parts:
@@ -75,6 +81,8 @@ class ConstantCondition(Condition):
     parts = ()
     def __init__(self):
         self.hash = hash(self.__class__)
+    def __reduce__(self):
+        return (self.__class__, ())
     def change_parts(self, parts):
         return self
     def __eq__(self, other):
@@ -162,6 +170,8 @@ class QuantifiedCondition(Condition):
         self.parameters = tuple(parameters)
         self.parts = tuple(parts)
         self.hash = hash((self.__class__, self.parameters, self.parts))
+    def __reduce__(self):
+        return (self.__class__, (self.parameters, self.parts))
     def __eq__(self, other):
         # Compare hash first for speed reasons.
         return (self.hash == other.hash and
@@ -224,6 +234,8 @@ class Literal(Condition):
         self.predicate = predicate
         self.args = tuple(args)
         self.hash = hash((self.__class__, self.predicate, self.args))
+    def __reduce__(self):
+        return (self.__class__, (self.predicate, self.args))
     def __eq__(self, other):
         # Compare hash first for speed reasons.
         return (self.hash == other.hash and
@@ -290,3 +302,93 @@ class NegatedAtom(Literal):
     def negate(self):
         return Atom(self.predicate, self.args)
     positive = negate
+
+
+class FactIndex:
+    """Index a set of atoms by predicate and argument tuple.
+
+    This lets instantiated literals be looked up by their argument tuple
+    without creating an Atom (and computing its hash) for each of them."""
+    def __init__(self, atoms):
+        self.atoms_by_predicate = {}
+        for atom in atoms:
+            self.atoms_by_predicate.setdefault(
+                atom.predicate, {})[atom.args] = atom
+
+    def get_atoms(self, predicate):
+        """Return a dict from the argument tuples of the indexed atoms with
+        the given predicate to the atoms."""
+        return self.atoms_by_predicate.get(predicate, {})
+
+
+class ConditionInstantiator:
+    """Base class for instantiating the conditions of an action or axiom
+    for many argument tuples with the same result as
+    Condition.instantiate.
+
+    The literals of a condition are compiled into templates (negated,
+    predicate, getter, fluent_atoms, init_atoms) once. The getter selects
+    the arguments of the literal from the tuple of the arguments of the
+    action or axiom, followed by the constants used in the literals.
+    fluent_atoms and init_atoms are the entries of the FactIndex objects
+    for the predicate, so the arguments are looked up directly, and a
+    false condition is reported by the return value instead of the
+    Impossible exception."""
+    def __init__(self, init_facts, fluent_facts):
+        self.init_facts = init_facts
+        self.fluent_facts = fluent_facts
+
+    def _compile_args(self, args, positions, constants):
+        """Return the getter for the given arguments. The positions of
+        constants follow the positions of the variables."""
+        arg_positions = []
+        for arg in args:
+            if arg in positions:
+                arg_positions.append(positions[arg])
+            else:
+                if arg not in constants:
+                    constants.append(arg)
+                arg_positions.append(len(positions) + constants.index(arg))
+        return tools.get_tuple_getter(arg_positions)
+
+    def _compile_condition(self, condition, positions, constants):
+        """Return the list of templates for the literals of the condition or
+        None if the condition is always false."""
+        if isinstance(condition, Literal):
+            return [(condition.negated, condition.predicate,
+                     self._compile_args(condition.args, positions, constants),
+                     self.fluent_facts.get_atoms(condition.predicate),
+                     self.init_facts.get_atoms(condition.predicate))]
+        elif isinstance(condition, Truth):
+            return []
+        elif isinstance(condition, Falsity):
+            return None
+        elif isinstance(condition, Conjunction):
+            result = []
+            for part in condition.parts:
+                part_templates = self._compile_condition(
+                    part, positions, constants)
+                if part_templates is None:
+                    return None
+                result += part_templates
+            return result
+        elif isinstance(condition, ExistentialCondition):
+            return self._compile_condition(
+                condition.parts[0], positions, constants)
+        raise ValueError("Cannot instantiate condition: not normalized")
+
+    def _instantiate_condition(self, templates, args, result):
+        """Append the fluent literals of the condition instantiated with args
+        to result. Return False if the condition is false in the initial
+        state and only has static literals (see Literal.instantiate)."""
+        for negated, predicate, get_args, fluent_atoms, init_atoms in templates:
+            literal_args = get_args(args)
+            atom = fluent_atoms.get(literal_args)
+            if atom is not None:
+                if negated:
+                    result.append(NegatedAtom(predicate, literal_args))
+                else:
+                    result.append(atom)
+            elif (literal_args in init_atoms) == negated:
+                return False
+        return True
@@ -42,6 +42,9 @@ class Effect:
         self.literal = self.literal.rename_variables(renamings)
     def instantiate(self, var_mapping, init_facts, fluent_facts,
                     objects_by_type, result):
+        """Append the pairs (condition, literal) of the instantiated effect
+        to result. Only used by the reference implementation
+        Action.instantiate; the translator uses ActionInstantiator."""
         if self.parameters:
             var_mapping = var_mapping.copy() # Will modify this.
             object_lists = [objects_by_type.get(par.type_name, [])
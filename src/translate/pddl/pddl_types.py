@@ -3,6 +3,7 @@
 # imports as a better solution.
 
 import itertools
+import sys
 
 
 def _get_type_predicate_name(type_name):
@@ -14,7 +15,7 @@ def _get_type_predicate_name(type_name):
     # We internally give types predicate names that cannot be confused
     # with non-type predicates. When the input uses a PDDL type as a
     # predicate, we automatically map it to this internal name.
-    return "type@%s" % type_name
+    return sys.intern("type@%s" % type_name)
 
 
 class Type:
@@ -293,8 +293,18 @@ def parse_axiom(alist, type_dict, predicate_dict):
 
 
 def parse_task(domain_pddl, task_pddl):
+    return parse_task_with_domain(parse_domain(domain_pddl), task_pddl)
+
+
+def parse_domain(domain_pddl):
+    """Return the parsed domain as a tuple that can be passed to
+    parse_task_with_domain (possibly after caching it)."""
+    return tuple(parse_domain_pddl(domain_pddl))
+
+
+def parse_task_with_domain(domain, task_pddl):
     domain_name, domain_requirements, types, type_dict, constants, predicates, predicate_dict, functions, actions, axioms \
-                 = parse_domain_pddl(domain_pddl)
+                 = domain
     task_name, task_domain_name, task_requirements, objects, init, goal, use_metric = parse_task_pddl(task_pddl, type_dict, predicate_dict)
 
     assert domain_name == task_domain_name
@@ -426,7 +436,11 @@ def parse_task_pddl(task_pddl, type_dict, predicate_dict):
     initial_false = set()
     initial_assignments = dict()
     for fact in init[1:]:
-        if fact[0] == "=":
+        if isinstance(fact, pddl.Atom):
+            # Already converted by parse_init_fact while parsing.
+            check_atom_consistency(fact, initial_true, initial_false)
+            initial_true.add(fact)
+        elif fact[0] == "=":
             try:
                 assignment = parse_assignment(fact)
             except ValueError as e:
@@ -476,6 +490,18 @@ def parse_task_pddl(task_pddl, type_dict, predicate_dict):
         assert False, entry
 
 
+def parse_init_fact(alist):
+    """Convert a positive fact of the initial state into a pddl.Atom and
+    return all other entries of the initial state unchanged.
+
+    This is meant to be called on each entry of the :init section as soon
+    as it has been read, so that the nested lists for large initial
+    states are never held in memory at the same time as the atoms."""
+    if not alist or alist[0] in ("=", "not"):
+        return alist
+    return pddl.Atom(alist[0], alist[1:])
+
+
 def check_atom_consistency(atom, same_truth_value, other_truth_value, atom_is_true=True):
     if atom in other_truth_value:
         raise SystemExit("Error in initial state specification\n" +
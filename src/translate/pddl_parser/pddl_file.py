@@ -1,20 +1,22 @@
-import options
-
 from . import lisp_parser
 from . import parsing_functions
 
 file_open = open
 
 
-def parse_pddl_file(type, filename):
+def parse_pddl_file(type, filename, section_handlers=None, parser="lines"):
     try:
         # The builtin open function is shadowed by this module's open function.
         # We use the Latin-1 encoding (which allows a superset of ASCII, of the
         # Latin-* encodings and of UTF-8) to allow special characters in
         # comments. In all other parts, we later validate that only ASCII is
         # used.
-        return lisp_parser.parse_nested_list(file_open(filename,
-                                                       encoding='ISO-8859-1'))
+        with file_open(filename, encoding='ISO-8859-1') as input_file:
+            if parser == "stream":
+                return lisp_parser.parse_nested_list_streaming(
+                    input_file, section_handlers)
+            else:
+                return lisp_parser.parse_nested_list(input_file)
     except OSError as e:
         raise SystemExit("Error: Could not read file: %s\nReason: %s." %
                          (e.filename, e))
@@ -23,11 +25,31 @@ def parse_pddl_file(type, filename):
                          (type, filename, e))
 
 
-def open(domain_filename=None, task_filename=None):
-    task_filename = task_filename or options.task
-    domain_filename = domain_filename or options.domain
-
-    domain_pddl = parse_pddl_file("domain", domain_filename)
-    task_pddl = parse_pddl_file("task", task_filename)
-
-    return parsing_functions.parse_task(domain_pddl, task_pddl)
+def open(domain_filename=None, task_filename=None, cache=None,
+         parser="lines"):
+    """Parse the task with the given parser ("lines" or "stream", see
+    option --pddl-parser). If a domain_cache.DomainCache for the domain
+    file is given, the parsed domain is loaded from it or stored in it.
+    Missing file names are taken from the command line."""
+    if not domain_filename or not task_filename:
+        import options
+        task_filename = task_filename or options.task
+        domain_filename = domain_filename or options.domain
+
+    domain = None
+    if cache is not None:
+        domain = cache.load("domain")
+    if domain is None:
+        domain_pddl = parse_pddl_file(
+            "domain", domain_filename, parser=parser)
+        domain = parsing_functions.parse_domain(domain_pddl)
+        if cache is not None:
+            cache.store("domain", domain)
+    else:
+        print("Using cached domain.")
+    # The streaming parser converts initial facts while it reads them.
+    task_pddl = parse_pddl_file(
+        "task", task_filename,
+        {":init": parsing_functions.parse_init_fact}, parser)
+
+    return parsing_functions.parse_task_with_domain(domain, task_pddl)
@@ -12,6 +12,10 @@ class PrologProgram:
         self.facts = []
         self.rules = []
         self.objects = set()
+        # Estimated sizes of auxiliary predicates (see split_rules).
+        self.join_size_estimates = {}
+        # For each rule, the rule it was split from (see split_rules).
+        self.rule_origins = []
         def predicate_name_generator():
             for count in itertools.count():
                 yield "p$%d" % count
@@ -35,15 +39,28 @@ class PrologProgram:
         self.remove_free_effect_variables()
         self.split_duplicate_arguments()
         self.convert_trivial_rules()
-    def split_rules(self):
+    def split_rules(self, join_order="variables"):
+        import greedy_join
         import split_rules
         # Splits rules whose conditions can be partitioned in such a way that
         # the parts have disjoint variable sets, then split n-ary joins into
         # a number of binary joins, introducing new pseudo-predicates for the
-        # intermediate values.
+        # intermediate values. With join_order "cardinality", the binary
+        # joins are chosen based on estimated relation sizes instead of
+        # variable counts only.
+        size_estimator = None
+        if join_order == "cardinality":
+            derived_predicates = {rule.effect.predicate for rule in self.rules}
+            size_estimator = greedy_join.JoinSizeEstimator(
+                self.facts, derived_predicates, self.objects)
+            self.join_size_estimates = size_estimator.estimates
         new_rules = []
+        self.rule_origins = []
         for rule in self.rules:
-            new_rules += split_rules.split_rule(rule, self.new_name)
+            parts = split_rules.split_rule(
+                rule, self.new_name, size_estimator)
+            new_rules += parts
+            self.rule_origins += [rule] * len(parts)
         self.rules = new_rules
     def remove_free_effect_variables(self):
         """Remove free effect variables like the variable Y in the rule
@@ -156,7 +173,7 @@ def translate_facts(prog, task):
         if isinstance(fact, pddl.Atom):
             prog.add_fact(fact)
 
-def translate(task):
+def translate(task, join_order="variables"):
     # Note: The function requires that the task has been normalized.
     with timers.timing("Generating Datalog program"):
         prog = PrologProgram()
@@ -167,7 +184,7 @@ def translate(task):
         # Using block=True because normalization can output some messages
         # in rare cases.
         prog.normalize()
-        prog.split_rules()
+        prog.split_rules(join_order)
     return prog
 
 
@@ -251,6 +251,10 @@ class SASGoal:
 
 
 class SASOperator:
+    # There can be millions of operators, so we save the memory of an
+    # instance dict. For the same reason, the effect conditions in pre_post
+    # are tuples, which are smaller than lists and shared if empty.
+    __slots__ = ["name", "prevail", "pre_post", "cost"]
     def __init__(self, name, prevail, pre_post, cost):
         self.name = name
         self.prevail = sorted(prevail)
@@ -258,19 +262,13 @@ class SASOperator:
         self.cost = cost
 
     def _canonical_pre_post(self, pre_post):
-        # Return a sorted and uniquified version of pre_post. We would
-        # like to just use sorted(set(pre_post)), but this fails because
-        # the effect conditions are a list and hence not hashable.
+        # Return a sorted and uniquified version of pre_post. The effect
+        # conditions may be given as lists, which are not hashable, so
+        # we convert them to tuples first.
         def tuplify(entry):
             var, pre, post, cond = entry
             return var, pre, post, tuple(cond)
-        def listify(entry):
-            var, pre, post, cond = entry
-            return var, pre, post, list(cond)
-        pre_post = map(tuplify, pre_post)
-        pre_post = sorted(set(pre_post))
-        pre_post = list(map(listify, pre_post))
-        return pre_post
+        return sorted(set(map(tuplify, pre_post)))
 
     def validate(self, variables):
         """Validate the operator.
@@ -398,6 +396,8 @@ class SASOperator:
 
 
 class SASAxiom:
+    # See SASOperator.
+    __slots__ = ["condition", "effect"]
     def __init__(self, condition, effect):
         self.condition = sorted(condition)
         self.effect = effect
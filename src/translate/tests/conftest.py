@@ -0,0 +1,17 @@
+import os.path
+
+import normalize
+import pddl_parser
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+TRANSLATE_DIR = os.path.dirname(DIR)
+REPO = os.path.abspath(os.path.join(DIR, "..", "..", ".."))
+BENCHMARKS = os.path.join(REPO, "misc", "tests", "benchmarks")
+REGRESSION_TESTS = os.path.join(TRANSLATE_DIR, "regression-tests")
+
+
+def load_task(domain, problem):
+    """Parse and normalize the task."""
+    task = pddl_parser.open(domain, problem)
+    normalize.normalize(task)
+    return task
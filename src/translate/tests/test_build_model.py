@@ -0,0 +1,32 @@
+import os.path
+
+import pytest
+
+import build_model
+import pddl_to_prolog
+
+from .conftest import REGRESSION_TESTS, load_task
+
+DOMAIN = os.path.join(REGRESSION_TESTS, "two-agents-domain.pddl")
+PROBLEM = os.path.join(REGRESSION_TESTS, "two-agents-problem.pddl")
+
+
+def compute_model(engine, num_jobs):
+    prog = pddl_to_prolog.translate(load_task(DOMAIN, PROBLEM))
+    model = build_model.compute_model(prog, engine, num_jobs)
+    # Actions and axioms are compared by name, since the task is loaded
+    # for each model.
+    return sorted((getattr(atom.predicate, "name", atom.predicate), atom.args)
+                  for atom in model)
+
+
+@pytest.mark.parametrize("engine", sorted(build_model.ENGINES))
+def test_parallel_model(engine, capsys):
+    # The rules for the robot and the drone form two independent
+    # components. The model also contains facts of predicates that occur
+    # in no rule, such as the object types.
+    expected = compute_model(engine, 1)
+    actual = compute_model(engine, 2)
+    assert "2 independent components" in capsys.readouterr().out
+    assert ("type@object", ("p1",)) in expected
+    assert actual == expected
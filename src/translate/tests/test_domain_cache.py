@@ -0,0 +1,31 @@
+import domain_cache
+
+
+def get_cache(tmpdir):
+    domain_file = tmpdir.join("domain.pddl")
+    domain_file.write("(define (domain test))")
+    return domain_cache.DomainCache(
+        str(tmpdir.join("cache")), str(domain_file))
+
+
+def test_corrupt_entry_is_cache_miss(tmpdir):
+    cache = get_cache(tmpdir)
+    cache.store("result", [1, 2, 3])
+    assert cache.load("result") == [1, 2, 3]
+    domain_cache._entries_in_memory.clear()
+    with open(cache._get_path("result"), "wb") as cache_file:
+        # Like an entry that refers to a class that no longer exists.
+        cache_file.write(b"cdomain_cache\nRemovedClass\n.")
+    assert cache.load("result") is None
+    assert cache.load("missing") is None
+
+
+def test_entries_in_memory_are_bounded(tmpdir):
+    cache = get_cache(tmpdir)
+    num_entries = domain_cache.MAX_ENTRIES_IN_MEMORY + 5
+    for index in range(num_entries):
+        cache.store("result-%d" % index, index)
+    assert (len(domain_cache._entries_in_memory) ==
+            domain_cache.MAX_ENTRIES_IN_MEMORY)
+    for index in range(num_entries):
+        assert cache.load("result-%d" % index) == index
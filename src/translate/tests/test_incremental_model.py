@@ -0,0 +1,51 @@
+import os.path
+
+import pytest
+
+import instantiate
+
+from .conftest import BENCHMARKS, load_task
+
+TASKS = [
+    ("gripper", "prob01.pddl"),
+    ("miconic-simpleadl", "s1-0.pddl"),
+    ("philosophers", "p01-phil2.pddl"),
+]
+
+
+def load_variant(domain, problem, removed):
+    """Load the task without the initial facts at the given positions."""
+    task = load_task(domain, problem)
+    task.init = [fact for index, fact in enumerate(task.init)
+                 if index not in removed]
+    return task
+
+
+def describe(result):
+    relaxed_reachable, atoms, actions, axioms, _ = result
+    return (relaxed_reachable, sorted(map(str, atoms)),
+            sorted(action.name for action in actions),
+            sorted(str(axiom.name) + str(axiom.condition) for axiom in axioms))
+
+
+@pytest.mark.parametrize("domain_name, problem_name", TASKS)
+def test_incremental_model(domain_name, problem_name):
+    # Explore variants of the task with some initial facts removed and
+    # added back, and compare the result of each update of the model to
+    # exploring the variant from scratch.
+    domain = os.path.join(BENCHMARKS, domain_name, "domain.pddl")
+    problem = os.path.join(BENCHMARKS, domain_name, problem_name)
+    num_facts = len(load_task(domain, problem).init)
+    variants = [
+        set(range(0, num_facts, 3)),
+        set(range(num_facts // 2)),
+        set(range(1, num_facts, 3)),
+        set(),
+    ]
+    explorer = instantiate.Explorer(load_variant(domain, problem, set()))
+    for removed in variants:
+        expected = describe(
+            instantiate.explore(load_variant(domain, problem, removed)))
+        actual = describe(
+            explorer.explore(load_variant(domain, problem, removed)))
+        assert expected == actual, sorted(removed)
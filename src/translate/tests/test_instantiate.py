@@ -0,0 +1,87 @@
+import os.path
+
+import pytest
+
+import build_model
+import instantiate
+import pddl
+import pddl_to_prolog
+
+from .conftest import BENCHMARKS, REGRESSION_TESTS, load_task
+
+TASKS = [
+    (os.path.join(BENCHMARKS, "gripper", "domain.pddl"),
+     os.path.join(BENCHMARKS, "gripper", "prob01.pddl")),
+    (os.path.join(BENCHMARKS, "miconic", "domain.pddl"),
+     os.path.join(BENCHMARKS, "miconic", "s1-0.pddl")),
+    (os.path.join(BENCHMARKS, "miconic-simpleadl", "domain.pddl"),
+     os.path.join(BENCHMARKS, "miconic-simpleadl", "s1-0.pddl")),
+    (os.path.join(BENCHMARKS, "philosophers", "domain.pddl"),
+     os.path.join(BENCHMARKS, "philosophers", "p01-phil2.pddl")),
+    (os.path.join(BENCHMARKS, "satellite", "domain.pddl"),
+     os.path.join(BENCHMARKS, "satellite", "p25-HC-pfile5.pddl")),
+    (os.path.join(REGRESSION_TESTS, "two-agents-domain.pddl"),
+     os.path.join(REGRESSION_TESTS, "two-agents-problem.pddl")),
+]
+
+
+def describe_action(action):
+    if action is None:
+        return None
+    return (action.name, action.precondition, action.add_effects,
+            action.del_effects, action.cost)
+
+
+def describe_axiom(axiom):
+    if axiom is None:
+        return None
+    return (axiom.name, axiom.condition, axiom.effect)
+
+
+@pytest.mark.parametrize("domain, problem", TASKS,
+                         ids=[os.path.basename(problem)
+                              for _, problem in TASKS])
+def test_instantiators(domain, problem):
+    # For every reachable grounding of an action or axiom, compare the
+    # result of the compiled instantiators used by instantiate.instantiate
+    # to the one of Action.instantiate and Axiom.instantiate, which
+    # directly follow the definitions.
+    task = load_task(domain, problem)
+    model = build_model.compute_model(pddl_to_prolog.translate(task))
+    fluent_facts = instantiate.get_fluent_facts(task, model)
+    init_facts = set()
+    init_assignments = {}
+    for element in task.init:
+        if isinstance(element, pddl.Assign):
+            init_assignments[element.fluent] = element.expression
+        else:
+            init_facts.add(element)
+    objects_by_type = instantiate.get_objects_by_type(task.objects, task.types)
+    init_index = pddl.FactIndex(init_facts)
+    fluent_index = pddl.FactIndex(fluent_facts)
+
+    instantiators = {}
+    for atom in model:
+        schema = atom.predicate
+        if not isinstance(schema, (pddl.Action, pddl.Axiom)):
+            continue
+        args = atom.args[:len(schema.parameters)]
+        var_mapping = {par.name: arg
+                       for par, arg in zip(schema.parameters, args)}
+        if isinstance(schema, pddl.Action):
+            if schema not in instantiators:
+                instantiators[schema] = schema.get_instantiator(
+                    init_index, init_assignments, fluent_index,
+                    objects_by_type, task.use_min_cost_metric)
+            expected = describe_action(schema.instantiate(
+                var_mapping, init_facts, init_assignments, fluent_facts,
+                objects_by_type, task.use_min_cost_metric))
+            actual = describe_action(instantiators[schema].instantiate(args))
+        else:
+            if schema not in instantiators:
+                instantiators[schema] = schema.get_instantiator(
+                    init_index, fluent_index)
+            expected = describe_axiom(schema.instantiate(
+                var_mapping, init_facts, fluent_facts))
+            actual = describe_axiom(instantiators[schema].instantiate(args))
+        assert expected == actual, (schema.name, args)
@@ -0,0 +1,43 @@
+import io
+
+import pytest
+
+from pddl_parser import lisp_parser
+
+# Inputs with errors and the message of the error. Both parsers report
+# the first error in the file, even if a later line contains a non-ASCII
+# character.
+ERRORS = [
+    ("(a b)\n)\n(é)\n", "Unexpected token: )."),
+    ("(a b) (c)\n(é)\n", "Unexpected token: (."),
+    ("a\n(é)\n", "Expected '(', got a."),
+    (")\n", "Expected '(', got )."),
+    ("(a (b)\n", "Missing ')'"),
+    ("(a\n ; é\n(b é) c))\n",
+     "Non-ASCII character outside comment: (b é) c))"),
+]
+
+
+def parse(input_text, streaming):
+    input_file = io.StringIO(input_text)
+    if streaming:
+        return lisp_parser.parse_nested_list_streaming(input_file)
+    return lisp_parser.parse_nested_list(input_file)
+
+
+@pytest.mark.parametrize("chunk_size", [lisp_parser.CHUNK_SIZE, 1])
+@pytest.mark.parametrize("streaming", [False, True])
+@pytest.mark.parametrize("input_text, message", ERRORS)
+def test_parse_errors(input_text, message, streaming, chunk_size,
+                      monkeypatch):
+    monkeypatch.setattr(lisp_parser, "CHUNK_SIZE", chunk_size)
+    with pytest.raises(lisp_parser.ParseError) as excinfo:
+        parse(input_text, streaming)
+    assert str(excinfo.value) == message
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+@pytest.mark.parametrize("input_text", ["", "  ; only a comment\n"])
+def test_empty_input(input_text, streaming):
+    with pytest.raises(StopIteration):
+        parse(input_text, streaming)
@@ -1,3 +1,6 @@
+from operator import itemgetter
+
+
 def cartesian_product(sequences):
     # TODO: Rename this. It's not good that we have two functions
     # called "product" and "cartesian_product", of which "product"
@@ -28,3 +31,15 @@ def get_peak_memory_in_kb():
     except OSError:
         pass
     raise Warning("warning: could not determine peak memory")
+
+
+def get_tuple_getter(positions):
+    """Return a function mapping a tuple to the tuple of its entries at the
+    given positions (unlike itemgetter also for zero or one position)."""
+    if not positions:
+        return lambda values: ()
+    elif len(positions) == 1:
+        position = positions[0]
+        return lambda values: (values[position],)
+    else:
+        return itemgetter(*positions)
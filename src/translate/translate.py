@@ -17,6 +17,7 @@ from copy import deepcopy
 from itertools import product
 
 import axiom_rules
+import domain_cache
 import fact_groups
 import instantiate
 import normalize
@@ -436,9 +437,14 @@ def translate_task(strips_to_sas, ranges, translation_key,
                    mutex_dict, mutex_ranges, mutex_key,
                    init, goals,
                    actions, axioms, metric, implied_facts):
-    with timers.timing("Processing axioms", block=True):
-        axioms, axiom_layer_dict = axiom_rules.handle_axioms(actions, axioms, goals,
-                                                             options.layer_strategy)
+    # With --stream-actions, the actions are instantiated on demand and can
+    # only be iterated once. In that case, the axioms are processed after
+    # translating the operators.
+    stream_actions = not isinstance(actions, list)
+    if not stream_actions:
+        with timers.timing("Processing axioms", block=True):
+            axioms, axiom_layer_dict = axiom_rules.handle_axioms(
+                actions, axioms, goals, options.layer_strategy)
 
     if options.dump_task:
         # Remove init facts that don't occur in strips_to_sas: they're constant.
@@ -475,9 +481,20 @@ def translate_task(strips_to_sas, ranges, translation_key,
         return solvable_sas_task("Empty goal")
     goal = sas_tasks.SASGoal(goal_pairs)
 
+    if stream_actions:
+        operator_conditions = axiom_rules.OperatorConditions()
+        def record_conditions(actions):
+            for action in actions:
+                operator_conditions.add_operator(action)
+                yield action
+        actions = record_conditions(actions)
     operators = translate_strips_operators(actions, strips_to_sas, ranges,
                                            mutex_dict, mutex_ranges,
                                            implied_facts)
+    if stream_actions:
+        with timers.timing("Processing axioms", block=True):
+            axioms, axiom_layer_dict = axiom_rules.handle_axioms(
+                operator_conditions, axioms, goals, options.layer_strategy)
     axioms = translate_strips_axioms(axioms, strips_to_sas, ranges, mutex_dict,
                                      mutex_ranges)
 
@@ -520,10 +537,15 @@ def unsolvable_sas_task(msg):
     print("%s! Generating unsolvable task..." % msg)
     return trivial_task(solvable=False)
 
-def pddl_to_sas(task):
+def pddl_to_sas(task, cache=None):
     with timers.timing("Instantiating", block=True):
         (relaxed_reachable, atoms, actions, axioms,
-         reachable_action_params) = instantiate.explore(task)
+         reachable_action_params) = instantiate.explore(
+             task, options.join_order, options.datalog_engine,
+             options.model_jobs, options.rule_statistics,
+             options.rule_statistics_file,
+             # Dumping the task needs the list of actions.
+             stream_actions=options.stream_actions and not options.dump_task)
 
     if not relaxed_reachable:
         return unsolvable_sas_task("No relaxed solution")
@@ -538,7 +560,7 @@ def pddl_to_sas(task):
 
     with timers.timing("Computing fact groups", block=True):
         groups, mutex_groups, translation_key = fact_groups.compute_groups(
-            task, atoms, reachable_action_params)
+            task, atoms, reachable_action_params, cache)
 
     with timers.timing("Building STRIPS to SAS dictionary"):
         ranges, strips_to_sas = strips_to_sas_dictionary(
@@ -671,22 +693,45 @@ def dump_statistics(sas_task):
     print("Translator operators: %d" % len(sas_task.operators))
     print("Translator axioms: %d" % len(sas_task.axioms))
     print("Translator task size: %d" % sas_task.get_encoding_size())
+    dump_peak_memory("Translator peak memory")
+
+
+def dump_peak_memory(description):
     try:
         peak_memory = tools.get_peak_memory_in_kb()
     except Warning as warning:
         print(warning)
     else:
-        print("Translator peak memory: %d KB" % peak_memory)
+        print("%s: %d KB" % (description, peak_memory))
+
+
+def normalize_task(task, cache=None):
+    if cache is None or not normalize.has_simple_goal(task):
+        normalize.normalize(task)
+        return
+    normalized_domain = cache.load("normalized")
+    if normalized_domain is None:
+        normalize.normalize_domain(task)
+        cache.store("normalized", normalize.get_normalized_domain(task))
+    else:
+        print("Using cached normalized domain.")
+        normalize.set_normalized_domain(task, normalized_domain)
+    normalize.normalize_goal(task)
 
 
 def main():
     timer = timers.Timer()
+    cache = None
+    if options.domain_cache:
+        cache = domain_cache.DomainCache(options.domain_cache, options.domain)
     with timers.timing("Parsing", True):
         task = pddl_parser.open(
-            domain_filename=options.domain, task_filename=options.task)
+            domain_filename=options.domain, task_filename=options.task,
+            cache=cache, parser=options.pddl_parser)
+    dump_peak_memory("Peak memory after parsing")
 
-    with timers.timing("Normalizing task"):
-        normalize.normalize(task)
+    with timers.timing("Normalizing task", block=True):
+        normalize_task(task, cache)
 
     if options.generate_relaxed_task:
         # Remove delete effects.
@@ -695,7 +740,7 @@ def main():
                 if effect.literal.negated:
                     del action.effects[index]
 
-    sas_task = pddl_to_sas(task)
+    sas_task = pddl_to_sas(task, cache)
     dump_statistics(sas_task)
 
     with timers.timing("Writing output"):
@@ -238,9 +238,9 @@ class VariableOrder:
             pre_post = []
             for eff_var, pre, post, cond in op.pre_post:
                 if eff_var in self.new_var:
-                    new_cond = list((self.new_var[var], val)
-                                    for var, val in cond
-                                    if var in self.new_var)
+                    new_cond = tuple((self.new_var[var], val)
+                                     for var, val in cond
+                                     if var in self.new_var)
                     pre_post.append(
                         (self.new_var[eff_var], pre, post, new_cond))
             if pre_post: